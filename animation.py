@@ -0,0 +1,108 @@
+import math
+import time
+
+
+def parse_color(color):
+    """Цвет "#rrggbb" в тройку (r, g, b)"""
+    return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+
+def format_color(r, g, b):
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def blend(color1, color2, alpha):
+    """Смешивание цветов: alpha - доля color1"""
+    if not (color1.startswith("#") and color2.startswith("#")):
+        return color1
+    (r1, g1, b1), (r2, g2, b2) = parse_color(color1), parse_color(color2)
+    return format_color(int(r1 * alpha + r2 * (1 - alpha)),
+                        int(g1 * alpha + g2 * (1 - alpha)),
+                        int(b1 * alpha + b2 * (1 - alpha)))
+
+
+def lighten(color, amount):
+    """Осветление цвета на amount по каждому каналу"""
+    if not color.startswith("#"):
+        return color
+    return format_color(*(min(255, channel + amount) for channel in parse_color(color)))
+
+
+class Palette:
+    """Кеш градиентов и оттенков цветов темы.
+
+    Градиент между двумя цветами считается один раз и дальше берется из
+    таблицы по индексу, так что кадры анимации не разбирают строки цветов
+    и не смешивают каналы.
+    """
+
+    def __init__(self, colors, steps=32):
+        self.colors = colors
+        self.steps = steps
+        self.gradients = {}
+        self.lightened = {}
+
+    def resolve(self, color):
+        """Имя цвета темы или сам цвет"""
+        return self.colors.get(color, color)
+
+    def gradient(self, start, end, steps=None):
+        """Таблица из steps цветов от start до end (имена темы или "#rrggbb")"""
+        steps = steps or self.steps
+        key = (start, end, steps)
+        table = self.gradients.get(key)
+        if table is None:
+            first, last = self.resolve(start), self.resolve(end)
+            table = self.gradients[key] = [blend(last, first, i / (steps - 1)) for i in range(steps)]
+        return table
+
+    def lighten(self, color, amount=20):
+        """Осветленный цвет (из кеша)"""
+        key = (color, amount)
+        result = self.lightened.get(key)
+        if result is None:
+            result = self.lightened[key] = lighten(self.resolve(color), amount)
+        return result
+
+
+class AnimationClock:
+    """Единые часы всех анимаций интерфейса.
+
+    Эффекты - функции effect(clock), которые вызываются один раз за кадр
+    с общим временем clock.time и шагом clock.dt (секунды), вместо
+    отдельной цепочки таймеров на каждый эффект.
+    """
+
+    def __init__(self):
+        self.effects = []
+        self.start = time.perf_counter()
+        self.last = None
+        self.time = 0.0
+        self.dt = 0.0
+        self.profiler = None  # Profiler: замер каждого эффекта
+
+    def add(self, effect):
+        """Подключение эффекта"""
+        self.effects.append(effect)
+        return effect
+
+    def remove(self, effect):
+        if effect in self.effects:
+            self.effects.remove(effect)
+
+    def tick(self, now=None):
+        """Кадр: продвижение часов и вызов всех эффектов"""
+        now = time.perf_counter() if now is None else now
+        self.dt = 0.0 if self.last is None else now - self.last
+        self.last = now
+        self.time = now - self.start
+        profiler = self.profiler
+        for effect in self.effects:
+            if profiler is None:
+                effect(self)
+            else:
+                profiler.call(effect.__name__, effect, self)
+
+    def wave(self, frequency, phase=0.0):
+        """|sin| с частотой frequency рад/сек: 0…1"""
+        return abs(math.sin(self.time * frequency + phase))
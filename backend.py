@@ -0,0 +1,402 @@
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+# Кадр протокола: синхробайт, команда, номер, аргумент, контрольная сумма
+FRAME = struct.Struct("<BBHiB")
+SYNC_HOST = 0xA5  # кадры от компьютера к драйверу
+SYNC_DEVICE = 0x5A  # кадры от драйвера (подтверждения)
+
+CMD_STEP = 0x01  # аргумент - число шагов со знаком направления
+CMD_SPEED = 0x02  # аргумент - частота в милли-шагах/сек
+CMD_ENABLE = 0x03  # аргумент - 1/0
+CMD_PING = 0x04
+CMD_ACK = 0x80  # номер - последний принятый кадр, аргумент - позиция драйвера
+
+
+def pack_frame(sync, command, seq, arg):
+    """Упаковка кадра с контрольной суммой"""
+    body = FRAME.pack(sync, command, seq & 0xFFFF, arg, 0)[:-1]
+    return body + bytes((sum(body) & 0xFF,))
+
+
+def parse_frames(buffer, sync):
+    """Разбор кадров из буфера; возвращает (кадры, непрочитанный остаток)"""
+    frames = []
+    size = FRAME.size
+    start = 0
+    end = len(buffer)
+    while end - start >= size:
+        if buffer[start] != sync:
+            start += 1  # поиск синхробайта после сбоя
+            continue
+        chunk = bytes(buffer[start:start + size])
+        if sum(chunk[:-1]) & 0xFF != chunk[-1]:
+            start += 1
+            continue
+        _, command, seq, arg, _ = FRAME.unpack(chunk)
+        frames.append((command, seq, arg))
+        start += size
+    return frames, buffer[start:]
+
+
+def open_raw(path):
+    """Открытие последовательного порта в «сыром» режиме (POSIX)"""
+    import termios
+    import tty
+
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+    tty.setraw(fd)
+    attrs = termios.tcgetattr(fd)
+    attrs[6][termios.VMIN] = 1
+    attrs[6][termios.VTIME] = 0
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    return fd
+
+
+class MotorBackend:
+    """Интерфейс драйвера: куда уходят шаги, сгенерированные двигателем.
+
+    Двигатель вызывает steps() и set_speed() для каждой пачки шагов и
+    flush() в конце пачки. Базовый класс ничего не отправляет и служит
+    драйвером для чистой симуляции.
+    """
+
+    def open(self):
+        """Подключение к драйверу"""
+
+    def close(self):
+        """Отключение от драйвера"""
+
+    def steps(self, count, direction):
+        """Выдача count шагов в направлении direction (+1/-1)"""
+
+    def set_speed(self, rate):
+        """Текущая частота шагов (шагов/сек)"""
+
+    def flush(self):
+        """Отправка накопленных команд"""
+
+    def stats(self):
+        """Статистика обмена"""
+        return {}
+
+
+class SerialBackend(MotorBackend):
+    """Драйвер на последовательном порту с двоичным протоколом.
+
+    Команды упаковываются в кадры по 9 байт; подряд идущие шаги в одном
+    направлении сливаются в один кадр, а все кадры пачки уходят одной
+    записью в порт. Драйвер подтверждает кадры (подтверждение
+    накопительное); кадров без подтверждения не больше window, иначе
+    отправка ждет (управление потоком).
+
+    blocking=True - flush() сам ждет места в окне и пишет в порт (цикл
+    шагов в своем потоке или процессе). blocking=False - для цикла шагов
+    в цикле событий Tk: flush() не ждет никогда, пачку пишет отдельный
+    поток, а шаги, накопленные за время ожидания подтверждений,
+    сливаются и уходят следующей записью.
+    """
+
+    def __init__(self, port, window=64, ack_timeout=1.0, blocking=True):
+        self.port = port
+        self.window = window
+        self.ack_timeout = ack_timeout
+        self.blocking = blocking
+        self.fd = None
+        self.reader = None
+        self.writer = None
+        self.closing = False
+        self.ready = False  # пачка передана потоку записи
+
+        self.lock = threading.Condition()
+        self.pending = []  # кадры, ожидающие отправки: [команда, аргумент]
+        self.in_flight = OrderedDict()  # номер -> время отправки
+        self.seq = 0
+        self.device_position = 0
+
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.writes = 0
+        self.acked = 0
+        self.timeouts = 0
+        self.rtt = []  # секунды, последние 10000 значений
+
+    # --- Подключение ---
+
+    def open(self):
+        """Открытие порта и запуск потока чтения подтверждений"""
+        self.fd = open_raw(self.port)
+        self.closing = False
+        self.reader = threading.Thread(target=self.read_loop, daemon=True)
+        self.reader.start()
+        if not self.blocking:
+            self.writer = threading.Thread(target=self.write_loop, daemon=True)
+            self.writer.start()
+
+    def close(self):
+        """Отправка остатка и закрытие порта"""
+        if self.fd is None:
+            return
+        self.flush()
+        self.wait_acks()
+        with self.lock:
+            self.closing = True
+            self.lock.notify_all()
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+        os.close(self.fd)
+        self.fd = None
+
+    # --- Команды ---
+
+    def steps(self, count, direction):
+        """Шаги сливаются с предыдущим кадром, если он тоже шаговый"""
+        if count <= 0:
+            return
+        delta = count * direction
+        with self.lock:
+            last = self.pending[-1] if self.pending else None
+            if last is not None and last[0] == CMD_STEP and (last[1] > 0) == (delta > 0) \
+                    and abs(last[1] + delta) < 2 ** 31:
+                last[1] += delta
+            else:
+                self.pending.append([CMD_STEP, delta])
+
+    def set_speed(self, rate):
+        """Кадр частоты шагов"""
+        with self.lock:
+            self.pending.append([CMD_SPEED, int(rate * 1000)])
+
+    def ping(self):
+        """Пустой кадр для измерения задержки"""
+        with self.lock:
+            self.pending.append([CMD_PING, 0])
+
+    def flush(self):
+        """Отправка накопленных кадров одной записью (или передача ее потоку записи)"""
+        with self.lock:
+            if not self.pending or self.fd is None:
+                return
+            if not self.blocking:
+                self.ready = True
+                self.lock.notify_all()
+                return
+            data = self.take_batch()
+        self.write(data)
+
+    def take_batch(self):
+        """Нумерация накопленных кадров пачки (под блокировкой).
+
+        Управление потоком: сначала ждем, пока в окне освободится место.
+        """
+        deadline = time.perf_counter() + self.ack_timeout
+        while len(self.in_flight) + len(self.pending) > self.window and self.in_flight:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                self.timeouts += 1
+                break
+            self.lock.wait(remaining)
+
+        data = bytearray()
+        now = time.perf_counter()
+        for command, arg in self.pending:
+            self.seq = (self.seq + 1) & 0xFFFF
+            data += pack_frame(SYNC_HOST, command, self.seq, arg)
+            self.in_flight[self.seq] = now
+        self.frames_sent += len(self.pending)
+        self.pending = []
+        return data
+
+    def write(self, data):
+        """Запись пачки в порт"""
+        view = memoryview(data)
+        while view:
+            written = os.write(self.fd, view)
+            view = view[written:]
+        self.bytes_sent += len(data)
+        self.writes += 1
+
+    def write_loop(self):
+        """Поток записи (blocking=False): ожидание места в окне - здесь, а не в flush()"""
+        while True:
+            with self.lock:
+                while not self.ready and not self.closing:
+                    self.lock.wait()
+                if not self.ready:
+                    return
+                data = self.take_batch()
+                self.ready = False
+            self.write(data)
+
+    def wait_acks(self, timeout=None):
+        """Ожидание подтверждения всех отправленных кадров"""
+        deadline = time.perf_counter() + (self.ack_timeout if timeout is None else timeout)
+        with self.lock:
+            while self.in_flight or self.ready:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return False
+                self.lock.wait(remaining)
+        return True
+
+    # --- Подтверждения ---
+
+    def read_loop(self):
+        """Поток чтения подтверждений от драйвера"""
+        buffer = bytearray()
+        while not self.closing:
+            try:
+                data = os.read(self.fd, 4096)
+            except OSError:
+                break
+            if not data:
+                break
+            buffer += data
+            frames, buffer = parse_frames(buffer, SYNC_DEVICE)
+            now = time.perf_counter()
+            with self.lock:
+                for command, seq, arg in frames:
+                    if command == CMD_ACK:
+                        self.acknowledge(seq, now)
+                        self.device_position = arg
+                self.lock.notify_all()
+
+    def acknowledge(self, seq, now):
+        """Накопительное подтверждение: все кадры до seq включительно"""
+        if seq not in self.in_flight:
+            return
+        while self.in_flight:
+            sent_seq, sent_at = self.in_flight.popitem(last=False)
+            self.acked += 1
+            if sent_seq == seq:
+                self.rtt.append(now - sent_at)
+                if len(self.rtt) > 10000:
+                    del self.rtt[:5000]
+                break
+
+    def stats(self):
+        """Статистика: кадры, байты, записи, задержка подтверждения (мс)"""
+        rtt = sorted(self.rtt)
+        return {
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "writes": self.writes,
+            "acked": self.acked,
+            "in_flight": len(self.in_flight),
+            "timeouts": self.timeouts,
+            "device_position": self.device_position,
+            "rtt_mean_ms": sum(rtt) / len(rtt) * 1000 if rtt else 0.0,
+            "rtt_p99_ms": rtt[int(len(rtt) * 0.99)] * 1000 if rtt else 0.0,
+            "rtt_max_ms": rtt[-1] * 1000 if rtt else 0.0,
+        }
+
+
+class FirmwareEmulator:
+    """Эмулятор прошивки драйвера на псевдотерминале.
+
+    Создает пару pty: SerialBackend открывает подчиненную сторону (path)
+    как обычный последовательный порт, а эмулятор читает кадры с ведущей
+    стороны, ведет позицию и подтверждает каждую принятую пачку кадров.
+    """
+
+    def __init__(self):
+        self.master = None
+        self.slave = None
+        self.path = None
+        self.thread = None
+        self.running = False
+        self.position = 0
+        self.speed = 0.0
+        self.enabled = True
+        self.frames = 0
+        self.errors = 0
+
+    def open(self):
+        """Создание псевдотерминала и запуск эмулятора"""
+        import tty
+
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.path = os.ttyname(self.slave)
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self.path
+
+    def close(self):
+        """Остановка эмулятора"""
+        self.running = False
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.master = self.slave = None
+
+    def run(self):
+        """Прием кадров и отправка подтверждений"""
+        buffer = bytearray()
+        while self.running:
+            try:
+                data = os.read(self.master, 65536)
+            except OSError:
+                break
+            if not data:
+                break
+            buffer += data
+            frames, buffer = parse_frames(buffer, SYNC_HOST)
+            if not frames:
+                continue
+            for command, seq, arg in frames:
+                if command == CMD_STEP:
+                    if self.enabled:
+                        self.position += arg
+                elif command == CMD_SPEED:
+                    self.speed = arg / 1000.0
+                elif command == CMD_ENABLE:
+                    self.enabled = bool(arg)
+                self.frames += 1
+            last_seq = frames[-1][1]
+            try:
+                os.write(self.master, pack_frame(SYNC_DEVICE, CMD_ACK, last_seq, self.position))
+            except OSError:
+                break
+
+
+def loopback_benchmark(seconds=2.0, steps_per_batch=10, window=64):
+    """Замер пропускной способности и задержки через эмулятор прошивки"""
+    emulator = FirmwareEmulator()
+    backend = SerialBackend(emulator.open(), window=window)
+    backend.open()
+    try:
+        sent = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            backend.steps(steps_per_batch, 1)
+            backend.ping()
+            backend.flush()
+            sent += steps_per_batch
+        backend.wait_acks(timeout=5.0)
+        elapsed = time.perf_counter() - start
+        stats = backend.stats()
+    finally:
+        backend.close()
+        emulator.close()
+    stats.update({
+        "seconds": elapsed,
+        "steps_sent": sent,
+        "steps_per_sec": sent / elapsed,
+        "frames_per_sec": stats["frames_sent"] / elapsed,
+        "device_steps": emulator.position,
+    })
+    return stats
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(loopback_benchmark(), indent=2))
@@ -0,0 +1,386 @@
+"""Набор замеров: точность частоты шагов и стоимость кадра интерфейса.
+
+Результаты сохраняются в JSON вместе с коммитом и окружением, чтобы
+сравнивать их между версиями:
+
+    python benchmark.py -o before.json
+    python benchmark.py -o after.json --compare before.json
+
+Замер интерфейса требует Tk; без дисплея запускается Xvfb (если
+установлен), иначе замер пропускается.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from engine import StepperMotorEngine
+
+RATES = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+UI_CALLS = ("rotate_motor", "update_display", "update_system_stats", "render_frame")
+# Прибавка к дрожанию при сравнении: рост на десятки мкс - шум планировщика ОС
+JITTER_FLOOR_US = 100
+
+
+def summarize(samples_ns):
+    """Среднее, медиана, p99 и максимум выборки (мкс)"""
+    samples = sorted(samples_ns)
+    if not samples:
+        return {"calls": 0}
+    return {
+        "calls": len(samples),
+        "mean_us": sum(samples) / len(samples) / 1000,
+        "p50_us": samples[len(samples) // 2] / 1000,
+        "p99_us": samples[int(len(samples) * 0.99)] / 1000,
+        "max_us": samples[-1] / 1000,
+    }
+
+
+def environment():
+    """Коммит и окружение, в котором сделан замер"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# --- Частота шагов ---
+
+def measure_rate(rate, seconds=1.0, min_steps=5, settle=0.1):
+    """Заданная и достигнутая частота шагов при непрерывном вращении.
+
+    Разгон практически мгновенный, и шаги первых settle секунд (разгон)
+    не учитываются. Достигнутая частота считается по моментам шагов (между
+    первым и последним), так что на низких частотах результат не зависит
+    от того, где попало окно замера.
+    """
+    engine = StepperMotorEngine(speed=rate)
+    engine.acceleration = 1e9
+    engine.timing_period = 3600
+    stamps = []
+
+    def on_event(event, source):
+        if event == "step":
+            stamps.append(time.perf_counter_ns())
+
+    engine.subscribe(on_event)
+    duration = max(seconds, (min_steps + 1) / rate)
+    engine.start()
+    begin = time.perf_counter_ns() + int(settle * 1e9)
+    time.sleep(settle + duration)
+    engine.stop(immediate=True)
+    engine.thread.join()
+    stamps = [stamp for stamp in stamps if stamp >= begin]
+
+    intervals = [b - a for a, b in zip(stamps, stamps[1:]) if b > a]
+    achieved = (len(stamps) - 1) * 1e9 / (stamps[-1] - stamps[0]) if len(stamps) > 1 else 0.0
+    result = {
+        "commanded_rate": rate,
+        "achieved_rate": achieved,
+        "error_pct": (achieved - rate) / rate * 100,
+        "steps": len(stamps),
+        "seconds": duration,
+        "mean_jitter_us": engine.timing.get("mean_jitter_us", 0.0),
+        "max_jitter_us": engine.timing.get("max_jitter_us", 0.0),
+    }
+    # Интервалы между шагами имеют смысл, пока шаги не идут пачками
+    if rate * engine.scheduler.batch_ns < 1e9 and intervals:
+        interval = summarize(intervals)
+        result["interval_p99_us"] = interval["p99_us"]
+        result["interval_max_us"] = interval["max_us"]
+    return result
+
+
+def rate_benchmark(rates=RATES, seconds=1.0):
+    """Точность частоты шагов во всем диапазоне скоростей"""
+    return [measure_rate(rate, seconds) for rate in rates]
+
+
+# --- Интерфейс ---
+
+@contextlib.contextmanager
+def virtual_display(number=99):
+    """Xvfb на время замера, если нет дисплея; иначе - ничего не делает"""
+    if os.environ.get("DISPLAY") or not shutil.which("Xvfb"):
+        yield os.environ.get("DISPLAY")
+        return
+    display = f":{number}"
+    server = subprocess.Popen(["Xvfb", display, "-nolisten", "tcp", "-screen", "0", "1280x800x24"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    os.environ["DISPLAY"] = display
+    try:
+        yield display
+    finally:
+        del os.environ["DISPLAY"]
+        server.terminate()
+        server.wait()
+
+
+def timed(function, samples):
+    """Обертка, записывающая длительность каждого вызова (нс)"""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter_ns() - start)
+    return wrapper
+
+
+def ui_benchmark(seconds=5.0, speed=500, probe_period=0.05, settle=0.5):
+    """Стоимость вызовов отрисовки и очередь событий Tk при вращении.
+
+    Методы окна оборачиваются таймерами в подклассе (render_frame
+    регистрируется в ядре еще в конструкторе). Замер начинается через
+    settle секунд после запуска, когда разгон закончен. Каждые
+    probe_period секунд в очередь ставится root.after(0) и замеряется,
+    через сколько он выполнится (задержка очереди), а также число
+    ожидающих обработчиков after. Вызовы Tk за кадр считает слой
+    сохраненного состояния окна (app.ui).
+    """
+    try:
+        import tkinter as tk
+    except ImportError as error:
+        return {"skipped": f"нет tkinter: {error}"}
+
+    with virtual_display():
+        try:
+            root = tk.Tk()
+        except tk.TclError as error:
+            return {"skipped": f"нет дисплея: {error}"}
+        from двиг import FuturisticStepperMotorControl
+
+        samples = {name: [] for name in UI_CALLS}
+        measured = type("MeasuredControl", (FuturisticStepperMotorControl,), {
+            name: timed(getattr(FuturisticStepperMotorControl, name), samples[name])
+            for name in UI_CALLS})
+        app = measured(root)
+
+        app.speed_var.set(speed)
+        app.update_speed()
+        app.start_motor()
+        settled = time.perf_counter() + settle
+        while time.perf_counter() < settled:
+            root.update()
+        for values in samples.values():
+            values.clear()
+        app.ui.reset_frames()
+
+        backlog = []  # (сек от начала, ожидающих after, задержка очереди мс)
+        start = time.perf_counter()
+
+        def probe(sent):
+            now = time.perf_counter()
+            pending = len(root.tk.call("after", "info"))
+            backlog.append((now - start, pending, (now - sent) * 1000))
+            root.after(int(probe_period * 1000), lambda: root.after(0, probe, time.perf_counter()))
+
+        root.after(0, probe, time.perf_counter())
+        first_step = app.engine.current_step
+        deadline = start + seconds
+        while time.perf_counter() < deadline:
+            root.update()
+        elapsed = time.perf_counter() - start
+        steps = app.engine.current_step - first_step
+        tk_calls = app.ui.frame_stats()
+
+        app.stop_motor()
+        app.core.close()
+        root.destroy()
+
+    lags = sorted(lag for _, _, lag in backlog)
+    return {
+        "seconds": elapsed,
+        "commanded_rate": speed,
+        "achieved_rate": steps / elapsed,
+        "frames_per_sec": len(samples["render_frame"]) / elapsed,
+        "calls": {name: summarize(values) for name, values in samples.items()},
+        "tk_calls_per_frame": tk_calls,
+        "queue_lag_p99_ms": lags[int(len(lags) * 0.99)] if lags else 0.0,
+        "queue_lag_max_ms": lags[-1] if lags else 0.0,
+        "backlog": backlog,
+    }
+
+
+# --- Запуск CLI ---
+
+def startup_benchmark(runs=5):
+    """Время запуска cli.py для --help, move 0 и replay --summary.
+
+    Команды, а не только разбор аргументов: move 0 создает двигатель,
+    replay --summary открывает запись шагов. Ни одной из них не нужен NumPy.
+    """
+    from recorder import StepRecorder
+
+    with tempfile.TemporaryDirectory() as folder:
+        log = os.path.join(folder, "startup.steplog")
+        recorder = StepRecorder(log)
+        for i in range(1, 101):
+            recorder.record(1, 1, 100.0, i)
+        recorder.close()
+        return {name: command_startup(argv, runs) for name, argv in
+                (("help", ("--help",)), ("move", ("move", "0")), ("replay", ("replay", log, "--summary")))}
+
+
+def command_startup(argv, runs=5):
+    """Время запуска cli.py argv: импорты по -X importtime и полное время процесса"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+    command = [sys.executable, "-X", "importtime", script, *argv]
+    walls, imports_us, modules = [], [], set()
+    for _ in range(runs):
+        start = time.perf_counter()
+        done = subprocess.run(command, capture_output=True, text=True)
+        walls.append(time.perf_counter() - start)
+        total = 0
+        for line in done.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            modules.add(name.strip())
+            if not name.startswith("  "):  # верхний уровень: вложенные уже учтены
+                total += int(cumulative)
+        imports_us.append(total)
+    return {
+        "argv": list(argv),
+        "wall_ms": min(walls) * 1000,
+        "imports_ms": min(imports_us) / 1000,
+        "modules": len(modules),
+        "imports_tkinter": "tkinter" in modules,
+        "imports_numpy": "numpy" in modules,
+    }
+
+
+# --- Сравнение ---
+
+def compare(old, new, tolerance=0.1, jitter_tolerance=1.0):
+    """Регрессии new относительно old: значения, ухудшившиеся более чем на tolerance.
+
+    Дрожание шагов зависит от загрузки машины, поэтому сравнивается не
+    максимум по каждой частоте (одно опоздание планировщика ОС), а
+    медиана среднего дрожания по всем частотам - с допуском
+    jitter_tolerance и прибавкой JITTER_FLOOR_US.
+    """
+    regressions = []
+
+    def check(name, before, after, higher_is_worse=True, tolerance=tolerance):
+        if not before:
+            return
+        change = (after - before) / abs(before)
+        if (change if higher_is_worse else -change) > tolerance:
+            regressions.append({"metric": name, "before": before, "after": after,
+                                "change_pct": change * 100})
+
+    old_rates = {r["commanded_rate"]: r for r in old.get("rates", [])}
+    jitter = []  # (до, после) среднего дрожания на общих частотах
+    for rate in new.get("rates", []):
+        before = old_rates.get(rate["commanded_rate"])
+        if before is None:
+            continue
+        name = f"rate {rate['commanded_rate']}"
+        # Ошибка частоты сравнивается по модулю, с допуском в 1 %
+        check(f"{name} error_pct", abs(before["error_pct"]) + 1, abs(rate["error_pct"]) + 1)
+        jitter.append((before["mean_jitter_us"], rate["mean_jitter_us"]))
+    if jitter:
+        check("median mean_jitter_us",
+              statistics.median(before for before, _ in jitter) + JITTER_FLOOR_US,
+              statistics.median(after for _, after in jitter) + JITTER_FLOOR_US,
+              tolerance=jitter_tolerance)
+
+    old_startup = old.get("startup", {})
+    if "wall_ms" in old_startup:
+        old_startup = {"help": old_startup}  # прежний формат: только --help
+    for name, startup in new.get("startup", {}).items():
+        before = old_startup.get(name)
+        if before is not None:
+            check(f"startup {name} wall_ms", before["wall_ms"], startup["wall_ms"])
+            check(f"startup {name} imports_ms", before["imports_ms"], startup["imports_ms"])
+
+    old_ui, new_ui = old.get("ui", {}), new.get("ui", {})
+    for name, calls in new_ui.get("calls", {}).items():
+        before = old_ui.get("calls", {}).get(name, {})
+        for key in ("mean_us", "p99_us"):
+            if key in calls and key in before:
+                check(f"{name} {key}", before[key], calls[key])
+    if "frames_per_sec" in new_ui and "frames_per_sec" in old_ui:
+        check("frames_per_sec", old_ui["frames_per_sec"], new_ui["frames_per_sec"],
+              higher_is_worse=False)
+    if "tk_calls_per_frame" in new_ui and "tk_calls_per_frame" in old_ui:
+        # +1 - чтобы кадр без вызовов не давал бесконечного роста
+        check("tk_calls_per_frame mean", old_ui["tk_calls_per_frame"]["mean"] + 1,
+              new_ui["tk_calls_per_frame"]["mean"] + 1)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры частоты шагов и стоимости кадра")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="файл результатов JSON")
+    parser.add_argument("--rates", help="частоты через запятую (по умолчанию 1…10000)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="длительность замера частоты")
+    parser.add_argument("--ui-seconds", type=float, default=5.0, help="длительность замера интерфейса")
+    parser.add_argument("--no-ui", action="store_true", help="без замера интерфейса")
+    parser.add_argument("--compare", help="предыдущие результаты для поиска регрессий")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="допустимое ухудшение (доля)")
+    parser.add_argument("--jitter-tolerance", type=float, default=1.0,
+                        help="допустимый рост медианы среднего дрожания (доля)")
+    args = parser.parse_args(argv)
+
+    rates = [int(r) for r in args.rates.split(",")] if args.rates else RATES
+    results = {"environment": environment(), "rates": rate_benchmark(rates, args.seconds)}
+    for rate in results["rates"]:
+        print(f"{rate['commanded_rate']:>6} шаг/с: {rate['achieved_rate']:10.2f} "
+              f"({rate['error_pct']:+.2f} %), джиттер {rate['mean_jitter_us']:.0f} мкс "
+              f"в среднем, до {rate['max_jitter_us']:.0f} мкс")
+    results["startup"] = startup_benchmark()
+    for startup in results["startup"].values():
+        print(f"Запуск cli.py {startup['argv'][0]}: {startup['wall_ms']:.0f} мс, "
+              f"импорты {startup['imports_ms']:.1f} мс"
+              f"{', tkinter!' if startup['imports_tkinter'] else ''}"
+              f"{', NumPy!' if startup['imports_numpy'] else ''}")
+    if not args.no_ui:
+        results["ui"] = ui_benchmark(args.ui_seconds)
+        ui = results["ui"]
+        if "skipped" in ui:
+            print(f"Интерфейс: пропущен ({ui['skipped']})")
+        else:
+            print(f"Интерфейс: {ui['frames_per_sec']:.1f} кадров/с, "
+                  f"задержка очереди p99 {ui['queue_lag_p99_ms']:.1f} мс")
+            tk_calls = ui["tk_calls_per_frame"]
+            print(f"  вызовов Tk за кадр: {tk_calls['mean']:.1f} в среднем, "
+                  f"до {tk_calls['max']}, пропущено {tk_calls['skipped_mean']:.1f}")
+            for name, calls in ui["calls"].items():
+                print(f"  {name}: {calls.get('mean_us', 0):.0f} мкс в среднем, "
+                      f"p99 {calls.get('p99_us', 0):.0f} мкс")
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2, ensure_ascii=False)
+    print(f"Результаты: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(json.load(file), results, args.tolerance, args.jitter_tolerance)
+        for item in regressions:
+            print(f"Регрессия: {item['metric']}: {item['before']:.2f} -> {item['after']:.2f} "
+                  f"({item['change_pct']:+.0f} %)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
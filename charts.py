@@ -0,0 +1,124 @@
+from collections import deque
+
+import numpy as np
+
+
+class TrendChart:
+    """Мини-график тренда на холсте Tk с инкрементальной перерисовкой.
+
+    Каждый отрезок графика - отдельный элемент холста с общим тегом.
+    Новая точка сдвигает весь график одним вызовом move(), добавляет один
+    отрезок справа и удаляет самый старый слева, поэтому стоимость не
+    зависит от ширины графика.
+    """
+
+    def __init__(self, canvas, x, y, width, height, color, low, high,
+                 title="", points=120, text_color="#aaaaaa", grid_color="#2a2a2a"):
+        self.canvas = canvas
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.low = low
+        self.high = high
+        self.color = color
+        self.step = width / points
+        self.points = points
+        self.tag = f"trend_{id(self)}"
+        self.segments = deque()
+        self.last_y = None
+
+        canvas.create_rectangle(x, y, x + width, y + height, outline=grid_color)
+        if title:
+            canvas.create_text(x + 2, y + 1, text=title, anchor="nw",
+                               fill=text_color, font=("Segoe UI", 7))
+        self.value_text = canvas.create_text(x + width - 2, y + 1, text="", anchor="ne",
+                                             fill=color, font=("Consolas", 7, "bold"))
+
+    def to_y(self, value):
+        """Экранная координата значения"""
+        span = self.high - self.low or 1
+        ratio = min(1.0, max(0.0, (value - self.low) / span))
+        return self.y + self.height - 2 - ratio * (self.height - 4)
+
+    def push(self, value):
+        """Добавление точки"""
+        canvas = self.canvas
+        y = self.to_y(value)
+        right = self.x + self.width
+        if self.last_y is not None:
+            canvas.move(self.tag, -self.step, 0)
+            self.segments.append(canvas.create_line(right - self.step, self.last_y, right, y,
+                                                    fill=self.color, tags=self.tag))
+            if len(self.segments) >= self.points:
+                canvas.delete(self.segments.popleft())
+        self.last_y = y
+
+    def push_many(self, values):
+        """Добавление нескольких точек; лишние старые сразу отбрасываются"""
+        values = list(values)[-self.points:]
+        for value in values:
+            self.push(value)
+        if values:
+            self.canvas.itemconfig(self.value_text, text=f"{values[-1]:.0f}")
+
+    def clear(self):
+        """Очистка графика"""
+        self.canvas.delete(self.tag)
+        self.segments.clear()
+        self.last_y = None
+
+
+class HistoryChart:
+    """График произвольного интервала истории с полосой min/max.
+
+    Весь ряд рисуется одной линией (и одним многоугольником полосы), поэтому
+    перерисовка стоит несколько вызовов Tk при любой длине интервала -
+    ряд заранее прорежен до нескольких сотен точек.
+    """
+
+    def __init__(self, canvas, x, y, width, height, color, low, high,
+                 title="", band_color=None, text_color="#aaaaaa", grid_color="#2a2a2a"):
+        self.canvas = canvas
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.low = low
+        self.high = high
+        self.color = color
+        self.band_color = band_color or grid_color
+        self.tag = f"history_{id(self)}"
+
+        canvas.create_rectangle(x, y, x + width, y + height, outline=grid_color)
+        if title:
+            canvas.create_text(x + 4, y + 2, text=title, anchor="nw",
+                               fill=text_color, font=("Segoe UI", 8))
+        self.range_text = canvas.create_text(x + width - 4, y + 2, text="", anchor="ne",
+                                             fill=color, font=("Consolas", 8))
+
+    def draw(self, times, values, lows=None, highs=None):
+        """Перерисовка ряда; lows/highs - полоса агрегатов (если есть)"""
+        canvas = self.canvas
+        canvas.delete(self.tag)
+        if len(times) < 2:
+            canvas.itemconfig(self.range_text, text="")
+            return
+        t0 = times[0]
+        span = (times[-1] - t0) or 1
+        xs = self.x + (times - t0) / span * self.width
+        scale = (self.height - 4) / ((self.high - self.low) or 1)
+        bottom = self.y + self.height - 2
+
+        def to_y(series):
+            return bottom - (series.clip(self.low, self.high) - self.low) * scale
+
+        if lows is not None and (highs > lows).any():
+            band = np.column_stack((np.concatenate((xs, xs[::-1])),
+                                    np.concatenate((to_y(highs), to_y(lows)[::-1]))))
+            canvas.create_polygon(band.ravel().tolist(), fill=self.band_color,
+                                  outline="", tags=self.tag)
+        line = np.column_stack((xs, to_y(values)))
+        canvas.create_line(line.ravel().tolist(), fill=self.color, tags=self.tag)
+        canvas.itemconfig(self.range_text,
+                          text=f"{values.min():.0f}…{values.max():.0f}")
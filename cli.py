@@ -0,0 +1,279 @@
+"""Управление двигателем из командной строки, без интерфейса.
+
+    python cli.py run --speed 800 --seconds 5
+    python cli.py move 2000 --speed 1000 --accel 4000
+    python cli.py move 2000 --serial /dev/ttyUSB0
+    python cli.py move-axes 2000 -500 800 --speed 1000
+    python cli.py gcode part.gcode --axes XYZ --steps-per-unit 80
+    python cli.py simulate 10000 --speed 1500 --load 0.2 --mode 1/16
+    python cli.py replay run.steplog --multiplier 4
+
+Модуль не импортирует tkinter, а двигатель и остальные модули
+загружаются только внутри команды, которой они нужны. Двигатель без
+движения и сводка записи обходятся без NumPy: --help, move 0 и
+replay --summary укладываются в 100 мс (python benchmark.py, замер
+запуска). NumPy (еще 150-200 мс) загружается при первом движении -
+планирование профиля - и в simulate.
+"""
+import argparse
+import json
+import sys
+import time
+
+
+def output(result, as_json):
+    """Результат команды: JSON в одну строку или «ключ: значение»"""
+    if as_json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        for key, value in result.items():
+            print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+def make_engine(args):
+    """Двигатель с параметрами из аргументов; журнал и запись - по запросу"""
+    from engine import StepperMotorEngine
+
+    engine = StepperMotorEngine(speed=args.speed, direction=args.direction)
+    engine.acceleration = args.accel
+    if args.journal:
+        from journal import PositionJournal
+        engine.set_journal(PositionJournal(args.journal))
+    engine.set_microstep(args.mode)
+    engine.set_load(args.load)
+    if args.record:
+        from recorder import StepRecorder
+        engine.set_recorder(StepRecorder(args.record))
+    if args.serial:
+        from backend import SerialBackend
+        engine.set_backend(SerialBackend(args.serial))
+    return engine
+
+
+def close_engine(engine):
+    """Закрытие записи, журнала и драйвера; статистика обмена с драйвером"""
+    engine.set_recorder(None)
+    if engine.journal is not None:
+        engine.save_position()
+        engine.journal.close()
+    engine.backend.close()
+    return engine.backend.stats()
+
+
+def engine_state(engine, started):
+    return {
+        "position": engine.current_step,
+        "true_position": engine.true_step,
+        "missed_steps": engine.missed_steps,
+        "total_steps": engine.total_steps,
+        "angle": engine.angle % 360,
+        "temperature": engine.temperature,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def wait(engine):
+    """Ожидание конца цикла шагов; Ctrl+C - остановка с торможением"""
+    try:
+        while engine.thread.is_alive():
+            engine.thread.join(0.1)
+    except KeyboardInterrupt:
+        engine.stop()
+        engine.thread.join()
+
+
+# --- Команды ---
+
+def command_run(args):
+    """Непрерывное вращение seconds секунд (или до Ctrl+C)"""
+    engine = make_engine(args)
+    started = time.perf_counter()
+    engine.start()
+    try:
+        if args.seconds is None:
+            while True:
+                time.sleep(1.0)
+        time.sleep(args.seconds)
+    except KeyboardInterrupt:
+        pass
+    engine.stop()
+    wait(engine)
+    result = engine_state(engine, started)
+    result.update(close_engine(engine))
+    return result
+
+
+def command_move(args):
+    """Перемещение на steps шагов (в микрошагах режима)"""
+    engine = make_engine(args)
+    started = time.perf_counter()
+    if engine.move(args.steps):
+        wait(engine)
+    result = engine_state(engine, started)
+    result.update(close_engine(engine))
+    return result
+
+
+def command_move_axes(args):
+    """Согласованное перемещение осей на steps шагов каждая"""
+    from multiaxis import MultiAxisController
+
+    controller = MultiAxisController(len(args.steps), args.speed, args.accel, args.jerk)
+    started = time.perf_counter()
+    if controller.move(args.steps):
+        try:
+            while controller.thread.is_alive():
+                controller.thread.join(0.1)
+        except KeyboardInterrupt:
+            controller.stop()
+            controller.thread.join()
+    return axes_state(controller, started)
+
+
+def command_gcode(args):
+    """Выполнение программы G-кода (файл или "-" - stdin) на осях axes"""
+    from gcode import GCodeRunner
+    from multiaxis import MultiAxisController
+
+    controller = MultiAxisController(len(args.axes), args.speed, args.accel, args.jerk)
+    runner = GCodeRunner(controller, args.program, args.axes.upper(), args.steps_per_unit,
+                         lookahead=args.lookahead)
+    started = time.perf_counter()
+    runner.start()
+    try:
+        while runner.thread.is_alive():
+            runner.thread.join(0.1)
+    except KeyboardInterrupt:
+        runner.stop()
+        runner.thread.join()
+    if runner.error is not None:
+        raise runner.error
+    return {**runner.stats, **axes_state(controller, started)}
+
+
+def axes_state(controller, started):
+    return {
+        "positions": controller.positions.tolist(),
+        "total_steps": int(controller.total_steps.sum()),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def command_simulate(args):
+    """Расчет перемещения без движения: время, пропуски шагов, нагрев"""
+    from sweep import evaluate
+
+    point = {"speed": args.speed, "acceleration": args.accel, "load": args.load, "mode": args.mode}
+    job = {"distance": args.steps, "dwell": args.dwell, "hours": args.hours, "motor": {}}
+    return evaluate(point, job)
+
+
+def command_replay(args):
+    """Позиции записи шагов с шагом interval секунд записи"""
+    from recorder import LogPlayer, StepLog
+
+    log = StepLog(args.log)
+    try:
+        if args.summary:
+            return {"events": len(log), "duration": log.duration,
+                    "final_position": log.position_at(log.duration) / log.units}
+        player = LogPlayer(log, args.multiplier, start=args.start)
+        moment = args.start
+        while True:
+            moment = min(moment, log.duration)
+            if not args.no_wait:
+                delay = (moment - player.time) / args.multiplier
+                if delay > 0:
+                    time.sleep(delay)
+            position = log.position_at(moment) / log.units
+            print(json.dumps({"time": round(moment, 6), "position": position,
+                              "angle": round(position * 1.8 % 360, 3)}) if args.json
+                  else f"{moment:10.3f} с  {position:12.3f} шаг")
+            if moment >= log.duration:
+                break
+            moment += args.interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log.close()
+    return None
+
+
+def parser():
+    motion = argparse.ArgumentParser(add_help=False)
+    motion.add_argument("--speed", type=int, default=100, help="полных шагов/сек")
+    motion.add_argument("--accel", type=float, default=2000, help="шагов/сек²")
+    motion.add_argument("--mode", default="FULL", help="режим шага: FULL, HALF, 1/4 … 1/256")
+    motion.add_argument("--load", type=float, default=0.0, help="момент нагрузки, Н·м")
+
+    engine = argparse.ArgumentParser(add_help=False, parents=[motion])
+    engine.add_argument("--direction", choices=("CW", "CCW"), default="CW")
+    engine.add_argument("--journal", help="журнал позиции (восстановление и сохранение)")
+    engine.add_argument("--record", help="запись шагов в файл .steplog")
+    engine.add_argument("--serial", metavar="PORT",
+                        help="драйвер на последовательном порту (по умолчанию - симуляция)")
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="вывод в JSON")
+
+    root = argparse.ArgumentParser(description="Шаговый двигатель без интерфейса")
+    commands = root.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", parents=[engine, common], help="непрерывное вращение")
+    run.add_argument("--seconds", type=float, help="длительность (по умолчанию - до Ctrl+C)")
+    run.set_defaults(handler=command_run)
+
+    move = commands.add_parser("move", parents=[engine, common], help="перемещение на шаги")
+    move.add_argument("steps", type=int)
+    move.set_defaults(handler=command_move)
+
+    axes_motion = argparse.ArgumentParser(add_help=False)
+    axes_motion.add_argument("--speed", type=float, default=1000, help="шагов/сек ведущей оси")
+    axes_motion.add_argument("--accel", type=float, default=4000, help="шагов/сек² ведущей оси")
+    axes_motion.add_argument("--jerk", type=float, help="шагов/сек³ (S-кривая)")
+
+    axes = commands.add_parser("move-axes", parents=[axes_motion, common],
+                               help="согласованное перемещение осей")
+    axes.add_argument("steps", type=int, nargs="+", help="шагов по каждой оси")
+    axes.set_defaults(handler=command_move_axes)
+
+    gcode = commands.add_parser("gcode", parents=[axes_motion, common],
+                                help="выполнение программы G-кода на осях")
+    gcode.add_argument("program", help="файл G-кода или - (stdin)")
+    gcode.add_argument("--axes", default="XYZ", help="буквы осей по порядку")
+    gcode.add_argument("--steps-per-unit", type=float, default=1.0, help="шагов на единицу (мм)")
+    gcode.add_argument("--lookahead", type=int, default=16, help="отрезков в окне планирования")
+    gcode.set_defaults(handler=command_gcode)
+
+    simulate = commands.add_parser("simulate", parents=[motion, common],
+                                   help="расчет перемещения без движения")
+    simulate.add_argument("steps", type=int, help="полных шагов")
+    simulate.add_argument("--dwell", type=float, default=1.0, help="пауза между повторами, сек")
+    simulate.add_argument("--hours", type=float, default=1.0, help="длительность работы для нагрева")
+    simulate.set_defaults(handler=command_simulate)
+
+    replay = commands.add_parser("replay", parents=[common], help="воспроизведение записи шагов")
+    replay.add_argument("log")
+    replay.add_argument("--multiplier", type=float, default=1.0, help="множитель скорости")
+    replay.add_argument("--start", type=float, default=0.0, help="начало, сек записи")
+    replay.add_argument("--interval", type=float, default=0.1, help="шаг вывода, сек записи")
+    replay.add_argument("--no-wait", action="store_true", help="без ожидания в реальном времени")
+    replay.add_argument("--summary", action="store_true", help="только сводка записи")
+    replay.set_defaults(handler=command_replay)
+    return root
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    try:
+        result = args.handler(args)
+    except (OSError, ValueError) as problem:
+        print(f"Ошибка: {problem}", file=sys.stderr)
+        return 1
+    if result is not None:
+        output(result, args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
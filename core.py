@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+
+
+class AsyncCore:
+    """Управляющее ядро на одном цикле событий asyncio.
+
+    Циклы шагов двигателей, запись телеметрии и анимации интерфейса -
+    сопрограммы одного цикла в одном потоке, поэтому общие поля
+    двигателя не читаются и не пишутся из разных потоков, а десятки
+    одновременных перемещений не требуют десятков потоков.
+
+    С Tk цикл событий работает совместно с root.mainloop(): attach()
+    каждую миллисекунду выполняет все готовые задачи цикла asyncio. Без
+    интерфейса цикл запускается обычным run().
+    """
+
+    def __init__(self, tick_ms=1):
+        self.loop = asyncio.new_event_loop()
+        self.tick_ms = tick_ms
+        self.root = None
+        self.after_id = None
+        self.tasks = set()
+        self.profiler = None  # Profiler: замер итераций циклов шагов и периодических задач
+
+    # --- Запуск задач ---
+
+    def spawn(self, cycle):
+        """Цикл шагов двигателя (генератор пробуждений) как задача.
+
+        Подходит как engine.runner: двигатель отдает ядру свой цикл
+        вместо запуска потока.
+        """
+        return self.create_task(self.drive(cycle))
+
+    def create_task(self, coroutine):
+        """Задача на цикле ядра (ссылка хранится до ее завершения)"""
+        task = self.loop.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def every(self, period, callback):
+        """Периодический вызов callback() по абсолютным дедлайнам"""
+        return self.create_task(self.periodic(period, callback, getattr(callback, "__name__", "periodic")))
+
+    def attach_engine(self, engine):
+        """Двигатель запускает циклы шагов на этом ядре"""
+        engine.runner = self.spawn
+        return engine
+
+    async def drive(self, cycle):
+        """Выполнение цикла шагов с ожиданием пробуждений в цикле событий"""
+        while True:
+            profiler = self.profiler
+            if profiler is None:
+                wake = next(cycle, None)
+            else:
+                start = time.perf_counter_ns()
+                wake = next(cycle, None)
+                profiler.record("engine_loop", time.perf_counter_ns() - start)
+            if wake is None:
+                return
+            delay = wake - time.perf_counter_ns()
+            # Даже без ожидания отдаем управление другим задачам
+            await asyncio.sleep(delay / 1e9 if delay > 0 else 0)
+
+    async def periodic(self, period, callback, name):
+        deadline = time.perf_counter()
+        while True:
+            profiler = self.profiler
+            if profiler is None:
+                callback()
+            else:
+                profiler.call(name, callback)
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay < 0:
+                deadline = time.perf_counter()  # отстали - без догона
+                delay = 0
+            await asyncio.sleep(delay)
+
+    # --- Работа цикла ---
+
+    def attach(self, root):
+        """Совместная работа с mainloop() Tk"""
+        self.root = root
+        self.tick()
+
+    def tick(self):
+        """Выполнение всех готовых задач и повтор через tick_ms"""
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+        self.after_id = self.root.after(self.tick_ms, self.tick)
+
+    def run(self, coroutine=None):
+        """Работа без интерфейса: до завершения coroutine или всех задач"""
+        if coroutine is not None:
+            return self.loop.run_until_complete(coroutine)
+        while self.tasks:
+            self.loop.run_until_complete(asyncio.wait(set(self.tasks)))
+
+    def close(self):
+        """Отмена задач и закрытие цикла"""
+        if self.root is not None and self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+        for task in list(self.tasks):
+            task.cancel()
+        if self.tasks:
+            self.loop.run_until_complete(asyncio.gather(*self.tasks, return_exceptions=True))
+        self.loop.close()
+
+
+def concurrency_benchmark(motors=50, steps=2000, speed=1000):
+    """Одновременные перемещения motors двигателей на одном потоке"""
+    from engine import StepperMotorEngine
+
+    core = AsyncCore()
+    engines = [core.attach_engine(StepperMotorEngine(speed=speed)) for _ in range(motors)]
+    start = time.perf_counter()
+    threads = threading.active_count()
+    for engine in engines:
+        engine.move(steps)
+    threads_running = threading.active_count()
+    core.run()
+    elapsed = time.perf_counter() - start
+    core.close()
+
+    jitter = [engine.timing["mean_jitter_us"] for engine in engines]
+    return {
+        "motors": motors,
+        "threads_before": threads,
+        "threads_while_running": threads_running,
+        "seconds": elapsed,
+        "all_arrived": all(engine.current_step == steps for engine in engines),
+        "steps_per_sec": motors * steps / elapsed,
+        "mean_jitter_us": sum(jitter) / len(jitter),
+        "max_jitter_us": max(engine.timing["max_jitter_us"] for engine in engines),
+    }
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(concurrency_benchmark(), indent=2))
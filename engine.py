@@ -0,0 +1,493 @@
+import threading
+import time
+from collections import deque
+
+import microstep
+from backend import MotorBackend
+from physics import MotorModel, StallDetector
+
+# planner и scheduler (с NumPy) импортируются при первом движении: без
+# движения, например для move 0 в cli.py, NumPy не загружается
+
+
+class Observable:
+    """Рассылка событий подписчикам: callback(event, source)"""
+
+    def __init__(self):
+        self.observers = []
+
+    def subscribe(self, callback):
+        """Подписка на события: callback(event, source)"""
+        self.observers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        """Отписка от событий"""
+        if callback in self.observers:
+            self.observers.remove(callback)
+
+    def notify(self, event):
+        """Рассылка события всем подписчикам"""
+        for callback in list(self.observers):
+            callback(event, self)
+
+
+class StepperMotorEngine(Observable):
+    """Модель шагового двигателя без графического интерфейса.
+
+    Хранит состояние двигателя и выполняет шаги. Интерфейс (или любой
+    другой потребитель) подписывается на события через subscribe().
+    """
+
+    STEP_ANGLE = 1.8  # градусов на полный шаг
+
+    def __init__(self, speed=100, direction="CW"):
+        super().__init__()
+
+        # Параметры двигателя
+        self.running = False
+        self.direction = direction  # "CW" - по часовой, "CCW" - против
+        self.speed = speed  # полных шагов/сек
+        self.current_step = 0  # заданная позиция, в микрошагах текущего режима
+        self.total_steps = 0
+
+        # Фактическая позиция ротора: отстает от заданной на пропущенные
+        # шаги (по предсказанию срыва из кривой момент-скорость)
+        self.true_step = 0
+        self.missed_steps = 0  # в микрошагах
+
+        # Тепловая и электрическая модель по паспорту двигателя
+        self.model = MotorModel()
+        self.load = 0.0  # момент нагрузки, Н·м
+        self.temperature = self.model.ambient  # °C
+        self.power = 0.0  # Вт
+        self.torque = 0.0  # доступный момент, % от удерживающего
+        self.physics_time = time.monotonic()
+        self.physics_lock = threading.Lock()
+        self.physics_period = 0.05  # сек между обновлениями модели в цикле шагов
+        self.stall = StallDetector(self.model)
+
+        # Режим шага
+        self.microstep_mode = "FULL"
+        self.microsteps = 1
+
+        # Профиль разгона/торможения (в полных шагах)
+        self.acceleration = 2000  # шагов/сек²
+        self.jerk = None  # шагов/сек³; None - трапеция, иначе S-кривая
+        self.step_rate = 0.0  # текущая частота микрошагов с учетом разгона
+        self.stop_requested = False
+
+        # Почтовый ящик команд для работающего цикла шагов: (команда,
+        # значение, время отправки в perf_counter_ns). deque - добавление
+        # и извлечение без блокировок из разных потоков
+        self.commands = deque()
+        self.motion_direction = 0  # фактическое направление последней пачки
+        self.latencies = deque(maxlen=1000)  # задержка команда-эффект, нс
+
+        self.thread = None
+        self.runner = None  # запуск цикла шагов вне потока (например, AsyncCore.spawn)
+        self.task = None  # то, что вернул runner (задача asyncio)
+        self.generation = 0  # номер запуска: циклы прошлых запусков завершаются
+
+        # Драйвер, получающий сгенерированные шаги (по умолчанию - симуляция)
+        self.backend = MotorBackend()
+        self.recorder = None  # запись шагов в файл (StepRecorder)
+        self.journal = None  # журнал позиции на случай падения (PositionJournal)
+
+        # Статистика точности шагов последнего запуска
+        self.scheduler = None
+        self.timing = {}
+        self.timing_period = 1.0  # сек между событиями "timing"
+
+        self.update_physics(0.0)
+
+    # --- Управление ---
+
+    @property
+    def step_angle(self):
+        """Угол одного микрошага в градусах"""
+        return self.STEP_ANGLE / self.microsteps
+
+    @property
+    def steps_per_rev(self):
+        """Микрошагов на оборот"""
+        return round(360 / self.STEP_ANGLE) * self.microsteps
+
+    @property
+    def angle(self):
+        """Текущий угол ротора в градусах"""
+        return self.current_step * self.step_angle
+
+    def coil_currents(self, step=None):
+        """Интенсивность четырех катушек для микрошага step (по умолчанию текущего)"""
+        table = microstep.coil_table(self.microstep_mode)
+        return table[(self.current_step if step is None else step) % len(table)]
+
+    def motion_limits(self):
+        """Скорость, ускорение и рывок в микрошагах"""
+        m = self.microsteps
+        jerk = None if self.jerk is None else self.jerk * m
+        return self.speed * m, self.acceleration * m, jerk
+
+    def set_microstep(self, mode):
+        """Установка режима шага (только когда двигатель остановлен)"""
+        if self.running:
+            return False
+        new = microstep.microsteps(mode)
+        # Позиция хранится в микрошагах: пересчитываем под новый режим
+        self.current_step = round(self.current_step * new / self.microsteps)
+        self.true_step = round(self.true_step * new / self.microsteps)
+        self.microstep_mode = mode
+        self.microsteps = new
+        self.save_position()
+        self.notify("mode")
+        return True
+
+    def set_speed(self, speed):
+        """Установка скорости (шагов/сек); при вращении - на ходу"""
+        self.speed = max(1, int(speed))
+        self.post("speed", self.speed)
+        self.notify("speed")
+
+    def set_direction(self, direction):
+        """Установка направления; при вращении - реверс через остановку"""
+        if direction not in ("CW", "CCW"):
+            raise ValueError(f"Неизвестное направление: {direction}")
+        self.direction = direction
+        self.post("direction", direction)
+        self.notify("direction")
+
+    def post(self, command, value):
+        """Команда работающему циклу шагов (применяется на ближайшем пробуждении)"""
+        if self.running:
+            self.commands.append((command, value, time.perf_counter_ns()))
+
+    def set_load(self, load):
+        """Установка момента нагрузки (Н·м)"""
+        self.load = max(0.0, float(load))
+        self.notify("load")
+
+    def set_backend(self, backend):
+        """Подключение драйвера (только когда двигатель остановлен)"""
+        if self.running:
+            return False
+        self.backend.close()
+        backend.open()
+        self.backend = backend
+        self.notify("backend")
+        return True
+
+    def set_recorder(self, recorder):
+        """Подключение записи шагов; None - отключение (старая запись закрывается)"""
+        if self.recorder is not None:
+            self.recorder.close()
+        self.recorder = recorder
+
+    def set_journal(self, journal):
+        """Подключение журнала позиции с восстановлением сохраненного состояния"""
+        if self.running:
+            return False
+        state = journal.recover()
+        if state is not None:
+            _, position, total, microsteps = state
+            # Позиция хранится в микрошагах режима, в котором была записана
+            self.current_step = self.true_step = round(position * self.microsteps / microsteps)
+            self.total_steps = total
+        self.journal = journal
+        self.save_position()
+        return True
+
+    def save_position(self):
+        """Запись позиции в журнал (если подключен)"""
+        if self.journal is not None:
+            self.journal.write(self.current_step, self.total_steps, self.microsteps)
+
+    def poll(self):
+        """Подтягивание состояния извне; локальный двигатель обновляется сам"""
+
+    def start(self, threaded=True):
+        """Запуск двигателя с разгоном; threaded=False - цикл в текущем потоке"""
+        return self.launch(self.run_loop(), threaded)
+
+    def move(self, steps, threaded=True):
+        """Перемещение на steps шагов по профилю разгона/торможения"""
+        if steps == 0 or self.running:
+            return False
+        import planner
+
+        profile = planner.plan_move(steps, *self.motion_limits())
+        return self.launch(self.run_profile(profile), threaded)
+
+    def launch(self, cycle, threaded):
+        """Запуск цикла шагов cycle (генератора пробуждений).
+
+        Если задан runner, цикл отдается ему (например, в цикл событий
+        asyncio); иначе выполняется в отдельном или текущем потоке. Цикл
+        прошлого запуска (остановленный немедленно, но еще спящий до
+        пробуждения) по новому номеру запуска завершается, не сделав
+        больше ни шага, а его задача отменяется.
+        """
+        if self.running:
+            cycle.close()
+            return False
+        self.generation += 1
+        cycle = self.guard(cycle, self.generation)
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        self.task = None
+        self.running = True
+        self.stop_requested = False
+        self.commands.clear()
+        self.latencies.clear()
+        self.stall.reset()
+        self.notify("start")
+        if self.runner is not None:
+            self.task = self.runner(cycle)
+        elif threaded:
+            self.thread = threading.Thread(target=self.drive, args=(cycle,), daemon=True)
+            self.thread.start()
+        else:
+            self.drive(cycle)
+        return True
+
+    def guard(self, cycle, generation):
+        """Цикл шагов, который выполняется, пока не начат следующий запуск"""
+        for wake in cycle:
+            yield wake
+            if generation != self.generation:
+                cycle.close()
+                return
+
+    @staticmethod
+    def drive(cycle):
+        """Выполнение цикла шагов со сном до каждого пробуждения"""
+        for wake in cycle:
+            delay = wake - time.perf_counter_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+
+    def stop(self, immediate=False):
+        """Остановка двигателя: с торможением или немедленно"""
+        if not self.running:
+            return
+        if immediate:
+            self.running = False
+            self.step_rate = 0.0
+            self.notify("stop")
+        else:
+            self.stop_requested = True
+
+    def reset(self):
+        """Сброс позиции и счетчика шагов"""
+        self.stop(immediate=True)
+        self.current_step = 0
+        self.total_steps = 0
+        self.true_step = 0
+        self.missed_steps = 0
+        self.save_position()
+        self.notify("reset")
+
+    def step(self, steps):
+        """Шаговое управление (только когда двигатель остановлен)"""
+        return self.move(steps)
+
+    # --- Симуляция ---
+
+    def advance(self, step=None):
+        """Один шаг: step = +1/-1, по умолчанию - в текущем направлении"""
+        if step is None:
+            step = 1 if self.direction == "CW" else -1
+        self.current_step += step
+        self.true_step += step
+        self.total_steps += 1
+        self.notify("step")
+
+    def update_physics(self, dt=None, speed=None):
+        """Продвижение тепловой модели на dt сек при скорости speed.
+
+        По умолчанию dt - время с прошлого обновления, speed - текущая
+        частота шагов (полных шагов/сек). Вызывается из цикла шагов и
+        при записи телеметрии, так что двигатель остывает и на месте.
+        """
+        with self.physics_lock:
+            if dt is None:
+                now = time.monotonic()
+                dt = now - self.physics_time
+                self.physics_time = now
+            if speed is None:
+                speed = self.step_rate / self.microsteps
+            model = self.model
+            mode = self.microstep_mode
+            self.temperature = model.heat(self.temperature, speed, dt, mode)
+            self.power = float(model.power(speed, self.load, mode))
+            self.torque = float(model.torque(speed, mode)) / model.holding_torque * 100
+
+    def simulate(self, steps):
+        """Выполнение steps микрошагов без задержек (для тестов и профилирования).
+
+        Знак steps - направление, как в move(). Тепловая модель
+        продвигается на время, которое шаги заняли бы на заданной скорости.
+        """
+        step = 1 if steps > 0 else -1
+        for _ in range(abs(steps)):
+            self.advance(step)
+        if steps:
+            self.update_physics(abs(steps) / (self.speed * self.microsteps), self.speed)
+
+    # Циклы шагов - генераторы: выдают момент следующего пробуждения
+    # (perf_counter_ns), а ждет его тот, кто выполняет цикл (drive() или
+    # цикл событий asyncio)
+
+    def run_loop(self):
+        """Непрерывное вращение: разгон, постоянная скорость, торможение.
+
+        Скорость и направление меняются на ходу командами set_speed() и
+        set_direction(): первая же команда прерывает разгон по таблице, а
+        дальше частота плавно (с ограниченным ускорением) идет к новой.
+        """
+        import planner
+        from scheduler import TableScheduler, VelocityScheduler
+
+        speed, acceleration, jerk = self.motion_limits()
+        ramp = planner.plan_ramp(speed, acceleration, jerk)
+        yield from self.execute(TableScheduler(ramp.times_ns()), live=True)
+        if self.running and not self.stop_requested:
+            # Продолжаем с текущей частоты разгона в фактическом направлении
+            sign = 1 if self.direction == "CW" else -1
+            scheduler = VelocityScheduler((self.motion_direction or sign) * self.step_rate,
+                                          sign * self.speed * self.microsteps, acceleration)
+            yield from self.execute(scheduler, live=True)
+        yield from self.decelerate(self.motion_direction or None)
+        self.finish()
+
+    def run_profile(self, profile):
+        """Выполнение готового профиля движения"""
+        from scheduler import TableScheduler
+
+        yield from self.execute(TableScheduler(profile.times_ns()), profile.direction)
+        yield from self.decelerate(profile.direction)
+        self.finish()
+
+    def decelerate(self, step=None):
+        """Торможение с текущей частоты шагов до нуля"""
+        if not self.running or not self.stop_requested or self.step_rate <= 0:
+            return
+        import planner
+        from scheduler import TableScheduler
+
+        rate = self.step_rate
+        _, acceleration, jerk = self.motion_limits()
+        ramp = planner.reverse_ramp(planner.plan_ramp(rate, acceleration, jerk), rate)
+        yield from self.execute(TableScheduler(ramp.times_ns()), step, interruptible=False)
+
+    def execute(self, scheduler, step=None, interruptible=True, live=False):
+        """Выдача шагов по расписанию планировщика.
+
+        live=True - цикл принимает команды из почтового ящика: планировщик
+        с живой скоростью получает их на каждом пробуждении, а остальные
+        прерываются, чтобы уступить ему.
+        """
+        self.scheduler = scheduler
+        next_report = time.perf_counter() + self.timing_period
+        next_physics = 0.0
+
+        backend = self.backend
+        while self.running and not scheduler.done:
+            if interruptible and self.stop_requested:
+                break
+            if live and self.commands:
+                if not scheduler.live:
+                    break
+                self.apply_commands(scheduler)
+            wake = scheduler.next_wake()
+            yield wake
+            collected = scheduler.collect(wake, time.perf_counter_ns())
+            direction = step or scheduler.direction or (1 if self.direction == "CW" else -1)
+            self.motion_direction = direction
+            count = 0
+            for _ in range(collected):
+                if not self.running:
+                    break
+                self.advance(direction)
+                count += 1
+
+            # Драйверу - одна пачка на пробуждение, а не запись на каждый шаг
+            rate = scheduler.rate
+            if rate != self.step_rate:
+                backend.set_speed(rate)
+            self.step_rate = rate
+            backend.steps(count, direction)
+            backend.flush()
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.record(count, direction, rate, self.current_step, self.microsteps)
+            journal = self.journal
+            if journal is not None:
+                journal.write(self.current_step, self.total_steps, self.microsteps)
+
+            # Шаги, на которые не хватает момента, ротор не отрабатывает
+            m = self.microsteps
+            was_stalled = self.stall.stalled
+            if self.stall.check(rate / m, count / m, self.load, self.microstep_mode):
+                self.true_step -= count * direction
+                self.missed_steps += count
+                if not was_stalled:
+                    self.notify("stall")
+
+            now = time.perf_counter()
+            if now >= next_physics:
+                next_physics = now + self.physics_period
+                self.update_physics()
+            if now >= next_report:
+                next_report += self.timing_period
+                self.publish_timing()
+
+    def apply_commands(self, scheduler):
+        """Передача команд из почтового ящика планировщику с живой скоростью"""
+        now = time.perf_counter_ns()
+        m = self.microsteps
+        target = scheduler.target
+        while self.commands:
+            command, value, sent = self.commands.popleft()
+            if command == "speed":
+                target = (-1 if target < 0 else 1) * value * m
+            elif command == "direction":
+                target = (1 if value == "CW" else -1) * abs(target)
+            self.latencies.append(now - sent)
+        scheduler.set_target(target)
+
+    def command_latency(self):
+        """Задержка от команды до ее применения циклом шагов (мкс)"""
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {}
+        return {
+            "commands": len(latencies),
+            "command_latency_mean_us": sum(latencies) / len(latencies) / 1000,
+            "command_latency_p99_us": latencies[int(len(latencies) * 0.99)] / 1000,
+            "command_latency_max_us": latencies[-1] / 1000,
+        }
+
+    def finish(self):
+        """Завершение цикла шагов"""
+        self.publish_timing()
+        self.backend.set_speed(0)
+        self.backend.flush()
+        if self.recorder is not None:
+            self.recorder.record(0, 0, 0.0, self.current_step, self.microsteps)
+            self.recorder.flush()
+        self.save_position()
+        self.update_physics()
+        self.commands.clear()
+        self.motion_direction = 0
+        if self.running:
+            self.running = False
+            self.step_rate = 0.0
+            self.update_physics(0.0)
+            self.notify("stop")
+
+    def publish_timing(self):
+        """Публикация статистики планировщика"""
+        if self.scheduler is not None:
+            self.timing = dict(self.scheduler.stats(), **self.command_latency())
+            self.notify("timing")
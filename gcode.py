@@ -0,0 +1,314 @@
+import math
+import queue
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import planner
+
+# Слово G-кода: буква и число, например X-12.5
+WORD = re.compile(r"([A-Z])\s*([-+]?(?:\d+\.?\d*|\.\d+))")
+
+
+def strip_comment(line):
+    """Удаление комментариев ( ... ) и ; ..."""
+    line = line.split(";", 1)[0]
+    if "(" in line:
+        line = re.sub(r"\([^)]*\)", " ", line)
+    return line.upper()
+
+
+def open_source(source):
+    """Построчный источник: путь к файлу, "-" (stdin), файл или итерируемое строк"""
+    if source == "-":
+        return sys.stdin
+    if isinstance(source, str):
+        return open(source, encoding="utf-8", errors="replace")
+    return source
+
+
+class Segment:
+    """Отрезок перемещения в пространстве шагов"""
+
+    __slots__ = ("deltas", "length", "major", "unit", "speed", "max_entry",
+                 "entry", "exit")
+
+    def __init__(self, deltas, speed):
+        self.deltas = deltas
+        self.length = float(np.sqrt((deltas.astype(np.float64) ** 2).sum()))
+        self.major = int(np.abs(deltas).max())
+        self.unit = deltas / self.length
+        self.speed = speed  # номинальная скорость по траектории, шагов/сек
+        self.max_entry = 0.0  # предел скорости на стыке с предыдущим отрезком
+        self.entry = 0.0
+        self.exit = 0.0
+
+
+class GCodeParser:
+    """Потоковый разбор подмножества G-кода в отрезки и паузы.
+
+    Поддерживаются G0/G1 (перемещение), G4 (пауза, P - мс, S - сек),
+    G90/G91 (абсолютные/относительные координаты) и F (подача, единиц/мин).
+    M- и T-команды пропускаются. Строки читаются по одной, поэтому память
+    не зависит от размера файла.
+    """
+
+    def __init__(self, axes="XYZ", steps_per_unit=1.0, feed=6000.0, rapid_speed=None):
+        self.axes = axes
+        self.steps_per_unit = steps_per_unit
+        self.feed = feed  # единиц/мин
+        self.rapid_speed = rapid_speed  # шагов/сек; None - максимальная
+        self.absolute = True
+        self.motion = 1  # G0/G1 - модальная команда
+        self.position = np.zeros(len(axes), dtype=np.int64)  # в шагах
+        self.line_number = 0
+
+    def parse(self, lines):
+        """Генератор команд: ("move", deltas, шагов/сек) и ("dwell", секунды)"""
+        for line in lines:
+            self.line_number += 1
+            words = WORD.findall(strip_comment(line))
+            if not words:
+                continue
+            try:
+                command = self.parse_words(words)
+            except ValueError as error:
+                raise ValueError(f"Строка {self.line_number}: {error}") from None
+            if command is not None:
+                yield command
+
+    def parse_words(self, words):
+        """Разбор одной строки"""
+        dwell = None
+        targets = {}
+        params = {}
+        for letter, value in words:
+            if letter == "G":
+                code = float(value)
+                if code in (0, 1):
+                    self.motion = int(code)
+                elif code == 4:
+                    dwell = True
+                elif code == 90:
+                    self.absolute = True
+                elif code == 91:
+                    self.absolute = False
+                else:
+                    raise ValueError(f"Неподдерживаемая команда G{value}")
+            elif letter in ("N", "M", "T"):
+                continue  # номера строк, шпиндель и инструмент не моделируются
+            elif letter == "F":
+                self.feed = float(value)
+            elif letter in self.axes:
+                targets[self.axes.index(letter)] = float(value)
+            else:
+                params[letter] = float(value)
+
+        if dwell:
+            seconds = params.get("P", 0.0) / 1000.0 if "P" in params else params.get("S", 0.0)
+            return ("dwell", seconds)
+        if not targets:
+            return None
+
+        position = self.position.copy()
+        for axis, value in targets.items():
+            steps = int(round(value * self.steps_per_unit))
+            position[axis] = steps if self.absolute else position[axis] + steps
+        deltas = position - self.position
+        self.position = position
+        if not deltas.any():
+            return None
+        if self.motion == 0 and self.rapid_speed is not None:
+            speed = self.rapid_speed
+        else:
+            speed = self.feed * self.steps_per_unit / 60.0
+        return ("move", deltas, speed)
+
+
+class LookaheadPlanner:
+    """Планировщик скоростей на стыках отрезков с упреждением.
+
+    Держит до lookahead отрезков. Скорость на стыке ограничена углом между
+    отрезками, а проходы назад и вперед гарантируют, что двигатель успеет
+    затормозить до нуля к концу буфера. Первый отрезок буфера выдается с
+    окончательными скоростями входа и выхода.
+    """
+
+    def __init__(self, acceleration, max_speed, lookahead=16):
+        self.acceleration = acceleration  # шагов/сек² по траектории
+        self.max_speed = max_speed  # шагов/сек по траектории
+        self.lookahead = lookahead
+        self.buffer = deque()
+        self.committed_exit = 0.0  # скорость выхода последнего выданного отрезка
+        self.previous_unit = None
+
+    def add(self, deltas, speed):
+        """Добавление отрезка; возвращает список готовых к выполнению"""
+        segment = Segment(deltas, min(speed, self.max_speed))
+        if self.previous_unit is not None and len(self.previous_unit) == len(segment.unit):
+            # Прямая - полная скорость, поворот на 90° и больше - остановка
+            cos_angle = float(np.dot(self.previous_unit, segment.unit))
+            previous_speed = self.buffer[-1].speed if self.buffer else segment.speed
+            segment.max_entry = max(0.0, cos_angle) * min(previous_speed, segment.speed)
+        self.previous_unit = segment.unit
+        self.buffer.append(segment)
+        self.replan()
+
+        ready = []
+        while len(self.buffer) > self.lookahead:
+            ready.append(self.pop())
+        return ready
+
+    def flush(self):
+        """Выдача всех отрезков с остановкой в конце (конец файла, пауза)"""
+        self.replan()
+        ready = []
+        while self.buffer:
+            ready.append(self.pop())
+        self.previous_unit = None
+        return ready
+
+    def pop(self):
+        """Выдача первого отрезка буфера"""
+        segment = self.buffer.popleft()
+        self.committed_exit = segment.exit
+        return segment
+
+    def replan(self):
+        """Пересчет скоростей входа/выхода по всему буферу"""
+        buffer = self.buffer
+        if not buffer:
+            return
+        accel2 = 2 * self.acceleration
+
+        # Проход назад: успеть затормозить до нуля к концу буфера
+        exit_speed = 0.0
+        for segment in reversed(buffer):
+            segment.exit = exit_speed
+            segment.entry = min(segment.max_entry, segment.speed,
+                                math.sqrt(exit_speed ** 2 + accel2 * segment.length))
+            exit_speed = segment.entry
+
+        # Проход вперед: разгон ограничен ускорением; вход первого
+        # отрезка уже определен выданным ранее отрезком
+        entry_speed = self.committed_exit
+        for i, segment in enumerate(buffer):
+            segment.entry = entry_speed
+            next_entry = buffer[i + 1].entry if i + 1 < len(buffer) else 0.0
+            segment.exit = min(next_entry, math.sqrt(entry_speed ** 2 + accel2 * segment.length))
+            entry_speed = segment.exit
+
+
+class GCodeRunner:
+    """Выполнение потока G-кода на многоосевом контроллере.
+
+    Разбор и планирование идут в отдельном потоке впереди выполнения и
+    передают готовые профили через очередь ограниченного размера, так что
+    файл любой длины выполняется в постоянной памяти.
+    """
+
+    def __init__(self, controller, source, axes="XYZ", steps_per_unit=1.0,
+                 acceleration=None, lookahead=16, queue_size=32):
+        if len(axes) != controller.axes:
+            raise ValueError(f"Осей в G-коде {len(axes)}, в контроллере {controller.axes}")
+        self.controller = controller
+        self.source = source
+        self.parser = GCodeParser(axes, steps_per_unit, rapid_speed=controller.speed)
+        self.planner = LookaheadPlanner(acceleration or controller.acceleration,
+                                        controller.speed, lookahead)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stop_requested = False
+        self.thread = None
+        self.error = None  # ошибка разбора при выполнении в фоновом потоке
+        self.stats = {"lines": 0, "segments": 0, "dwells": 0, "steps": 0}
+
+    # --- Подготовка (поток разбора) ---
+
+    def segment_job(self, segment):
+        """Профиль ведущей оси для отрезка"""
+        # Скорости по траектории переводим в шаги ведущей оси
+        ratio = segment.major / segment.length
+        profile = planner.plan_segment(segment.major, segment.speed * ratio,
+                                       self.planner.acceleration * ratio,
+                                       segment.entry * ratio, segment.exit * ratio)
+        return ("move", segment.deltas, profile)
+
+    def produce(self):
+        """Разбор и планирование с передачей готовых заданий в очередь"""
+        try:
+            lines = open_source(self.source)
+            try:
+                for command in self.parser.parse(lines):
+                    if self.stop_requested:
+                        break
+                    if command[0] == "move":
+                        _, deltas, speed = command
+                        ready = self.planner.add(deltas, speed)
+                    else:
+                        ready = self.planner.flush()
+                    for segment in ready:
+                        self.queue.put(self.segment_job(segment))
+                    if command[0] == "dwell":
+                        self.queue.put(command)
+                for segment in self.planner.flush():
+                    self.queue.put(self.segment_job(segment))
+            finally:
+                if lines is not self.source and lines is not sys.stdin:
+                    lines.close()
+                self.stats["lines"] = self.parser.line_number
+        except Exception as error:
+            self.queue.put(("error", error))
+        self.queue.put(None)
+
+    # --- Выполнение ---
+
+    def run(self):
+        """Выполнение всего потока в текущем потоке; возвращает статистику"""
+        self.stop_requested = False
+        producer = threading.Thread(target=self.produce, daemon=True)
+        producer.start()
+        controller = self.controller
+
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            if self.stop_requested or controller.stop_requested:
+                self.stop_requested = True
+                continue  # дочитываем очередь, чтобы поток разбора завершился
+            kind = job[0]
+            if kind == "error":
+                self.stop_requested = True
+                raise job[1]
+            if kind == "dwell":
+                time.sleep(job[1])
+                self.stats["dwells"] += 1
+            else:
+                _, deltas, profile = job
+                controller.move(deltas, threaded=False, profile=profile)
+                self.stats["segments"] += 1
+                self.stats["steps"] += len(profile)
+
+        producer.join()
+        return self.stats
+
+    def start(self):
+        """Выполнение в фоновом потоке; ошибка сохраняется в error"""
+        def work():
+            try:
+                self.run()
+            except Exception as error:
+                self.error = error
+
+        self.error = None
+        self.thread = threading.Thread(target=work, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Остановка: текущий отрезок тормозит, остальные отбрасываются"""
+        self.stop_requested = True
+        self.controller.stop()
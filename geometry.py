@@ -0,0 +1,51 @@
+import numpy as np
+
+
+def orbit_boxes(center_x, center_y, orbit, size, positions):
+    """Рамки (x1, y1, x2, y2) круга диаметра size на орбите для всех позиций"""
+    angles = np.arange(positions) * (2 * np.pi / positions)
+    x = center_x + orbit * np.cos(angles)
+    y = center_y + orbit * np.sin(angles)
+    half = size / 2
+    boxes = np.column_stack((x - half, y - half, x + half, y + half))
+    return [tuple(box) for box in boxes.round(2).tolist()]
+
+
+class RotorGeometry:
+    """Таблица координат магнитов и индикатора шага для всех положений ротора.
+
+    Положения считаются по индексу (шаг по модулю шагов на оборот), так что
+    отрисовка кадра сводится к выборке из таблиц без тригонометрии и без
+    чтения координат обратно из Tk. Таблица перестраивается только при
+    изменении размеров или разрешения (см. key).
+    """
+
+    MIN_POSITIONS = 3600  # не грубее 0.1° для плавной интерполяции
+
+    def __init__(self, center_x, center_y, radius, steps_per_rev,
+                 magnet_count=8, magnet_orbit=50, magnet_size=16, indicator_size=10):
+        self.key = (center_x, center_y, radius, steps_per_rev)
+        self.positions = steps_per_rev * max(1, self.MIN_POSITIONS // steps_per_rev)
+        self.magnet_count = magnet_count
+        # Магниты сдвинуты друг от друга на целое число позиций
+        self.magnet_offset = self.positions // magnet_count
+
+        self.magnet_boxes = orbit_boxes(center_x, center_y, magnet_orbit,
+                                        magnet_size, self.positions)
+        self.indicator_boxes = orbit_boxes(center_x, center_y, radius - 10,
+                                           indicator_size, self.positions)
+
+    def index(self, angle_deg):
+        """Индекс положения для угла ротора"""
+        return int(round(angle_deg * self.positions / 360.0)) % self.positions
+
+    def magnets(self, index):
+        """Рамки всех магнитов для положения index"""
+        boxes = self.magnet_boxes
+        positions = self.positions
+        return [boxes[(index + i * self.magnet_offset) % positions]
+                for i in range(self.magnet_count)]
+
+    def indicator(self, index):
+        """Рамка индикатора шага для положения index"""
+        return self.indicator_boxes[index]
@@ -0,0 +1,121 @@
+import mmap
+import os
+import struct
+import time
+import zlib
+
+# Слот: номер записи, позиция, пробег, микрошагов, CRC32 предыдущих полей
+SLOT = struct.Struct("<QqqII")
+SLOTS = 2
+
+
+class PositionJournal:
+    """Журнал позиции, переживающий аварийное завершение процесса.
+
+    Небольшой файл из двух слотов отображается в память. Записи идут по
+    очереди в слоты с возрастающим номером и контрольной суммой, поэтому
+    оборванная запись портит только один слот, а второй хранит
+    предыдущее согласованное состояние. Запись - копирование 32 байт в
+    страницу памяти без системных вызовов; данные переживают падение
+    процесса, а на диск (на случай отключения питания) сбрасываются не
+    чаще sync_period секунд.
+    """
+
+    def __init__(self, path, sync_period=1.0):
+        self.path = path
+        self.sync_period = sync_period
+        size = SLOT.size * SLOTS
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        state = self.recover()
+        self.seq = state[0] if state else 0
+        self.last_sync = time.monotonic()
+        self.writes = 0
+
+    def read_slot(self, index):
+        """Содержимое слота или None, если слот пуст или поврежден"""
+        seq, position, total, microsteps, crc = SLOT.unpack_from(self.map, index * SLOT.size)
+        body = self.map[index * SLOT.size:(index + 1) * SLOT.size - 4]
+        if seq == 0 or zlib.crc32(body) != crc:
+            return None
+        return seq, position, total, microsteps
+
+    def recover(self):
+        """Последнее согласованное состояние: (номер, позиция, пробег, микрошагов) или None"""
+        slots = [slot for slot in map(self.read_slot, range(SLOTS)) if slot]
+        return max(slots) if slots else None
+
+    def write(self, position, total, microsteps):
+        """Сохранение состояния в следующий слот"""
+        self.seq += 1
+        offset = (self.seq % SLOTS) * SLOT.size
+        body = SLOT.pack(self.seq, position, total, microsteps, 0)[:-4]
+        self.map[offset:offset + SLOT.size] = body + zlib.crc32(body).to_bytes(4, "little")
+        self.writes += 1
+
+        now = time.monotonic()
+        if now - self.last_sync >= self.sync_period:
+            self.last_sync = now
+            self.map.flush()
+
+    def close(self):
+        """Сброс на диск и закрытие"""
+        self.map.flush()
+        self.map.close()
+
+
+def benchmark(steps=1_000_000, path="journal-benchmark.bin", rounds=5):
+    """Частота шагов двигателя без журнала и с журналом (шагов/сек).
+
+    Журнал пишется раз за пробуждение цикла шагов, а не на каждый шаг, и
+    разница частот двух прогонов (slowdown_percent) меньше разброса между
+    прогонами в одном процессе (±5-15 %). Поэтому доля журнала во времени
+    движения (journal_percent) считается и по числу записей и стоимости
+    одной записи.
+    """
+    from engine import StepperMotorEngine
+
+    def run(journal):
+        engine = StepperMotorEngine(speed=10 ** 7)
+        engine.acceleration = 10 ** 9
+        if journal is not None:
+            engine.set_journal(journal)
+        start = time.perf_counter()
+        engine.move(steps, threaded=False)
+        return steps / (time.perf_counter() - start)
+
+    run(None)  # прогрев: таблицы и кеши режимов
+    results = {"without_journal": 0.0, "with_journal": 0.0}
+    journal = PositionJournal(path)
+    for _ in range(rounds):  # лучший из rounds, варианты чередуются
+        results["without_journal"] = max(results["without_journal"], run(None))
+        results["with_journal"] = max(results["with_journal"], run(journal))
+    results["journal_writes"] = journal.writes
+    journal.close()
+    os.remove(path)
+
+    # Стоимость одной записи отдельно от цикла шагов
+    journal = PositionJournal(path)
+    count = 200000
+    start = time.perf_counter()
+    for i in range(count):
+        journal.write(i, i, 1)
+    results["write_us"] = (time.perf_counter() - start) / count * 1e6
+    journal.close()
+    os.remove(path)
+
+    results["slowdown_percent"] = 100 * (1 - results["with_journal"] / results["without_journal"])
+    writes = results["journal_writes"] / rounds  # записей за одно перемещение
+    moving = steps / results["with_journal"]
+    results["journal_percent"] = 100 * writes * results["write_us"] / 1e6 / moving
+    return results
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(benchmark(), indent=2))
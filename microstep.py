@@ -0,0 +1,84 @@
+import math
+from functools import lru_cache
+
+# Режимы шага: число микрошагов на полный шаг и название для интерфейса
+MODES = {
+    "WAVE": (1, "ВОЛНОВОЙ"),
+    "FULL": (1, "ПОЛНЫЙ ШАГ"),
+    "HALF": (2, "ПОЛУШАГ"),
+    "1/4": (4, "1/4 ШАГА"),
+    "1/8": (8, "1/8 ШАГА"),
+    "1/16": (16, "1/16 ШАГА"),
+    "1/32": (32, "1/32 ШАГА"),
+    "1/64": (64, "1/64 ШАГА"),
+    "1/128": (128, "1/128 ШАГА"),
+    "1/256": (256, "1/256 ШАГА"),
+}
+
+
+def microsteps(mode):
+    """Число микрошагов на полный шаг"""
+    if mode not in MODES:
+        raise ValueError(f"Неизвестный режим шага: {mode}")
+    return MODES[mode][0]
+
+
+def mode_name(mode):
+    """Название режима для интерфейса"""
+    return MODES[mode][1]
+
+
+@lru_cache(maxsize=None)
+def phase_table(mode):
+    """Токи фаз A и B на электрический период (4 полных шага).
+
+    Возвращает кортеж из 4 * microsteps пар (A, B) со значениями от -1
+    до 1. Таблица строится один раз для каждого режима и без NumPy, чтобы
+    двигатель в полношаговом режиме запускался без его импорта.
+    """
+    count = 4 * microsteps(mode)
+    table = []
+    for i in range(count):
+        theta = i * (2 * math.pi / count)
+        if mode == "FULL":
+            # Обе фазы включены, вектор тока смещен на 45°
+            a = math.copysign(1.0, math.cos(theta + math.pi / 4))
+            b = math.copysign(1.0, math.sin(theta + math.pi / 4))
+        elif mode == "HALF":
+            # Чередование одной и двух включенных фаз без компенсации момента
+            a = max(-1.0, min(1.0, float(round(math.sqrt(2) * math.cos(theta)))))
+            b = max(-1.0, min(1.0, float(round(math.sqrt(2) * math.sin(theta)))))
+        else:
+            # Волновой режим и микрошаг: синус/косинус
+            a, b = math.cos(theta), math.sin(theta)
+        table.append((0.0 if abs(a) < 1e-12 else a, 0.0 if abs(b) < 1e-12 else b))
+    return tuple(table)
+
+
+@lru_cache(maxsize=None)
+def coil_table(mode):
+    """Интенсивность четырех катушек (0..1) для каждого микрошага.
+
+    Катушки 1 и 3 - фаза A с противоположной полярностью, 2 и 4 - фаза B.
+    Результат - кортеж кортежей, чтобы шаг стоил одного индексирования.
+    """
+    return tuple((max(0.0, a), max(0.0, b), max(0.0, -a), max(0.0, -b))
+                 for a, b in phase_table(mode))
+
+
+@lru_cache(maxsize=None)
+def loss_factor(mode):
+    """Средние потери в меди за период в долях I²R одной фазы.
+
+    Полный шаг держит обе фазы включенными (2), волновой режим и микрошаг
+    с синусоидальными токами - 1, полушаг чередует одну и две фазы (1.5).
+    """
+    table = phase_table(mode)
+    return sum(a * a + b * b for a, b in table) / len(table)
+
+
+@lru_cache(maxsize=None)
+def torque_factor(mode):
+    """Средний момент режима относительно полного шага (обе фазы включены)"""
+    table = phase_table(mode)
+    return sum(math.hypot(a, b) for a, b in table) / len(table) / math.sqrt(2)
@@ -0,0 +1,150 @@
+import threading
+
+import numpy as np
+
+import planner
+from engine import Observable
+from scheduler import TableScheduler
+
+
+class MultiAxisController(Observable):
+    """Согласованное управление N осями.
+
+    Состояние осей хранится в массивах NumPy. Перемещение строится как
+    отрезок: профиль разгона/торможения планируется для ведущей оси (с
+    наибольшим числом шагов), а шаги остальных осей распределяются по
+    алгоритму Брезенхема (DDA), так что все оси стартуют и финишируют
+    одновременно. Все оси обслуживает один поток.
+    """
+
+    def __init__(self, axes=3, speed=100, acceleration=2000, jerk=None):
+        super().__init__()
+        self.axes = axes
+        self.positions = np.zeros(axes, dtype=np.int64)
+        self.total_steps = np.zeros(axes, dtype=np.int64)
+
+        # Ограничения для ведущей оси (шагов/сек, шагов/сек², шагов/сек³)
+        self.speed = speed
+        self.acceleration = acceleration
+        self.jerk = jerk
+
+        self.running = False
+        self.stop_requested = False
+        self.step_rate = 0.0
+        self.thread = None
+        self.scheduler = None
+        self.timing = {}
+
+        # Текущее перемещение
+        self.line_start = self.positions.copy()
+        self.line_delta = np.zeros(axes, dtype=np.int64)
+        self.line_major = 0
+        self.line_index = 0  # шагов ведущей оси выполнено
+
+    # --- Геометрия отрезка ---
+
+    @staticmethod
+    def line_positions(start, delta, major, index):
+        """Положения осей после index шагов ведущей оси (index - число или вектор)"""
+        index = np.asarray(index, dtype=np.int64)[..., None]
+        return start + np.sign(delta) * (np.abs(delta) * index // major)
+
+    # --- Управление ---
+
+    def move(self, deltas, threaded=True, profile=None):
+        """Согласованное перемещение на deltas шагов по каждой оси.
+
+        profile - готовый профиль ведущей оси (например, из планировщика
+        с упреждением); по умолчанию строится разгон и торможение до нуля.
+        """
+        deltas = np.asarray(deltas, dtype=np.int64)
+        if deltas.shape != (self.axes,):
+            raise ValueError(f"Ожидается {self.axes} значений, получено {deltas.size}")
+        major = int(np.abs(deltas).max()) if self.axes else 0
+        if major == 0 or self.running:
+            return False
+        if profile is None:
+            profile = planner.plan_move(major, self.speed, self.acceleration, self.jerk)
+        elif len(profile) != major:
+            raise ValueError("Профиль не совпадает с числом шагов ведущей оси")
+
+        self.line_start = self.positions.copy()
+        self.line_delta = deltas
+        self.line_major = major
+        self.line_index = 0
+
+        self.running = True
+        self.stop_requested = False
+        self.notify("start")
+        if threaded:
+            self.thread = threading.Thread(target=self.run_move, args=(profile,), daemon=True)
+            self.thread.start()
+        else:
+            self.run_move(profile)
+        return True
+
+    def move_to(self, targets, threaded=True):
+        """Согласованное перемещение в абсолютные положения targets"""
+        targets = np.asarray(targets, dtype=np.int64)
+        if targets.shape != (self.axes,):
+            raise ValueError(f"Ожидается {self.axes} значений, получено {targets.size}")
+        return self.move(targets - self.positions, threaded)
+
+    def stop(self, immediate=False):
+        """Остановка: с торможением вдоль отрезка или немедленно"""
+        if not self.running:
+            return
+        if immediate:
+            self.running = False
+            self.step_rate = 0.0
+            self.notify("stop")
+        else:
+            self.stop_requested = True
+
+    def reset(self):
+        """Сброс положений и счетчиков всех осей"""
+        self.stop(immediate=True)
+        self.positions[:] = 0
+        self.total_steps[:] = 0
+        self.notify("reset")
+
+    def simulate(self, moves):
+        """Мгновенное выполнение перемещений (массив M x N) без задержек"""
+        moves = np.asarray(moves, dtype=np.int64).reshape(-1, self.axes)
+        self.positions += moves.sum(axis=0)
+        self.total_steps += np.abs(moves).sum(axis=0)
+        self.notify("step")
+
+    # --- Цикл шагов ---
+
+    def run_move(self, profile):
+        """Выполнение отрезка по профилю ведущей оси"""
+        self.execute(TableScheduler(profile.times_ns()))
+
+        if self.running and self.stop_requested and self.step_rate > 0:
+            # Торможение продолжает тот же отрезок и укладывается в его остаток:
+            # у конца отрезка оно круче заданного ускорения, но до нуля
+            remaining = self.line_major - self.line_index
+            ramp = planner.plan_stop(self.step_rate, remaining, self.acceleration, self.jerk)
+            self.execute(TableScheduler(ramp.times_ns()), interruptible=False)
+
+        self.timing = self.scheduler.stats()
+        if self.running:
+            self.running = False
+            self.step_rate = 0.0
+            self.notify("stop")
+
+    def execute(self, scheduler, interruptible=True):
+        """Выдача шагов ведущей оси по расписанию с распределением по осям"""
+        self.scheduler = scheduler
+        while self.running and not scheduler.done:
+            if interruptible and self.stop_requested:
+                break
+            count = scheduler.wait()
+            self.line_index = min(self.line_index + count, self.line_major)
+            positions = self.line_positions(self.line_start, self.line_delta,
+                                            self.line_major, self.line_index)
+            self.total_steps += np.abs(positions - self.positions)
+            self.positions = positions
+            self.step_rate = scheduler.rate
+            self.notify("step")
@@ -0,0 +1,304 @@
+import math
+from types import SimpleNamespace
+
+import microstep
+
+FULL_STEPS_PER_CYCLE = 4  # полных шагов на электрический период
+
+# Функции NumPy, которые нужны модели, для обычных чисел
+SCALAR = SimpleNamespace(abs=abs, sqrt=math.sqrt, hypot=math.hypot, maximum=max, minimum=min,
+                         asarray=lambda value, dtype=float: dtype(value),
+                         where=lambda condition, value, other: value if condition else other)
+
+
+def numeric(value):
+    """Модуль функций для value: SCALAR для чисел, NumPy для массивов.
+
+    Двигатель считает модель по одному числу за обновление, и без
+    массивов NumPy даже не импортируется.
+    """
+    if isinstance(value, (int, float)):
+        return SCALAR
+    import numpy as np
+    return np
+
+
+class MotorModel:
+    """Тепловая и электрическая модель шагового двигателя.
+
+    Параметры задаются по паспорту двигателя (по умолчанию - типичный
+    NEMA 17, 1.7 А). Тепловая модель - одна RC-цепь: теплоемкость обмоток
+    и корпуса C и тепловое сопротивление до окружающей среды R, так что
+    температура экспоненциально стремится к T_окр + P·R с постоянной
+    времени R·C и остывает после остановки.
+
+    Ток фазы на скорости ограничен напряжением питания за вычетом
+    противо-ЭДС и импедансом обмотки; момент пропорционален току, отсюда
+    кривая момент-скорость. Все функции скорости принимают числа и массивы
+    NumPy; числа считаются без NumPy (см. numeric()).
+    """
+
+    def __init__(self, rated_current=1.7, resistance=1.5, inductance=0.0028,
+                 holding_torque=0.44, supply_voltage=24.0, hold_current=0.5,
+                 thermal_resistance=4.0, heat_capacity=130.0, ambient=25.0,
+                 max_temperature=100.0, iron_loss=0.002, steps_per_rev=200,
+                 rotor_inertia=54e-7, load_inertia=0.0):
+        self.rated_current = rated_current  # А на фазу
+        self.resistance = resistance  # Ом на фазу
+        self.inductance = inductance  # Гн на фазу
+        self.holding_torque = holding_torque  # Н·м при номинальном токе
+        self.supply_voltage = supply_voltage  # В
+        self.hold_current = hold_current  # доля тока при удержании
+        self.thermal_resistance = thermal_resistance  # °C/Вт
+        self.heat_capacity = heat_capacity  # Дж/°C
+        self.ambient = ambient  # °C
+        self.max_temperature = max_temperature  # °C, предел изоляции
+        self.iron_loss = iron_loss  # Вт на полный шаг/сек (вихревые токи, гистерезис)
+        self.steps_per_rev = steps_per_rev  # полных шагов на оборот
+        self.rotor_inertia = rotor_inertia  # кг·м²
+        self.load_inertia = load_inertia  # кг·м², приведенный к валу
+
+    @property
+    def time_constant(self):
+        """Тепловая постоянная времени, сек"""
+        return self.thermal_resistance * self.heat_capacity
+
+    @property
+    def torque_constant(self):
+        """Н·м/А на фазу (равна постоянной противо-ЭДС фазы, В·с/рад).
+
+        Удерживающий момент из паспорта - при двух включенных фазах, то
+        есть при векторе тока в √2 раз больше тока фазы.
+        """
+        return self.holding_torque / (self.rated_current * math.sqrt(2))
+
+    # --- Электрическая часть ---
+
+    def phase_current(self, speed):
+        """Амплитуда тока фазы (А) на скорости speed полных шагов/сек"""
+        xp = numeric(speed)
+        speed = xp.abs(xp.asarray(speed, dtype=float))
+        omega_e = 2 * math.pi * speed / FULL_STEPS_PER_CYCLE
+        omega_m = 2 * math.pi * speed / self.steps_per_rev
+        # Противо-ЭДС сдвинута относительно тока, на обмотку остается
+        # квадратурная разность напряжений
+        back_emf = self.torque_constant * omega_m
+        voltage = xp.sqrt(xp.maximum(self.supply_voltage ** 2 - back_emf ** 2, 0.0))
+        impedance = xp.hypot(self.resistance, omega_e * self.inductance)
+        current = xp.minimum(self.rated_current, voltage / impedance)
+        # На месте драйвер снижает ток удержания
+        return xp.where(speed > 0, current, self.rated_current * self.hold_current)
+
+    def torque(self, speed, mode="FULL"):
+        """Доступный (срывной) момент, Н·м, на скорости speed"""
+        return (self.holding_torque * self.phase_current(speed) / self.rated_current
+                * microstep.torque_factor(mode))
+
+    def losses(self, speed, mode="FULL"):
+        """Тепловые потери, Вт: медь обмоток и сталь"""
+        xp = numeric(speed)
+        speed = xp.abs(xp.asarray(speed, dtype=float))
+        current = self.phase_current(speed)
+        return current ** 2 * self.resistance * microstep.loss_factor(mode) + self.iron_loss * speed
+
+    def power(self, speed, load=0.0, mode="FULL"):
+        """Потребляемая мощность, Вт: потери плюс механическая мощность нагрузки"""
+        xp = numeric(speed)
+        omega_m = 2 * math.pi * xp.abs(xp.asarray(speed, dtype=float)) / self.steps_per_rev
+        return self.losses(speed, mode) + load * omega_m
+
+    # --- Механическая часть ---
+
+    def required_torque(self, speed, acceleration, load=0.0):
+        """Момент, нужный для разгона с acceleration (полных шагов/сек²) под нагрузкой.
+
+        Нагрузка противодействует движению; при торможении инерция ей
+        помогает, пока замедление не превысит то, что дает сама нагрузка.
+        """
+        xp = numeric(acceleration)
+        inertia = self.rotor_inertia + self.load_inertia
+        alpha = xp.asarray(acceleration, dtype=float) * (2 * math.pi / self.steps_per_rev)
+        return xp.abs(load + inertia * alpha)
+
+    def pull_in_rate(self, load=0.0, mode="FULL"):
+        """Оценка частоты старт-стоп (полных шагов/сек): ротор успевает за
+        первым шагом с места без разгона"""
+        spare = float(self.torque(0.0, mode)) / self.hold_current - load
+        if spare <= 0:
+            return 0.0
+        inertia = self.rotor_inertia + self.load_inertia
+        return math.sqrt(spare * self.steps_per_rev / (2 * math.pi * inertia)) / 2
+
+    # --- Тепловая часть ---
+
+    def steady_temperature(self, speed, mode="FULL"):
+        """Установившаяся температура при постоянной скорости"""
+        return self.ambient + self.losses(speed, mode) * self.thermal_resistance
+
+    def heat(self, temperature, speed, dt, mode="FULL"):
+        """Температура через dt сек при постоянной скорости (точное решение RC)"""
+        target = self.steady_temperature(speed, mode)
+        return target + (temperature - target) * math.exp(-dt / self.time_constant)
+
+    def integrate(self, durations, speeds, temperature=None, mode="FULL"):
+        """Температура в конце каждого отрезка цикла работы.
+
+        durations и speeds - массивы: длительность отрезка (сек) и скорость
+        на нем (полных шагов/сек). Рекуррентность T[i+1] = a[i]·T[i] + b[i]
+        решается через накопленные произведения без цикла по отрезкам, так
+        что сутки с шагом в секунду считаются за миллисекунды. Экстремумы
+        температуры внутри отрезка лежат на его концах (экспонента
+        монотонна), поэтому этих значений достаточно для проверки пределов.
+        """
+        import numpy as np
+
+        durations = np.asarray(durations, dtype=np.float64)
+        rise = self.losses(speeds, mode) * self.thermal_resistance  # к T_окр
+        rise = np.broadcast_to(rise, durations.shape)
+        y = (self.ambient if temperature is None else temperature) - self.ambient
+
+        decay = np.cumsum(durations) / self.time_constant  # -ln(произведения a)
+        result = np.empty_like(durations)
+        # Блоки, в которых exp(decay) не переполняется
+        start = 0
+        while start < len(durations):
+            base = decay[start - 1] if start else 0.0
+            end = int(np.searchsorted(decay, base + 600.0, side="right"))
+            end = max(end, start + 1)
+            local = decay[start:end] - base
+            before = np.concatenate(([0.0], local[:-1]))  # затухание к началу отрезка
+            # y[n] = e^-L[n] · (y0 + Σ b[k]·e^L[k]),  b[k] = rise·(1 - a[k])
+            weights = rise[start:end] * (np.exp(local) - np.exp(before))
+            result[start:end] = np.exp(-local) * (y + np.cumsum(weights))
+            y = result[end - 1]
+            start = end
+        return result + self.ambient
+
+    def check(self, durations, speeds, temperature=None, mode="FULL"):
+        """Проверка цикла работы на перегрев"""
+        import numpy as np
+
+        durations = np.asarray(durations, dtype=np.float64)
+        temperatures = self.integrate(durations, speeds, temperature, mode)
+        over = temperatures > self.max_temperature
+        peak = int(temperatures.argmax()) if len(temperatures) else 0
+        return {
+            "max_temperature": float(temperatures[peak]) if len(temperatures) else self.ambient,
+            "max_at": float(durations[:peak + 1].sum()),
+            "final_temperature": float(temperatures[-1]) if len(temperatures) else self.ambient,
+            "seconds_over_limit": float(durations[over].sum()),
+            "ok": not over.any(),
+        }
+
+
+def profile_duty(profile, microsteps=1, resolution=0.1):
+    """Цикл работы (длительности, скорости) из профиля движения.
+
+    Шаги профиля раскладываются по интервалам resolution сек; скорость на
+    интервале - число шагов в нем, переведенное в полные шаги/сек.
+    """
+    import numpy as np
+
+    times = np.asarray(profile.times, dtype=np.float64)
+    if len(times) == 0:
+        return np.zeros(0), np.zeros(0)
+    counts = np.bincount((times // resolution).astype(np.int64))
+    durations = np.full(len(counts), resolution)
+    return durations, counts / (resolution * microsteps)
+
+
+TORQUE_TABLES = {}
+
+
+class StallDetector:
+    """Предсказание пропуска шагов в цикле шагов.
+
+    Момент, нужный для текущей частоты и ускорения, сравнивается с
+    доступным моментом по кривой момент-скорость. Кривая заранее сведена в
+    таблицу с шагом 1 полный шаг/сек, поэтому проверка пачки шагов - пара
+    арифметических действий и индексирование. После срыва ротор стоит,
+    пока заданная частота не опустится до частоты старт-стоп.
+    """
+
+    def __init__(self, model, max_speed=20000):
+        self.model = model
+        self.max_speed = max_speed
+        self.tables = {}
+        self.stalled = False
+        self.previous_rate = 0.0
+
+    def table(self, mode):
+        """Доступный момент на скоростях 0..max_speed полных шагов/сек"""
+        table = self.tables.get(mode)
+        if table is None:
+            # Таблицы общие для всех детекторов с одинаковыми параметрами двигателя
+            key = (tuple(sorted(vars(self.model).items())), mode, self.max_speed)
+            table = TORQUE_TABLES.get(key)
+            if table is None:
+                import numpy as np
+
+                speeds = np.arange(self.max_speed + 1, dtype=np.float64)
+                speeds[0] = 1e-9  # у ротора в движении нет снижения тока удержания
+                table = TORQUE_TABLES[key] = self.model.torque(speeds, mode).tolist()
+            self.tables[mode] = table
+        return table
+
+    def reset(self):
+        """Сброс состояния (ротор стоит, синхронизирован)"""
+        self.stalled = False
+        self.previous_rate = 0.0
+
+    def check(self, rate, count, load=0.0, mode="FULL"):
+        """Теряются ли count шагов, выданных с частотой rate (полных шагов/сек)"""
+        previous = self.previous_rate
+        self.previous_rate = rate
+        if count <= 0 or rate <= 0:
+            return False
+        table = self.table(mode)
+        available = table[min(int(rate), self.max_speed)]
+        # Ускорение за время пачки: count шагов заняли count / rate сек
+        acceleration = (rate - previous) * rate / count
+        model = self.model
+        required = abs(load + (model.rotor_inertia + model.load_inertia)
+                       * acceleration * (2 * math.pi / model.steps_per_rev))
+        if required > available:
+            self.stalled = True
+        elif self.stalled and rate <= self.model.pull_in_rate(load, mode):
+            self.stalled = False
+        return self.stalled
+
+
+def predict_stalls(model, profile, microsteps=1, load=0.0, mode="FULL"):
+    """Пропуски шагов по всему профилю движения без цикла по шагам.
+
+    Возвращает словарь: маска потерянных шагов lost, заданная и
+    фактическая позиция после каждого шага (в микрошагах), число
+    потерянных шагов и время первого срыва (None - срывов нет).
+    """
+    import numpy as np
+
+    intervals = np.asarray(profile.intervals, dtype=np.float64)
+    n = len(intervals)
+    rates = 1.0 / np.maximum(intervals, 1e-9) / microsteps  # полных шагов/сек
+    previous = np.concatenate(([0.0], rates[:-1]))
+    acceleration = (rates - previous) / np.maximum(intervals, 1e-9)
+
+    over = model.required_torque(rates, acceleration, load) > model.torque(rates, mode)
+    recover = ~over & (rates <= model.pull_in_rate(load, mode))
+    # Шаг потерян, если после последнего превышения момента еще не было
+    # шага, с которого ротор может снова подхватить поле
+    index = np.arange(n)
+    last_over = np.maximum.accumulate(np.where(over, index, -1))
+    last_recover = np.maximum.accumulate(np.where(recover, index, -1))
+    lost = last_over > last_recover
+
+    commanded = np.cumsum(np.full(n, profile.direction, dtype=np.int64))
+    true = np.cumsum(np.where(lost, 0, profile.direction).astype(np.int64))
+    first = int(lost.argmax()) if lost.any() else None
+    return {
+        "lost": lost,
+        "commanded": commanded,
+        "true": true,
+        "missed_steps": int(lost.sum()),
+        "first_stall": None if first is None else float(profile.times[first]),
+    }
@@ -0,0 +1,217 @@
+import math
+
+import numpy as np
+
+
+class MotionProfile:
+    """Готовый профиль движения: таблица интервалов между шагами.
+
+    intervals[i] - время (сек) от шага i-1 до шага i, times[i] - время
+    шага i от начала движения. Во время работы цикл шагов только читает
+    эти таблицы.
+    """
+
+    def __init__(self, times, direction=1):
+        self.times = times
+        self.direction = direction  # +1 - по часовой, -1 - против
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def steps(self):
+        """Число шагов со знаком направления"""
+        return self.direction * len(self.times)
+
+    @property
+    def intervals(self):
+        """Интервалы между шагами (сек)"""
+        return np.diff(self.times, prepend=0.0)
+
+    @property
+    def duration(self):
+        """Длительность движения (сек)"""
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    @property
+    def peak_speed(self):
+        """Максимальная скорость профиля (шагов/сек)"""
+        if len(self.times) == 0:
+            return 0.0
+        return float(1.0 / self.intervals.min())
+
+    def times_ns(self):
+        """Времена шагов в наносекундах (для планировщика)"""
+        return np.rint(self.times * 1e9).astype(np.int64)
+
+
+def scurve_timing(speed, acceleration, jerk):
+    """Длительности фаз разгона S-кривой: (нарастание ускорения, постоянное ускорение)"""
+    t_jerk = min(acceleration / jerk, math.sqrt(speed / jerk))
+    t_const = max(0.0, speed / acceleration - t_jerk)
+    return t_jerk, t_const
+
+
+def accel_distance(speed, acceleration, jerk=None):
+    """Путь разгона с нуля до speed (шагов)"""
+    if jerk is None:
+        return speed * speed / (2.0 * acceleration)
+    t_jerk, t_const = scurve_timing(speed, acceleration, jerk)
+    # Симметричная S-кривая: средняя скорость разгона равна speed / 2
+    return speed * (2 * t_jerk + t_const) / 2.0
+
+
+def reachable_speed(steps, max_speed, acceleration, jerk=None):
+    """Максимальная скорость, достижимая на перемещении в steps шагов"""
+    if 2 * accel_distance(max_speed, acceleration, jerk) <= steps:
+        return float(max_speed)
+    if jerk is None:
+        return math.sqrt(acceleration * steps)
+    low, high = 0.0, float(max_speed)
+    for _ in range(60):
+        mid = (low + high) / 2
+        if 2 * accel_distance(mid, acceleration, jerk) <= steps:
+            low = mid
+        else:
+            high = mid
+    return low
+
+
+def scurve_velocity(t, speed, acceleration, jerk):
+    """Скорость S-кривой разгона в моменты t (вектор)"""
+    t_jerk, t_const = scurve_timing(speed, acceleration, jerk)
+    t_accel = 2 * t_jerk + t_const
+    peak_accel = jerk * t_jerk
+    t = np.clip(t, 0.0, t_accel)
+    return np.where(
+        t < t_jerk, jerk * t * t / 2,
+        np.where(t < t_jerk + t_const,
+                 jerk * t_jerk * t_jerk / 2 + peak_accel * (t - t_jerk),
+                 speed - jerk * (t_accel - t) ** 2 / 2))
+
+
+def accel_times(distances, speed, acceleration, jerk=None):
+    """Время достижения пути distances (вектор) при разгоне с нуля до speed"""
+    if jerk is None:
+        return np.sqrt(2 * distances / acceleration)
+
+    # S-кривая: положение интегрируем на мелкой сетке времени и обращаем
+    t_jerk, t_const = scurve_timing(speed, acceleration, jerk)
+    t_accel = 2 * t_jerk + t_const
+    samples = int(min(max(4 * len(distances), 4096), 1 << 20))
+    t = np.linspace(0.0, t_accel, samples)
+    v = scurve_velocity(t, speed, acceleration, jerk)
+    position = np.empty(samples)
+    position[0] = 0.0
+    np.cumsum((v[1:] + v[:-1]) * (t_accel / (samples - 1) / 2), out=position[1:])
+    position *= accel_distance(speed, acceleration, jerk) / position[-1]
+    return np.interp(distances, position, t)
+
+
+def plan_move(steps, max_speed, acceleration, jerk=None):
+    """Профиль перемещения на steps шагов (знак - направление).
+
+    Без jerk строится трапеция, с jerk - S-кривая с ограничением рывка.
+    Скорость начинается и заканчивается в нуле.
+    """
+    if max_speed <= 0 or acceleration <= 0 or (jerk is not None and jerk <= 0):
+        raise ValueError("Скорость, ускорение и рывок должны быть положительными")
+    direction = 1 if steps >= 0 else -1
+    n = abs(int(steps))
+    if n == 0:
+        return MotionProfile(np.zeros(0), direction)
+
+    speed = reachable_speed(n, max_speed, acceleration, jerk)
+    s_accel = min(accel_distance(speed, acceleration, jerk), n / 2)
+    t_accel = float(accel_times(np.array([s_accel]), speed, acceleration, jerk)[0])
+    total = 2 * t_accel + (n - 2 * s_accel) / speed
+
+    # Фазы по положению: разгон s <= s_accel, торможение n - s < s_accel
+    n_accel = int(math.floor(s_accel))
+    n_decel = int(math.ceil(s_accel))
+    ramp = accel_times(np.arange(0, n_decel + 1, dtype=np.float64), speed, acceleration, jerk)
+
+    times = np.empty(n)
+    times[:n_accel] = ramp[1:n_accel + 1]
+    cruise = np.arange(n_accel + 1, n - n_decel + 1, dtype=np.float64)
+    times[n_accel:n - n_decel] = t_accel + (cruise - s_accel) / speed
+    times[n - n_decel:] = total - ramp[n_decel - 1::-1]
+    return MotionProfile(times, direction)
+
+
+def plan_ramp(speed, acceleration, jerk=None):
+    """Таблица разгона с нуля до speed; для торможения читается с конца"""
+    if speed <= 0 or acceleration <= 0 or (jerk is not None and jerk <= 0):
+        raise ValueError("Скорость, ускорение и рывок должны быть положительными")
+    n = int(accel_distance(speed, acceleration, jerk))
+    distances = np.arange(1, n + 1, dtype=np.float64)
+    return MotionProfile(accel_times(distances, speed, acceleration, jerk))
+
+
+def reverse_ramp(ramp, speed):
+    """Таблица торможения со скорости speed до нуля из таблицы разгона"""
+    if len(ramp) == 0:
+        return ramp
+    # Интервалы разгона в обратном порядке; первый шаг - на крейсерской скорости
+    intervals = ramp.intervals[::-1]
+    intervals = np.concatenate(([1.0 / speed], intervals[:-1]))
+    return MotionProfile(np.cumsum(intervals), ramp.direction)
+
+
+def plan_stop(speed, steps, acceleration, jerk=None):
+    """Таблица торможения со скорости speed до нуля не длиннее steps шагов.
+
+    Если торможение с заданными ограничениями не укладывается в steps
+    шагов, ускорение увеличивается ровно настолько, чтобы уложиться, а
+    когда не хватает и этого - рывок не ограничивается (трапеция).
+    """
+    if steps <= 0:
+        return MotionProfile(np.zeros(0))
+    if accel_distance(speed, acceleration, jerk) > steps:
+        if jerk is not None and speed * math.sqrt(speed / jerk) < steps:
+            high = acceleration
+            while accel_distance(speed, high, jerk) > steps:
+                high *= 2
+            low = acceleration
+            for _ in range(60):
+                mid = (low + high) / 2
+                if accel_distance(speed, mid, jerk) > steps:
+                    low = mid
+                else:
+                    high = mid
+            acceleration = high
+        else:
+            jerk = None
+            acceleration = speed * speed / (2.0 * steps)
+    return reverse_ramp(plan_ramp(speed, acceleration, jerk), speed)
+
+
+def plan_segment(steps, max_speed, acceleration, entry_speed=0.0, exit_speed=0.0):
+    """Профиль отрезка с ненулевыми скоростями входа и выхода (трапеция).
+
+    Используется при сшивке отрезков: двигатель проходит стык на скорости
+    entry_speed/exit_speed, не останавливаясь.
+    """
+    if max_speed <= 0 or acceleration <= 0:
+        raise ValueError("Скорость и ускорение должны быть положительными")
+    direction = 1 if steps >= 0 else -1
+    n = abs(int(steps))
+    if n == 0:
+        return MotionProfile(np.zeros(0), direction)
+
+    a = float(acceleration)
+    speed = min(float(max_speed), math.sqrt((2 * a * n + entry_speed ** 2 + exit_speed ** 2) / 2))
+    v0 = min(float(entry_speed), speed)
+    v1 = min(float(exit_speed), speed)
+    s_accel = (speed ** 2 - v0 ** 2) / (2 * a)
+    s_decel = (speed ** 2 - v1 ** 2) / (2 * a)
+    t_accel = (speed - v0) / a
+    total = t_accel + max(0.0, n - s_accel - s_decel) / speed + (speed - v1) / a
+
+    s = np.arange(1, n + 1, dtype=np.float64)
+    times = np.where(
+        s <= s_accel, (np.sqrt(v0 * v0 + 2 * a * s) - v0) / a,
+        np.where(s <= n - s_decel,
+                 t_accel + (s - s_accel) / speed,
+                 total - (np.sqrt(v1 * v1 + 2 * a * np.maximum(n - s, 0.0)) - v1) / a))
+    return MotionProfile(times, direction)
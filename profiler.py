@@ -0,0 +1,205 @@
+import time
+
+# Корзины гистограммы: [2^(i-1), 2^i) мкс, последняя - все, что дольше
+BUCKETS = 24
+
+
+class Histogram:
+    """Гистограмма длительностей с логарифмическими корзинами.
+
+    Добавление - несколько целочисленных операций без выделения памяти;
+    процентили считаются по корзинам с точностью до степени двойки.
+    """
+
+    __slots__ = ("counts", "count", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns):
+        """Учет одной длительности (нс)"""
+        self.counts[min(BUCKETS - 1, (ns // 1000).bit_length())] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, p):
+        """Верхняя граница корзины, в которую попадает процентиль p (мкс)"""
+        rank = self.count * p / 100
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(float(1 << i), self.max_ns / 1000)
+        return self.max_ns / 1000
+
+    def stats(self):
+        """Число, среднее, p50, p99 и максимум (мкс)"""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_us": self.total_ns / self.count / 1000,
+            "p50_us": self.percentile(50),
+            "p99_us": self.percentile(99),
+            "max_us": self.max_ns / 1000,
+        }
+
+
+class Profiler:
+    """Включаемые замеры горячих путей интерфейса и цикла событий.
+
+    Выключенный профилировщик ничего не стоит: методы объектов
+    оборачиваются таймерами только в enable() (атрибутами экземпляра,
+    которые disable() удаляет), а ядро проверяет одну ссылку на
+    профилировщик. Задержка цикла событий Tk измеряется пробами
+    root.after: насколько позже заказанного они выполняются.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.enabled = False
+        self.wrapped = []  # (объект, имя метода)
+        self.root = None
+        self.probe_id = None
+        self.probe_period = 50  # мс
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def record(self, name, ns):
+        """Учет длительности ns под именем name"""
+        self.histogram(name).add(ns)
+
+    def call(self, name, function, *args):
+        """Вызов function(*args) с замером"""
+        start = time.perf_counter_ns()
+        try:
+            return function(*args)
+        finally:
+            self.histogram(name).add(time.perf_counter_ns() - start)
+
+    def timed(self, name, function):
+        """Обертка function, замеряющая каждый вызов"""
+        histogram = self.histogram(name)
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.add(time.perf_counter_ns() - start)
+        return wrapper
+
+    # --- Включение ---
+
+    def enable(self, targets=(), root=None):
+        """Включение замеров: targets - пары (объект, имена методов)"""
+        if self.enabled:
+            return
+        self.enabled = True
+        for target, names in targets:
+            for name in names:
+                setattr(target, name, self.timed(name, getattr(target, name)))
+                self.wrapped.append((target, name))
+        if root is not None:
+            self.root = root
+            self.probe_id = root.after(self.probe_period, self.probe, time.perf_counter_ns())
+
+    def disable(self):
+        """Выключение: исходные методы и отмена проб"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        for target, name in self.wrapped:
+            delattr(target, name)
+        self.wrapped = []
+        if self.root is not None and self.probe_id is not None:
+            self.root.after_cancel(self.probe_id)
+        self.probe_id = None
+
+    def reset(self):
+        """Сброс накопленных гистограмм"""
+        self.histograms = {}
+
+    # --- Цикл событий Tk ---
+
+    def probe(self, scheduled):
+        """Проба after: опоздание относительно заказанного момента"""
+        now = time.perf_counter_ns()
+        self.record("event_loop_lag", max(0, now - scheduled - self.probe_period * 1_000_000))
+        if self.enabled:
+            self.probe_id = self.root.after(self.probe_period, self.probe, now)
+
+    def backlog(self):
+        """Число ожидающих обработчиков after в очереди Tk"""
+        if self.root is None:
+            return 0
+        return len(self.root.tk.call("after", "info"))
+
+    def stats(self):
+        """Статистика всех гистограмм"""
+        return {name: histogram.stats() for name, histogram in self.histograms.items()}
+
+
+class ProfilerOverlay:
+    """Текстовая панель поверх холста: кадры/сек, дрожание шагов, очередь.
+
+    Кадры/сек считаются по приросту числа кадров в гистограмме
+    profiler между обновлениями панели. Если передан слой ui
+    (RetainedLayer), панель показывает и число вызовов Tk за кадр.
+    """
+
+    def __init__(self, canvas, profiler, engine, x=6, y=6, color="#00ff9d", frame="render_frame",
+                 ui=None):
+        self.canvas = canvas
+        self.profiler = profiler
+        self.engine = engine
+        self.ui = ui
+        self.frame = frame
+        self.text = canvas.create_text(x, y, text="", anchor="nw", fill=color,
+                                       font=("Consolas", 8), state="hidden")
+        self.last = None  # (время, кадров) прошлого обновления
+
+    def show(self):
+        self.last = None
+        self.canvas.itemconfig(self.text, state="normal")
+        self.canvas.tag_raise(self.text)
+
+    def hide(self):
+        self.canvas.itemconfig(self.text, state="hidden")
+
+    def update(self):
+        """Перерисовка панели по текущим замерам"""
+        profiler = self.profiler
+        now = time.perf_counter()
+        frames = profiler.histogram(self.frame).count
+        fps = 0.0
+        if self.last is not None and now > self.last[0]:
+            fps = (frames - self.last[1]) / (now - self.last[0])
+        self.last = (now, frames)
+
+        timing = self.engine.timing
+        lines = [f"FPS {fps:5.1f}",
+                 f"ДРОЖАНИЕ {timing.get('mean_jitter_us', 0.0):6.0f} / "
+                 f"{timing.get('max_jitter_us', 0.0):.0f} мкс",
+                 f"ОЧЕРЕДЬ {profiler.backlog():3d}  "
+                 f"ЗАДЕРЖКА p99 {profiler.histogram('event_loop_lag').percentile(99) / 1000:.1f} мс"]
+        if self.ui is not None:
+            frame = self.ui.frame_stats()
+            lines.append(f"TK ЗА КАДР {frame['last']:3d}  ср {frame['mean']:.1f}  "
+                         f"макс {frame['max']}  пропущено {frame['skipped_mean']:.1f}")
+        for name in ("render_frame", "rotate_motor", "update_system_stats",
+                     "pulse_animation", "engine_loop"):
+            histogram = profiler.histograms.get(name)
+            if histogram is not None and histogram.count:
+                lines.append(f"{name} {histogram.total_ns / histogram.count / 1000:6.0f} "
+                             f"p99 {histogram.percentile(99):.0f} мкс")
+        self.canvas.itemconfig(self.text, text="\n".join(lines))
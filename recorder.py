@@ -0,0 +1,215 @@
+import mmap
+import struct
+import threading
+import time
+from functools import cached_property
+
+# Заголовок файла: сигнатура, размер записи, время начала (эпоха), единиц
+# позиции на полный шаг
+HEADER = struct.Struct("<8sIdI8x")
+MAGIC = b"STEPLOG1"
+
+# Позиция пишется в 1/256 шага, чтобы смена режима шага не меняла масштаб
+UNITS_PER_STEP = 256
+
+# Запись события: время от начала (нс), тип, аргумент, позиция после
+# события; для NumPy - RECORD_FIELDS (dtype)
+RECORD = struct.Struct("<qBxxxiq")
+RECORD_FIELDS = [("time", "<i8"), ("kind", "u1"), ("pad", "V3"), ("arg", "<i4"), ("position", "<i8")]
+
+EVENT_STEP = 1  # аргумент - число микрошагов пачки со знаком направления
+EVENT_DIRECTION = 2  # аргумент - новое направление (+1/-1)
+EVENT_SPEED = 3  # аргумент - частота в милли-шагах/сек
+EVENT_MODE = 4  # аргумент - микрошагов на полный шаг
+
+
+class StepRecorder:
+    """Запись шагов в файл фиксированными двоичными записями по 24 байта.
+
+    Двигатель вызывает record() один раз на пачку шагов; смены
+    направления и частоты записываются отдельными событиями, только когда
+    они действительно происходят. Записи копятся в заранее выделенном
+    буфере и уходят в файл блоками, так что запись почти ничего не стоит
+    в цикле шагов.
+    """
+
+    def __init__(self, path, buffer_records=4096):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, RECORD.size, time.time(), UNITS_PER_STEP))
+        self.start_ns = time.perf_counter_ns()
+        self.buffer = bytearray(RECORD.size * buffer_records)
+        self.offset = 0
+        self.lock = threading.Lock()
+        self.direction = 0
+        self.rate = None
+        self.microsteps = None
+        self.records = 0
+
+    def append(self, kind, arg, position):
+        """Добавление записи в буфер (вызывается под блокировкой)"""
+        if self.offset == len(self.buffer):
+            self.file.write(self.buffer)
+            self.offset = 0
+        RECORD.pack_into(self.buffer, self.offset,
+                         time.perf_counter_ns() - self.start_ns, kind, arg, position)
+        self.offset += RECORD.size
+        self.records += 1
+
+    def record(self, count, direction, rate, position, microsteps=1):
+        """Пачка из count микрошагов в направлении direction на частоте rate.
+
+        position - позиция после пачки в микрошагах режима microsteps.
+        """
+        scale = UNITS_PER_STEP // microsteps
+        after = position * scale
+        before = after - count * direction * scale
+        with self.lock:
+            if self.file is None:
+                return
+            if microsteps != self.microsteps:
+                self.microsteps = microsteps
+                self.append(EVENT_MODE, microsteps, before)
+            if count and direction != self.direction:
+                self.direction = direction
+                self.append(EVENT_DIRECTION, direction, before)
+            if rate != self.rate:
+                self.rate = rate
+                self.append(EVENT_SPEED, int(rate * 1000), before)
+            if count:
+                self.append(EVENT_STEP, count * direction, after)
+
+    def flush(self):
+        """Запись буфера в файл"""
+        with self.lock:
+            if self.file is not None and self.offset:
+                self.file.write(memoryview(self.buffer)[:self.offset])
+                self.offset = 0
+                self.file.flush()
+
+    def close(self):
+        """Завершение записи"""
+        self.flush()
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class StepLog:
+    """Чтение записи шагов через отображение файла в память.
+
+    Записи доступны как массив NumPy прямо поверх mmap, без чтения файла,
+    поэтому журнал любого размера открывается мгновенно, а поиск момента
+    времени - двоичный поиск по отсортированному столбцу времени. Заголовок,
+    длительность и конечная позиция читаются без NumPy: массив создается
+    только при первом поиске.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            if not header.startswith(MAGIC) and not MAGIC.startswith(header):
+                raise ValueError(f"{path}: не запись шагов")
+            if len(header) < HEADER.size:
+                raise ValueError(f"{path}: пустой файл" if not header else
+                                 f"{path}: запись шагов обрезана в заголовке "
+                                 f"({len(header)} из {HEADER.size} байт)")
+            magic, record_size, self.start_time, self.units = HEADER.unpack(header)
+            if record_size != RECORD.size or self.units <= 0:
+                raise ValueError(f"{path}: не запись шагов")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = (len(self.map) - HEADER.size) // RECORD.size  # хвост недописанной записи отбрасывается
+        self.last = RECORD.unpack_from(self.map, HEADER.size + (self.count - 1) * RECORD.size) \
+            if self.count else None
+
+    def __len__(self):
+        return self.count
+
+    @cached_property
+    def records(self):
+        """Массив NumPy записей поверх mmap"""
+        import numpy as np
+
+        return np.frombuffer(self.map, np.dtype(RECORD_FIELDS), self.count, HEADER.size)
+
+    @cached_property
+    def times(self):
+        return self.records["time"]
+
+    @cached_property
+    def positions(self):
+        return self.records["position"]
+
+    def close(self):
+        """Закрытие отображения файла"""
+        self.records = self.times = self.positions = None
+        self.map.close()
+
+    @property
+    def duration(self):
+        """Длительность записи (сек)"""
+        return self.last[0] / 1e9 if self.count else 0.0
+
+    def index_at(self, seconds):
+        """Число записей, случившихся к моменту seconds от начала"""
+        import numpy as np
+
+        return int(np.searchsorted(self.times, int(seconds * 1e9), side="right"))
+
+    def position_at(self, seconds):
+        """Позиция (в units на полный шаг) в момент seconds от начала.
+
+        Первая запись журнала - всегда смена режима или направления с
+        позицией до первой пачки шагов.
+        """
+        if not self.count:
+            return 0
+        if seconds * 1e9 >= self.last[0]:
+            return self.last[-1]  # конец записи - без поиска
+        return int(self.positions[max(self.index_at(seconds), 1) - 1])
+
+    def events(self, start, end):
+        """Записи в интервале времени [start, end) сек"""
+        return self.records[self.index_at(start - 1e-9):self.index_at(end - 1e-9)]
+
+
+class LogPlayer:
+    """Воспроизведение записи в реальном времени с множителем скорости"""
+
+    def __init__(self, log, multiplier=1.0, start=0.0, step_angle=1.8):
+        self.log = log
+        self.multiplier = multiplier
+        self.start = start  # сек записи, с которых начинается воспроизведение
+        self.step_angle = step_angle / log.units  # градусов на единицу позиции записи
+        self.wall_start = time.perf_counter()
+
+    @property
+    def time(self):
+        """Текущий момент записи (сек)"""
+        elapsed = (time.perf_counter() - self.wall_start) * self.multiplier
+        return min(self.start + elapsed, self.log.duration)
+
+    @property
+    def done(self):
+        """Воспроизведение дошло до конца записи"""
+        return self.time >= self.log.duration
+
+    def seek(self, seconds):
+        """Переход к моменту seconds записи"""
+        self.start = max(0.0, min(seconds, self.log.duration))
+        self.wall_start = time.perf_counter()
+
+    def set_multiplier(self, multiplier):
+        """Смена множителя без скачка позиции"""
+        self.seek(self.time)
+        self.multiplier = multiplier
+
+    def position(self):
+        """Позиция в текущий момент воспроизведения"""
+        return self.log.position_at(self.time)
+
+    def angle(self):
+        """Угол ротора (градусы) в текущий момент воспроизведения"""
+        return self.position() * self.step_angle
@@ -0,0 +1,96 @@
+class RetainedLayer:
+    """Слой сохраненного состояния поверх виджетов Tk.
+
+    Запоминает последнее отправленное в Tk значение каждого параметра
+    (координаты элемента холста, опции itemconfig/config, параметры place)
+    и вызывает Tk только если значение действительно изменилось.
+    Считает выполненные и пропущенные вызовы, в том числе за кадр.
+    """
+
+    def __init__(self):
+        self.state = {}
+        self.calls = 0  # вызовов отправлено в Tk
+        self.skipped = 0  # вызовов пропущено (значение не менялось)
+        self.frame_mark = (0, 0)
+        self.last_frame = {"calls": 0, "skipped": 0}
+        self.reset_frames()
+
+    # --- Кадры ---
+
+    def begin_frame(self):
+        """Начало кадра: отсчет вызовов с этого момента"""
+        self.frame_mark = (self.calls, self.skipped)
+
+    def end_frame(self):
+        """Конец кадра: число вызовов Tk за кадр"""
+        calls, skipped = self.frame_mark
+        self.last_frame = {"calls": self.calls - calls, "skipped": self.skipped - skipped}
+        self.frames += 1
+        self.frame_calls += self.last_frame["calls"]
+        self.frame_skipped += self.last_frame["skipped"]
+        self.max_frame_calls = max(self.max_frame_calls, self.last_frame["calls"])
+        return self.last_frame
+
+    def reset_frames(self):
+        """Сброс счетчиков кадров"""
+        self.frames = 0
+        self.frame_calls = 0
+        self.frame_skipped = 0
+        self.max_frame_calls = 0
+
+    def frame_stats(self):
+        """Вызовов Tk за кадр: последний, средний и наибольший, пропущено в среднем"""
+        frames = max(self.frames, 1)
+        return {
+            "frames": self.frames,
+            "last": self.last_frame["calls"],
+            "mean": self.frame_calls / frames,
+            "max": self.max_frame_calls,
+            "skipped_mean": self.frame_skipped / frames,
+        }
+
+    # --- Операции ---
+
+    def changed_options(self, target, item, options):
+        """Опции, значения которых отличаются от отправленных ранее"""
+        state = self.state
+        changed = {}
+        for name, value in options.items():
+            key = (target, item, name)
+            if state.get(key) != value:
+                state[key] = value
+                changed[name] = value
+        if changed:
+            self.calls += 1
+        else:
+            self.skipped += 1
+        return changed
+
+    def coords(self, canvas, item, *coords):
+        """Перемещение элемента холста"""
+        changed = self.changed_options(canvas, item, {"coords": coords})
+        if changed:
+            canvas.coords(item, *coords)
+
+    def itemconfig(self, canvas, item, **options):
+        """Настройка элемента холста"""
+        changed = self.changed_options(canvas, item, options)
+        if changed:
+            canvas.itemconfig(item, **changed)
+
+    def config(self, widget, **options):
+        """Настройка виджета"""
+        changed = self.changed_options(widget, None, options)
+        if changed:
+            widget.config(**changed)
+
+    def place(self, widget, **options):
+        """Размещение виджета (place) целиком"""
+        changed = self.changed_options(widget, "place", {"place": tuple(sorted(options.items()))})
+        if changed:
+            widget.place(**options)
+
+    def forget(self, target, item=None):
+        """Сброс сохраненного состояния (после удаления элементов)"""
+        self.state = {key: value for key, value in self.state.items()
+                      if key[0] is not target or (item is not None and key[1] != item)}
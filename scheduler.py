@@ -0,0 +1,251 @@
+import time
+
+import numpy as np
+
+
+class DeadlineScheduler:
+    """Планировщик шагов по абсолютным дедлайнам.
+
+    Дедлайн каждого шага отсчитывается от момента запуска, а не от конца
+    предыдущего шага, поэтому время обработки не накапливается в дрейф.
+    На высоких частотах шаги выдаются пачками: поток просыпается не чаще
+    одного раза в batch_period секунд и выполняет все наступившие шаги.
+    """
+
+    done = False  # при постоянной частоте расписание не кончается
+    live = False  # скорость меняется только через set_rate()
+    direction = 0  # направление задает двигатель
+
+    def __init__(self, rate, batch_period=0.001, max_batch=10000, catch_up=True):
+        self.batch_ns = int(batch_period * 1e9)
+        self.max_batch = max_batch
+        self.catch_up = catch_up  # False - пропущенные шаги отбрасываются
+        self.set_rate(rate)
+        self.start()
+
+    def set_rate(self, rate):
+        """Установка частоты шагов (шагов/сек)"""
+        if rate <= 0:
+            raise ValueError("Частота шагов должна быть положительной")
+        self.rate = rate
+        self.interval_ns = max(1, int(round(1e9 / rate)))
+
+    def start(self):
+        """Сброс отсчета и статистики"""
+        now = time.perf_counter_ns()
+        self.start_ns = now
+        self.next_deadline = now
+        self.issued = 0
+        self.missed = 0
+        self.wakeups = 0
+        self.jitter_sum_ns = 0
+        self.jitter_max_ns = 0
+
+    def wait(self):
+        """Ожидание ближайшего дедлайна; возвращает число шагов к выполнению"""
+        wake = self.next_wake()
+        now = time.perf_counter_ns()
+        if now < wake:
+            time.sleep((wake - now) / 1e9)
+            now = time.perf_counter_ns()
+        return self.collect(wake, now)
+
+    def next_wake(self):
+        """Момент следующего пробуждения (perf_counter_ns)"""
+        # На высоких частотах копим шаги до периода пачки
+        wake = self.next_deadline
+        if self.interval_ns < self.batch_ns:
+            wake += self.batch_ns - self.interval_ns
+        return wake
+
+    def record_wake(self, wake, now):
+        """Учет пробуждения в статистике джиттера"""
+        jitter = now - wake
+        self.wakeups += 1
+        self.jitter_sum_ns += jitter
+        if jitter > self.jitter_max_ns:
+            self.jitter_max_ns = jitter
+
+    def collect(self, wake, now):
+        """Шаги, наступившие к моменту now пробуждения, назначенного на wake.
+
+        wait() - ожидание и collect(); без ожидания collect() используют
+        циклы событий, которые сами ждут next_wake().
+        """
+        self.record_wake(wake, now)
+        interval = self.interval_ns
+
+        # Все шаги, чьи дедлайны уже наступили
+        due = 1 + (now - self.next_deadline) // interval
+        count = due if self.catch_up else min(due, max(1, self.batch_ns // interval))
+        if count > self.max_batch:
+            count = self.max_batch
+        self.missed += due - count
+
+        self.next_deadline += due * interval
+        self.issued += count
+        return count
+
+    def stats(self):
+        """Статистика: достигнутая частота, джиттер (мкс), пропущенные шаги"""
+        elapsed = (time.perf_counter_ns() - self.start_ns) / 1e9
+        return {
+            "commanded_rate": self.rate,
+            "achieved_rate": self.issued / elapsed if elapsed > 0 else 0.0,
+            "mean_jitter_us": self.jitter_sum_ns / self.wakeups / 1000 if self.wakeups else 0.0,
+            "max_jitter_us": self.jitter_max_ns / 1000,
+            "missed_steps": self.missed,
+            "issued_steps": self.issued,
+        }
+
+
+class TableScheduler(DeadlineScheduler):
+    """Планировщик шагов по готовой таблице времен (профиль движения).
+
+    times_ns - время каждого шага от запуска в наносекундах. Во время
+    работы выполняется только поиск по таблице, без вычислений профиля.
+    """
+
+    def __init__(self, times_ns, batch_period=0.001, max_batch=10000):
+        self.times_ns = np.asarray(times_ns, dtype=np.int64)
+        self.index = 0
+        self.last_wake = 0
+        super().__init__(1.0, batch_period, max_batch, catch_up=True)
+
+    def start(self):
+        """Сброс отсчета и статистики"""
+        super().start()
+        self.index = 0
+        self.last_wake = self.start_ns - self.batch_ns
+
+    @property
+    def done(self):
+        """Все шаги таблицы выданы"""
+        return self.index >= len(self.times_ns)
+
+    @property
+    def rate(self):
+        """Мгновенная частота шагов по таблице (шагов/сек)"""
+        i = min(max(self.index, 1), len(self.times_ns) - 1)
+        if i < 1:
+            return 0.0
+        return 1e9 / max(1, int(self.times_ns[i] - self.times_ns[i - 1]))
+
+    def set_rate(self, rate):
+        """Частоту задает таблица; параметр игнорируется"""
+
+    def next_wake(self):
+        """Момент шага таблицы, но не раньше периода пачки с прошлого пробуждения"""
+        if self.done:
+            return self.last_wake
+        return max(self.start_ns + int(self.times_ns[self.index]), self.last_wake + self.batch_ns)
+
+    def collect(self, wake, now):
+        """Шаги таблицы, наступившие к моменту now"""
+        if self.done:
+            return 0
+        self.last_wake = now
+        self.record_wake(wake, now)
+
+        # Шаги, чьи моменты уже наступили; лишние дойдут в следующей пачке
+        due = int(np.searchsorted(self.times_ns, now - self.start_ns, side="right")) - self.index
+        count = min(max(1, due), self.max_batch)
+        self.index += count
+        self.issued += count
+        return count
+
+    def stats(self):
+        """Статистика; commanded_rate - средняя частота по таблице"""
+        stats = super().stats()
+        if len(self.times_ns) and self.times_ns[-1] > 0:
+            stats["commanded_rate"] = len(self.times_ns) * 1e9 / int(self.times_ns[-1])
+        return stats
+
+
+class VelocityScheduler(DeadlineScheduler):
+    """Планировщик со скоростью, которую можно менять на ходу.
+
+    Скорость (со знаком направления) стремится к целевой с ограниченным
+    ускорением, а шаги получаются ее интегрированием. Пробуждение - к
+    моменту следующего шага, но не чаще периода пачки и, пока идет
+    разгон, не реже ramp_period. Смена направления проходит через
+    торможение до нуля.
+    """
+
+    live = True  # принимает set_target() во время работы
+
+    def __init__(self, velocity, target, acceleration, batch_period=0.001,
+                 max_batch=10000, ramp_period=0.01):
+        self.velocity = float(velocity)  # шагов/сек со знаком направления
+        self.target = float(target)
+        self.acceleration = acceleration  # шагов/сек²
+        self.ramp_ns = int(ramp_period * 1e9)
+        self.phase = 0.0  # накопленная доля следующего шага
+        super().__init__(abs(target) or 1.0, batch_period, max_batch)
+
+    def start(self):
+        """Сброс отсчета и статистики"""
+        super().start()
+        self.last_ns = self.start_ns
+
+    def set_rate(self, rate):
+        """Целевая частота без смены направления"""
+        sign = -1.0 if (self.target or self.velocity) < 0 else 1.0
+        self.target = sign * abs(rate)
+
+    def set_target(self, velocity):
+        """Целевая скорость со знаком направления"""
+        self.target = float(velocity)
+
+    @property
+    def rate(self):
+        """Текущая частота шагов (шагов/сек)"""
+        return abs(self.velocity)
+
+    @property
+    def direction(self):
+        """Текущее направление движения: +1, -1 или 0 на месте"""
+        return (self.velocity > 0) - (self.velocity < 0)
+
+    @property
+    def done(self):
+        """Остановились и стоять велено"""
+        return self.velocity == 0 and self.target == 0
+
+    def next_wake(self):
+        """Момент следующего шага (с учетом периода пачки и разгона)"""
+        speed = abs(self.velocity)
+        wait = (1.0 - self.phase) / speed * 1e9 if speed > 0 else float("inf")
+        if self.velocity != self.target:
+            wait = min(wait, self.ramp_ns)
+        return self.last_ns + int(max(wait, self.batch_ns))
+
+    def collect(self, wake, now):
+        """Шаги, пройденные с прошлого пробуждения"""
+        self.record_wake(wake, now)
+        dt = (now - self.last_ns) / 1e9
+        self.last_ns = now
+
+        v0, target = self.velocity, self.target
+        # Время до целевой скорости (не дольше интервала)
+        ramp = min(dt, abs(target - v0) / self.acceleration) if self.acceleration > 0 else 0.0
+        v1 = target if ramp < dt or v0 == target else v0 + (1 if target > v0 else -1) * self.acceleration * dt
+        if v0 * v1 < 0 or v0 == 0:
+            # Проход через ноль: считаются только шаги в новом направлении
+            crossing = abs(v0) / self.acceleration if self.acceleration > 0 else 0.0
+            reach = min(dt, crossing + abs(v1) / self.acceleration) if self.acceleration > 0 else crossing
+            distance = abs(v1) / 2 * max(0.0, reach - crossing) + abs(v1) * (dt - reach)
+            if v0 * v1 < 0:
+                self.phase = 0.0
+        else:
+            distance = (abs(v0) + abs(v1)) / 2 * ramp + abs(v1) * (dt - ramp)
+        self.velocity = v1
+
+        total = self.phase + distance
+        count = int(total)
+        self.phase = total - count
+        if count > self.max_batch:
+            self.missed += count - self.max_batch
+            count = self.max_batch
+        self.issued += count
+        return count
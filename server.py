@@ -0,0 +1,402 @@
+"""Локальный сервер управления по JSON-RPC 2.0.
+
+Запросы и ответы - JSON по одному на строку через TCP или Unix-сокет.
+Запросы можно слать конвейером, не дожидаясь ответов (ответы приходят в
+том же порядке), и пачками - JSON-массивом. Подписка subscribe присылает
+уведомления "state" не чаще заданной частоты.
+
+    python server.py serve --port 8765
+    python server.py bench --port 8765 --requests 20000 --pipeline 200
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from functools import partial
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+def error(code, message, request_id=None):
+    return {"jsonrpc": "2.0", "error": {"code": code, "message": message}, "id": request_id}
+
+
+class ControlServer:
+    """Сервер управления двигателем на цикле событий AsyncCore.
+
+    Методы повторяют кнопки интерфейса (start, stop, step, reset,
+    set_direction, ...) и запросы состояния. queue_move ставит
+    перемещение в очередь: следующее начинается по событию "stop"
+    предыдущего, так что один запрос-пачка может задать сотни перемещений.
+    Запущенное перемещение отмечает флаг сервера in_flight, а не
+    engine.running: у ProcessEngine running меняется только в poll().
+    """
+
+    def __init__(self, engine, core, max_rate=50.0):
+        self.engine = engine
+        self.core = core
+        self.max_rate = max_rate  # предел частоты уведомлений подписки
+        self.moves = deque()  # очередь перемещений (шагов)
+        self.in_flight = False  # перемещение из очереди выполняется
+        self.subscribers = {}  # writer -> [период, время последней отправки, состояние]
+        self.servers = []
+        self.requests = 0
+        self.methods = {
+            "start": self.start,
+            "stop": self.stop,
+            "move": self.move,
+            "step": self.move,
+            "queue_move": self.queue_move,
+            "clear_queue": self.clear_queue,
+            "reset": self.reset,
+            "set_speed": self.set_speed,
+            "set_direction": self.set_direction,
+            "set_microstep": self.set_microstep,
+            "set_load": self.set_load,
+            "state": self.state,
+            "timing": self.timing,
+            "ping": self.ping,
+        }
+        engine.subscribe(self.on_engine_event)
+
+    # --- Методы ---
+
+    def start(self):
+        return self.engine.start()
+
+    def stop(self, immediate=False):
+        self.moves.clear()
+        self.engine.stop(immediate=bool(immediate))
+        return True
+
+    def move(self, steps):
+        return self.engine.move(int(steps))
+
+    def queue_move(self, steps):
+        """Перемещение в очередь; возвращает длину очереди"""
+        steps = int(steps)
+        if steps:
+            self.moves.append(steps)
+            self.next_move()
+        return len(self.moves)
+
+    def clear_queue(self):
+        count = len(self.moves)
+        self.moves.clear()
+        return count
+
+    def reset(self):
+        self.moves.clear()
+        self.engine.reset()
+        return True
+
+    def set_speed(self, speed):
+        self.engine.set_speed(speed)
+        return self.engine.speed
+
+    def set_direction(self, direction):
+        self.engine.set_direction(direction)
+        return self.engine.direction
+
+    def set_microstep(self, mode):
+        return self.engine.set_microstep(mode)
+
+    def set_load(self, load):
+        self.engine.set_load(load)
+        return self.engine.load
+
+    def state(self):
+        """Состояние двигателя"""
+        engine = self.engine
+        return {
+            "position": engine.current_step,
+            "true_position": engine.true_step,
+            "missed_steps": engine.missed_steps,
+            "total_steps": engine.total_steps,
+            "running": engine.running,
+            "direction": engine.direction,
+            "speed": engine.speed,
+            "step_rate": engine.step_rate,
+            "microstep_mode": engine.microstep_mode,
+            "temperature": round(engine.temperature, 2),
+            "power": round(engine.power, 2),
+            "torque": round(engine.torque, 1),
+            "load": engine.load,
+            "queued_moves": len(self.moves),
+        }
+
+    def timing(self):
+        return self.engine.timing
+
+    def ping(self):
+        return "pong"
+
+    # --- Очередь перемещений ---
+
+    def on_engine_event(self, event, engine):
+        # Событие может прийти из потока шагов: следующий шаг очереди
+        # запускается в цикле событий сервера
+        if event == "stop":
+            self.core.loop.call_soon_threadsafe(self.move_finished)
+
+    def move_finished(self):
+        self.in_flight = False
+        self.next_move()
+
+    def next_move(self):
+        """Запуск следующего перемещения из очереди, если предыдущее закончено"""
+        while self.moves and not self.in_flight and not self.engine.running:
+            self.in_flight = self.engine.move(self.moves.popleft())
+
+    # --- Протокол ---
+
+    def dispatch(self, request, methods=None):
+        """Ответ на один запрос (None - для уведомления без id, даже при ошибке)"""
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" \
+                or not isinstance(request.get("method"), str):
+            return error(INVALID_REQUEST, "Неверный запрос",
+                         request.get("id") if isinstance(request, dict) else None)
+        response = self.call(request, methods or self.methods)
+        if "id" not in request:
+            return None
+        return response
+
+    def call(self, request, methods):
+        """Выполнение метода запроса: ответ с результатом или ошибкой"""
+        request_id = request.get("id")
+        method = methods.get(request["method"])
+        if method is None:
+            return error(METHOD_NOT_FOUND, f"Нет метода: {request['method']}", request_id)
+        params = request.get("params", [])
+        self.requests += 1
+        try:
+            if isinstance(params, dict):
+                result = method(**params)
+            elif isinstance(params, list):
+                result = method(*params)
+            else:
+                return error(INVALID_PARAMS, "params - массив или объект", request_id)
+        except (TypeError, ValueError) as problem:
+            return error(INVALID_PARAMS, str(problem), request_id)
+        except Exception as problem:  # ошибка метода не должна рвать соединение
+            return error(INTERNAL_ERROR, str(problem), request_id)
+        return {"jsonrpc": "2.0", "result": result, "id": request_id}
+
+    def handle_line(self, line, writer):
+        """Ответ на строку запроса: объект, массив ответов пачки или None"""
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return error(PARSE_ERROR, "Ошибка разбора JSON")
+        if isinstance(message, list):
+            if not message:
+                return error(INVALID_REQUEST, "Пустая пачка")
+            responses = [self.handle_message(item, writer) for item in message]
+            responses = [response for response in responses if response is not None]
+            return responses or None
+        return self.handle_message(message, writer)
+
+    def handle_message(self, message, writer):
+        # Подписка относится к соединению: ее методы привязываются к writer
+        if isinstance(message, dict) and message.get("method") in ("subscribe", "unsubscribe"):
+            return self.dispatch(message, {
+                "subscribe": partial(self.subscribe, writer),
+                "unsubscribe": partial(self.unsubscribe, writer),
+            })
+        return self.dispatch(message)
+
+    def subscribe(self, writer, rate=10):
+        """Подписка соединения на состояние; возвращает фактическую частоту"""
+        if isinstance(rate, bool) or not isinstance(rate, (int, float)):
+            raise ValueError(f"rate - число уведомлений в секунду, а не {rate!r}")
+        rate = min(self.max_rate, max(0.1, float(rate)))
+        self.subscribers[writer] = [1.0 / rate, 0.0, None]
+        return rate
+
+    def unsubscribe(self, writer):
+        """Отмена подписки; False - подписки не было"""
+        return self.subscribers.pop(writer, None) is not None
+
+    async def connection(self, reader, writer):
+        """Обработка соединения: ответы на все пришедшие строки - одной записью"""
+        buffer = b""
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+                # Конвейер: в одном чтении может быть много запросов
+                *lines, buffer = (buffer + data).split(b"\n")
+                out = []
+                for line in lines:
+                    if line.strip():
+                        response = self.handle_line(line, writer)
+                        if response is not None:
+                            out.append(json.dumps(response, ensure_ascii=False))
+                if out:
+                    writer.write(("\n".join(out) + "\n").encode("utf-8"))
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.subscribers.pop(writer, None)
+            writer.close()
+
+    async def broadcast(self):
+        """Рассылка состояния подписчикам: не чаще их частоты и только при изменении"""
+        while True:
+            self.engine.poll()
+            now = time.perf_counter()
+            state = None
+            for writer, subscription in list(self.subscribers.items()):
+                period, last_sent, last_state = subscription
+                if now - last_sent < period:
+                    continue
+                if state is None:
+                    state = self.state()
+                if state == last_state:
+                    continue
+                subscription[1:] = [now, state]
+                if writer.transport.get_write_buffer_size() > 1 << 20:
+                    continue  # медленный подписчик: пропускаем, а не копим
+                writer.write((json.dumps({"jsonrpc": "2.0", "method": "state", "params": state},
+                                         ensure_ascii=False) + "\n").encode("utf-8"))
+            await asyncio.sleep(1.0 / self.max_rate)
+
+    async def listen(self, host="127.0.0.1", port=8765, path=None):
+        """Запуск приема соединений (path - Unix-сокет вместо TCP)"""
+        if path is not None:
+            server = await asyncio.start_unix_server(self.connection, path)
+        else:
+            server = await asyncio.start_server(self.connection, host, port)
+        self.servers.append(server)
+        if len(self.servers) == 1:
+            self.core.create_task(self.broadcast())
+        return server
+
+    def open(self, host="127.0.0.1", port=8765, path=None):
+        """Запуск сервера на ядре (в том числе работающем вместе с Tk)"""
+        return self.core.create_task(self.listen(host, port, path))
+
+    def close(self):
+        for server in self.servers:
+            server.close()
+        self.servers = []
+
+
+# --- Генератор нагрузки ---
+
+async def load_client(host, port, path, requests, pipeline, batch, method):
+    """Запросы окнами по pipeline штук в полете; batch запросов в строке"""
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path, limit=1 << 24)
+    else:
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 24)
+    sent_at = {}
+    latencies = []
+    next_id = 0
+    pipeline = max(pipeline, batch)
+    window = asyncio.Semaphore(pipeline)
+
+    async def receive():
+        while len(latencies) < requests:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("сервер закрыл соединение")
+            now = time.perf_counter_ns()
+            message = json.loads(line)
+            for response in message if isinstance(message, list) else [message]:
+                if "id" in response and response["id"] in sent_at:
+                    latencies.append(now - sent_at.pop(response["id"]))
+                    window.release()
+
+    receiver = asyncio.ensure_future(receive())
+    start = time.perf_counter()
+    while next_id < requests:
+        group = []
+        for _ in range(min(batch, requests - next_id)):
+            await window.acquire()
+            group.append({"jsonrpc": "2.0", "method": method, "id": next_id})
+            sent_at[next_id] = time.perf_counter_ns()
+            next_id += 1
+        payload = group if batch > 1 else group[0]
+        writer.write((json.dumps(payload) + "\n").encode("utf-8"))
+        if next_id % pipeline == 0 or next_id == requests:
+            await writer.drain()
+    await receiver
+    elapsed = time.perf_counter() - start
+    writer.close()
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "pipeline": pipeline,
+        "batch": batch,
+        "seconds": elapsed,
+        "requests_per_sec": requests / elapsed,
+        "latency_p50_us": latencies[len(latencies) // 2] / 1000,
+        "latency_p99_us": latencies[int(len(latencies) * 0.99)] / 1000,
+        "latency_max_us": latencies[-1] / 1000,
+    }
+
+
+def load_test(host="127.0.0.1", port=8765, path=None, requests=20000, pipeline=100,
+              batch=1, method="state"):
+    """Замер пропускной способности и задержки сервера"""
+    return asyncio.run(load_client(host, port, path, requests, pipeline, batch, method))
+
+
+def serve(host="127.0.0.1", port=8765, path=None, process=False):
+    """Сервер без интерфейса до прерывания"""
+    from core import AsyncCore
+    from engine import StepperMotorEngine
+
+    core = AsyncCore()
+    if process:
+        from worker import ProcessEngine
+        engine = ProcessEngine()
+    else:
+        engine = core.attach_engine(StepperMotorEngine())
+    server = ControlServer(engine, core)
+    try:
+        core.run(server.listen(host, port, path))
+        print(f"Сервер: {path or f'{host}:{port}'}")
+        core.loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        core.close()
+        if process:
+            engine.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер управления по JSON-RPC")
+    parser.add_argument("command", choices=("serve", "bench"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="путь Unix-сокета вместо TCP")
+    parser.add_argument("--process", action="store_true", help="шаги в отдельном процессе")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--pipeline", type=int, default=100, help="запросов в полете")
+    parser.add_argument("--batch", type=int, default=1, help="запросов в одной пачке")
+    parser.add_argument("--method", default="state")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.unix, args.process)
+    else:
+        print(json.dumps(load_test(args.host, args.port, args.unix, args.requests,
+                                   args.pipeline, args.batch, args.method), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import microstep
+import planner
+from physics import MotorModel, predict_stalls, profile_duty
+
+CACHE_DIR = ".sweep_cache"
+
+# Задание по умолчанию: перемещение, пауза, повтор в течение часа
+JOB = {"distance": 10000, "dwell": 1.0, "hours": 1.0, "motor": {}}
+
+
+def point_key(point, job):
+    """Хеш точки перебора вместе с заданием и параметрами двигателя"""
+    text = json.dumps({"point": point, "job": job}, sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def evaluate(point, job=JOB):
+    """Симуляция одной точки: время задания, пропуски шагов, нагрев.
+
+    point - словарь speed (полных шагов/сек), acceleration (шагов/сек²),
+    load (Н·м), mode (режим шага).
+    """
+    model = MotorModel(**job.get("motor", {}))
+    mode = point["mode"]
+    m = microstep.microsteps(mode)
+    profile = planner.plan_move(job["distance"] * m, point["speed"] * m,
+                                point["acceleration"] * m)
+
+    stalls = predict_stalls(model, profile, m, point["load"], mode)
+
+    # Цикл: перемещение и пауза на удержании, повторенные на hours часов
+    durations, speeds = profile_duty(profile, m)
+    durations = np.append(durations, job["dwell"])
+    speeds = np.append(speeds, 0.0)
+    cycle = durations.sum()
+    repeats = max(1, int(job["hours"] * 3600 / cycle))
+    thermal = model.check(np.tile(durations, repeats), np.tile(speeds, repeats), mode=mode)
+
+    return dict(point,
+                move_time=profile.duration,
+                missed_steps=stalls["missed_steps"] // m,
+                max_temperature=thermal["max_temperature"],
+                ok=stalls["missed_steps"] == 0 and thermal["ok"])
+
+
+def cached_evaluate(point, job=JOB, cache_dir=CACHE_DIR):
+    """evaluate() с кешем на диске: один файл JSON на точку"""
+    path = os.path.join(cache_dir, point_key(point, job) + ".json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    result = evaluate(point, job)
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+    os.replace(temporary, path)  # атомарно: параллельные процессы не мешают
+    return result
+
+
+def grid(speeds, accelerations, loads, modes):
+    """Все сочетания параметров"""
+    return [{"speed": s, "acceleration": a, "load": l, "mode": m}
+            for s, a, l, m in itertools.product(speeds, accelerations, loads, modes)]
+
+
+def sweep(points, job=JOB, cache_dir=CACHE_DIR, workers=None):
+    """Перебор точек на всех ядрах; уже посчитанные берутся из кеша"""
+    results = [None] * len(points)
+    pending = []
+    for i, point in enumerate(points):
+        path = os.path.join(cache_dir, point_key(point, job) + ".json")
+        if os.path.exists(path):
+            results[i] = cached_evaluate(point, job, cache_dir)
+        else:
+            pending.append(i)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk = max(1, len(pending) // (4 * (workers or os.cpu_count() or 1)))
+            computed = pool.map(cached_evaluate, [points[i] for i in pending],
+                                itertools.repeat(job), itertools.repeat(cache_dir),
+                                chunksize=chunk)
+            for i, result in zip(pending, computed):
+                results[i] = result
+    return results, len(points) - len(pending)
+
+
+def fastest(results, count=5):
+    """Самые быстрые безопасные точки (без пропусков шагов и перегрева)"""
+    safe = [r for r in results if r["ok"]]
+    return sorted(safe, key=lambda r: (r["move_time"], r["max_temperature"]))[:count]
+
+
+def parse_list(text, kind=float):
+    """Список значений через запятую"""
+    return [kind(value) for value in text.split(",") if value]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Перебор скорости/ускорения/нагрузки/режима шага")
+    parser.add_argument("--speeds", default="100,200,500,1000,1500,2000,3000,4000")
+    parser.add_argument("--accels", default="500,1000,2000,5000,10000,20000")
+    parser.add_argument("--loads", default="0,0.1,0.2,0.3")
+    parser.add_argument("--modes", default="FULL,HALF,1/16")
+    parser.add_argument("--distance", type=int, default=JOB["distance"], help="полных шагов")
+    parser.add_argument("--dwell", type=float, default=JOB["dwell"], help="пауза между перемещениями, сек")
+    parser.add_argument("--hours", type=float, default=JOB["hours"], help="длительность цикла для теплового расчета")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="все результаты в JSON")
+    args = parser.parse_args(argv)
+
+    job = dict(JOB, distance=args.distance, dwell=args.dwell, hours=args.hours)
+    points = grid(parse_list(args.speeds), parse_list(args.accels),
+                  parse_list(args.loads), parse_list(args.modes, str))
+    results, cached = sweep(points, job, args.cache, args.workers)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    print(f"Точек: {len(points)}, из кеша: {cached}, безопасных: {sum(r['ok'] for r in results)}")
+    # Лучшая точка для каждой нагрузки - нагрузку обычно задает механика
+    for load in sorted({r["load"] for r in results}):
+        best = fastest([r for r in results if r["load"] == load], args.top)
+        print(f"\nНагрузка {load:g} Н·м:")
+        if not best:
+            print("  безопасных настроек нет")
+        for r in best:
+            print(f"  {r['speed']:>6g} шаг/с  {r['acceleration']:>7g} шаг/с²  {r['mode']:>5}  "
+                  f"время {r['move_time']:.3f} с  макс. {r['max_temperature']:.1f} °C")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import threading
+import time
+
+import numpy as np
+
+CHANNELS = ("position", "speed", "temperature", "power", "torque")
+
+
+class TelemetryBuffer:
+    """Кольцевой буфер телеметрии фиксированной емкости.
+
+    Все отсчеты лежат в одном заранее выделенном массиве NumPy (время и
+    каналы CHANNELS), так что добавление - O(1) без создания объектов.
+    """
+
+    def __init__(self, capacity=36000, channels=CHANNELS):
+        self.channels = channels
+        self.index = {name: i + 1 for i, name in enumerate(channels)}
+        self.capacity = capacity
+        self.data = np.zeros((capacity, len(channels) + 1), dtype=np.float64)
+        self.count = 0  # всего добавлено отсчетов (не только хранимых)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, t, *values):
+        """Добавление отсчета: время и значения каналов по порядку"""
+        with self.lock:
+            row = self.data[self.count % self.capacity]
+            row[0] = t
+            row[1:] = values
+            self.count += 1
+
+    def since(self, count):
+        """Отсчеты, добавленные после count (не больше хранимых), по порядку"""
+        with self.lock:
+            total = self.count
+            start = max(count, total - self.capacity)
+            if start >= total:
+                return self.data[:0].copy(), total
+            first = start % self.capacity
+            last = total % self.capacity
+            if first < last:
+                rows = self.data[first:last].copy()
+            else:
+                rows = np.concatenate((self.data[first:], self.data[:last]))
+        return rows, total
+
+    def latest(self, n=None):
+        """Последние n отсчетов (по умолчанию все хранимые), по порядку"""
+        n = len(self) if n is None else min(n, len(self))
+        return self.since(self.count - n)[0]
+
+    def column(self, rows, name):
+        """Столбец канала name (или "time") из выборки rows"""
+        return rows[:, 0 if name == "time" else self.index[name]]
+
+
+class TelemetryRecorder:
+    """Запись состояния двигателя в буфер с заданной частотой"""
+
+    def __init__(self, engine, buffer=None, rate=20.0):
+        self.engine = engine
+        self.buffer = buffer if buffer is not None else TelemetryBuffer()
+        self.rate = rate  # отсчетов/сек
+        self.running = False
+        self.thread = None
+
+    def sample(self, now=None):
+        """Один отсчет текущего состояния"""
+        engine = self.engine
+        engine.update_physics()
+        self.buffer.append(time.time() if now is None else now,
+                           engine.current_step,
+                           engine.step_rate / engine.microsteps,
+                           engine.temperature,
+                           engine.power,
+                           engine.torque)
+
+    def start(self):
+        """Запуск записи в фоновом потоке"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Остановка записи"""
+        self.running = False
+
+    def run(self):
+        """Цикл записи по абсолютным дедлайнам"""
+        period = 1.0 / self.rate
+        deadline = time.perf_counter()
+        while self.running:
+            self.sample()
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                deadline = time.perf_counter()  # отстали - без догона
+
+
+def lttb(x, y, threshold):
+    """Прореживание ряда алгоритмом LTTB (Largest-Triangle-Three-Buckets).
+
+    Возвращает индексы не более threshold точек, сохраняющих форму ряда:
+    из каждой корзины берется точка, образующая наибольший треугольник с
+    выбранной точкой предыдущей корзины и средним следующей.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+
+        ax, ay = x[selected], y[selected]
+        area = np.abs((ax - avg_x) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y - ay))
+        selected = start + int(area.argmax())
+        indices[i + 1] = selected
+    return indices
+
+
+class AggregateBuffer:
+    """Кольцевой буфер агрегатов: начало интервала и min/max/mean каналов"""
+
+    def __init__(self, period, capacity, channels):
+        self.period = period  # секунд на интервал
+        self.channels = channels
+        self.width = len(channels)
+        self.buffer = TelemetryBuffer(capacity, ("count",) + tuple(
+            f"{name}_{kind}" for kind in ("min", "max", "mean") for name in channels))
+
+        # Текущий незакрытый интервал
+        self.bucket = None
+        self.count = 0
+        self.low = np.full(self.width, np.inf)
+        self.high = np.full(self.width, -np.inf)
+        self.total = np.zeros(self.width)
+
+    def add(self, t, low, high, mean, count=1):
+        """Учет отсчета (или агрегата); возвращает закрытый интервал или None"""
+        bucket = int(t // self.period)
+        closed = None
+        if self.bucket is not None and bucket != self.bucket:
+            closed = self.close()
+        self.bucket = bucket
+        np.minimum(self.low, low, out=self.low)
+        np.maximum(self.high, high, out=self.high)
+        self.total += mean * count
+        self.count += count
+        return closed
+
+    def close(self):
+        """Запись текущего интервала в буфер"""
+        if self.bucket is None or self.count == 0:
+            return None
+        start = self.bucket * self.period
+        mean = self.total / self.count
+        self.buffer.append(start, self.count, *self.low, *self.high, *mean)
+        closed = (start, self.low.copy(), self.high.copy(), mean, self.count)
+        self.low.fill(np.inf)
+        self.high.fill(-np.inf)
+        self.total.fill(0.0)
+        self.count = 0
+        return closed
+
+
+class TieredHistory:
+    """Многоуровневая история: сырые отсчеты, 1 сек, 1 мин, 1 час.
+
+    Каждый уровень - кольцевой буфер фиксированной емкости, поэтому память
+    ограничена при любой длительности работы, а грубые уровни позволяют
+    посмотреть весь прогон целиком. Агрегаты каскадируются: закрытая
+    секунда попадает в минуту, минута - в час.
+    """
+
+    TIERS = (("1s", 1, 6 * 3600), ("1m", 60, 30 * 24 * 60), ("1h", 3600, 5 * 365 * 24))
+
+    def __init__(self, raw_capacity=72000, channels=CHANNELS, tiers=TIERS):
+        self.channels = channels
+        self.raw = TelemetryBuffer(raw_capacity, channels)
+        self.tiers = [(name, AggregateBuffer(period, capacity, channels))
+                      for name, period, capacity in tiers]
+        self.lock = threading.Lock()
+        self.first = None  # время первого отсчета прогона
+
+    @property
+    def count(self):
+        return self.raw.count
+
+    def append(self, t, *values):
+        """Добавление сырого отсчета с обновлением агрегатов"""
+        if self.first is None:
+            self.first = t
+        self.raw.append(t, *values)
+        sample = np.asarray(values, dtype=np.float64)
+        with self.lock:
+            closed = self.tiers[0][1].add(t, sample, sample, sample)
+            for _, tier in self.tiers[1:]:
+                if closed is None:
+                    break
+                start, low, high, mean, count = closed
+                closed = tier.add(start, low, high, mean, count)
+
+    def levels(self):
+        """Уровни от подробного к грубому: (имя, буфер)"""
+        return [("raw", self.raw)] + [(name, tier.buffer) for name, tier in self.tiers]
+
+    def query(self, channel, start=None, end=None, max_points=300):
+        """Ряд канала за интервал [start, end], не больше max_points точек.
+
+        Начало, более раннее, чем начало прогона, сдвигается к нему
+        (start=None - весь прогон). Выбирается самый подробный уровень, чей
+        старейший отсчет не позже начала; если начало не хранит ни один,
+        берется уровень с самыми старыми данными. Затем ряд прореживается
+        LTTB. Возвращает (время, значение, min, max); для сырых отсчетов
+        min и max совпадают со значением.
+        """
+        levels = [(name, buffer, buffer.latest()) for name, buffer in self.levels()]
+        if self.first is not None:
+            start = self.first if start is None else max(start, self.first)
+        elif start is None:
+            start = 0.0
+        filled = [level for level in levels if len(level[2])]
+        name, buffer, rows = next(
+            (level for level in filled if level[2][0, 0] <= start),
+            min(filled, key=lambda level: level[2][0, 0], default=levels[0]))
+
+        t = rows[:, 0]
+        mask = t >= start
+        if end is not None:
+            mask &= t <= end
+        rows = rows[mask]
+        t = rows[:, 0]
+        if name == "raw":
+            value = low = high = buffer.column(rows, channel)
+        else:
+            value = buffer.column(rows, f"{channel}_mean")
+            low = buffer.column(rows, f"{channel}_min")
+            high = buffer.column(rows, f"{channel}_max")
+
+        keep = lttb(t, value, max_points)
+        return t[keep], value[keep], low[keep], high[keep]
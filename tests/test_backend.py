@@ -0,0 +1,58 @@
+import os
+import time
+
+import pytest
+
+from backend import FirmwareEmulator, SerialBackend
+
+
+@pytest.fixture
+def silent_port():
+    """Порт, на котором никто не отвечает: подтверждений нет"""
+    master, slave = os.openpty()
+    yield os.ttyname(slave)
+    os.close(master)
+    os.close(slave)
+
+
+def send_batches(backend, batches=8):
+    """Самое долгое время flush() (сек)"""
+    worst = 0.0
+    for _ in range(batches):
+        backend.set_speed(100)
+        backend.steps(1, 1)
+        start = time.perf_counter()
+        backend.flush()
+        worst = max(worst, time.perf_counter() - start)
+    return worst
+
+
+def test_blocking_flush_waits_for_the_window(silent_port):
+    backend = SerialBackend(silent_port, window=4, ack_timeout=0.2)
+    backend.open()
+    assert send_batches(backend) >= 0.2
+    assert backend.timeouts
+    backend.close()
+
+
+def test_non_blocking_flush_never_waits(silent_port):
+    backend = SerialBackend(silent_port, window=4, ack_timeout=0.2, blocking=False)
+    backend.open()
+    assert send_batches(backend) < 0.05
+    backend.close()
+
+
+@pytest.mark.parametrize("blocking", [True, False])
+def test_device_receives_every_step(blocking):
+    emulator = FirmwareEmulator()
+    backend = SerialBackend(emulator.open(), window=8, blocking=blocking)
+    backend.open()
+    try:
+        for i in range(500):
+            backend.steps(3, 1 if i % 5 else -1)
+            backend.flush()
+        assert backend.wait_acks(timeout=5.0)
+    finally:
+        backend.close()
+        emulator.close()
+    assert emulator.position == backend.device_position == 3 * (400 - 100)
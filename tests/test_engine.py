@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+from core import AsyncCore
+from engine import StepperMotorEngine
+
+
+def make_engine(speed=1000):
+    engine = StepperMotorEngine(speed=speed)
+    engine.acceleration = 10 ** 6
+    return engine
+
+
+def test_move_arrives_and_stops():
+    engine = make_engine()
+    events = []
+    engine.subscribe(lambda event, source: events.append(event) if event in ("start", "stop") else None)
+    assert engine.move(200, threaded=False)
+    assert engine.current_step == engine.true_step == 200
+    assert engine.total_steps == 200
+    assert not engine.running
+    assert events == ["start", "stop"]
+
+
+def test_move_is_refused_while_running():
+    engine = make_engine()
+    assert engine.start()
+    try:
+        assert not engine.move(10)
+        assert not engine.start()
+    finally:
+        engine.stop(immediate=True)
+        engine.thread.join()
+
+
+def test_stop_decelerates_and_immediate_stop_does_not():
+    engine = make_engine(speed=500)
+    engine.acceleration = 2000
+    engine.start()
+    time.sleep(0.4)
+    engine.stop()
+    engine.thread.join()
+    assert not engine.running and engine.step_rate == 0.0
+    braked = engine.current_step
+
+    engine.start()
+    time.sleep(0.4)
+    engine.stop(immediate=True)
+    assert not engine.running
+    engine.thread.join()
+    assert engine.current_step > braked
+
+
+def test_reset_clears_position():
+    engine = make_engine()
+    engine.move(-50, threaded=False)
+    assert engine.current_step == -50
+    engine.reset()
+    assert (engine.current_step, engine.true_step, engine.total_steps) == (0, 0, 0)
+
+
+def test_reset_then_start_runs_one_cycle_in_threads():
+    engine = make_engine(speed=10)
+    engine.start()
+    time.sleep(0.25)
+    engine.reset()
+    engine.start()
+    time.sleep(1.0)
+    engine.stop(immediate=True)
+    engine.thread.join()
+    # Один цикл - около 10 шагов за секунду, два - около 20
+    assert engine.total_steps <= 13
+
+
+def test_reset_then_start_runs_one_cycle_on_async_core():
+    core = AsyncCore()
+    engine = core.attach_engine(make_engine(speed=10))
+    try:
+        engine.start()
+        core.run(asyncio.sleep(0.25))
+        engine.reset()
+        engine.start()
+        core.run(asyncio.sleep(1.0))
+        assert len(core.tasks) == 1
+        engine.stop(immediate=True)
+    finally:
+        core.close()
+    assert engine.total_steps <= 13
+
+
+def test_simulate_runs_without_delays():
+    engine = make_engine()
+    engine.set_microstep("1/16")
+    engine.simulate(-1600)
+    assert engine.current_step == -1600
+    assert engine.temperature > engine.model.ambient
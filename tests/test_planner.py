@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import planner
+
+
+@pytest.mark.parametrize("jerk", [None, 50000.0])
+@pytest.mark.parametrize("steps", [1, 7, 400, -3000])
+def test_move_has_every_step_in_order(steps, jerk):
+    profile = planner.plan_move(steps, 1000, 4000, jerk)
+    assert len(profile) == abs(steps)
+    assert profile.steps == steps
+    assert np.all(np.diff(profile.times) > 0)
+    assert profile.peak_speed <= 1000 * 1.001
+
+
+def test_long_move_cruises_and_short_move_does_not():
+    cruise = planner.plan_move(3000, 1000, 4000)
+    assert cruise.peak_speed == pytest.approx(1000, rel=1e-3)
+    # По 125 шагов (0.25 с) разгона и торможения, 2750 на крейсерской скорости
+    assert cruise.duration == pytest.approx(2 * 0.25 + 2750 / 1000, rel=1e-3)
+
+    short = planner.plan_move(100, 1000, 4000)
+    assert short.peak_speed == pytest.approx(np.sqrt(4000 * 100), rel=0.05)
+
+
+def test_move_starts_and_ends_slow_and_is_symmetric():
+    intervals = planner.plan_move(1000, 1000, 4000).intervals
+    assert intervals[0] > 10 * intervals[len(intervals) // 2]
+    assert intervals[-1] == pytest.approx(intervals[0], rel=1e-6)
+
+
+def test_scurve_is_slower_than_trapezoid():
+    trapezoid = planner.plan_move(2000, 1000, 4000)
+    scurve = planner.plan_move(2000, 1000, 4000, jerk=20000)
+    assert scurve.duration > trapezoid.duration
+    # Рывок ограничен: скорость в начале растет медленнее
+    assert scurve.intervals[0] > trapezoid.intervals[0]
+
+
+def test_empty_and_invalid_moves():
+    assert len(planner.plan_move(0, 1000, 4000)) == 0
+    assert planner.plan_move(0, 1000, 4000).duration == 0.0
+    for speed, accel, jerk in ((0, 4000, None), (1000, -1, None), (1000, 4000, 0)):
+        with pytest.raises(ValueError):
+            planner.plan_move(100, speed, accel, jerk)
+
+
+@pytest.mark.parametrize("jerk", [None, 50000.0])
+def test_stop_decelerates_from_speed(jerk):
+    profile = planner.plan_stop(1000, 10000, 4000, jerk)
+    intervals = profile.intervals
+    assert intervals[0] == pytest.approx(1 / 1000)
+    assert np.all(np.diff(intervals) >= -1e-12)
+    assert len(profile) <= planner.accel_distance(1000, 4000, jerk)
+
+
+@pytest.mark.parametrize("jerk", [None, 50000.0, 100.0])
+@pytest.mark.parametrize("steps", [1, 10, 60])
+def test_stop_fits_in_the_steps_left(steps, jerk):
+    profile = planner.plan_stop(1000, steps, 4000, jerk)
+    assert 0 < len(profile) <= steps
+    assert profile.intervals[0] == pytest.approx(1 / 1000)
+
+
+def test_stop_with_no_steps_left():
+    assert len(planner.plan_stop(1000, 0, 4000)) == 0
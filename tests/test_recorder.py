@@ -0,0 +1,58 @@
+import pytest
+
+from recorder import EVENT_DIRECTION, EVENT_MODE, EVENT_SPEED, EVENT_STEP, HEADER, UNITS_PER_STEP
+from recorder import StepLog, StepRecorder
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / "run.steplog"
+    recorder = StepRecorder(path, buffer_records=4)  # несколько сбросов буфера
+    position = 0
+    for direction in (1, 1, 1, -1, -1):
+        position += 10 * direction
+        recorder.record(10, direction, 500.0, position)
+    recorder.close()
+    return path
+
+
+def test_round_trip(log_path):
+    log = StepLog(log_path)
+    try:
+        kinds = [int(kind) for kind in log.records["kind"]]
+        assert kinds == [EVENT_MODE, EVENT_DIRECTION, EVENT_SPEED, EVENT_STEP, EVENT_STEP, EVENT_STEP,
+                         EVENT_DIRECTION, EVENT_STEP, EVENT_STEP]
+        assert len(log) == len(kinds)
+        assert log.position_at(log.duration) == 10 * UNITS_PER_STEP
+        assert log.position_at(0.0) == 0
+        assert len(log.events(0.0, log.duration + 1.0)) == len(log)
+    finally:
+        log.close()
+
+
+def test_trailing_partial_record_is_ignored(log_path):
+    with open(log_path, "ab") as f:
+        f.write(b"\x01" * 7)
+    log = StepLog(log_path)
+    assert len(log) == 9
+    assert log.position_at(log.duration) == 10 * UNITS_PER_STEP
+    log.close()
+
+
+@pytest.mark.parametrize("size, message", [
+    (0, "пустой файл"),
+    (5, "обрезана"),
+    (HEADER.size - 1, "обрезана"),
+])
+def test_truncated_header(log_path, size, message):
+    data = log_path.read_bytes()[:size]
+    log_path.write_bytes(data)
+    with pytest.raises(ValueError, match=message):
+        StepLog(log_path)
+
+
+def test_not_a_step_log(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"just some text, not a step log at all")
+    with pytest.raises(ValueError, match="не запись шагов"):
+        StepLog(path)
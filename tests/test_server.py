@@ -0,0 +1,57 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from core import AsyncCore
+from engine import StepperMotorEngine
+from server import ControlServer
+from worker import ProcessEngine
+
+
+async def queue_batch(server, path, moves, timeout=30.0):
+    """Пачка queue_move через сокет и ожидание конца очереди"""
+    await server.listen(path=path)
+    reader, writer = await asyncio.open_unix_connection(path)
+    batch = [{"jsonrpc": "2.0", "method": "queue_move", "params": [steps], "id": i}
+             for i, steps in enumerate(moves)]
+    writer.write((json.dumps(batch) + "\n").encode("utf-8"))
+    await writer.drain()
+    responses = json.loads(await reader.readline())
+    deadline = time.monotonic() + timeout
+    while server.moves or server.in_flight:
+        assert time.monotonic() < deadline, "очередь не выполнилась"
+        await asyncio.sleep(0.02)
+    await asyncio.sleep(0.1)  # последнее состояние процесса шагов
+    server.engine.poll()
+    writer.close()
+    return responses
+
+
+@pytest.mark.parametrize("process", [False, True], ids=["local", "process"])
+def test_queued_moves_reach_the_same_position(tmp_path, process):
+    core = AsyncCore()
+    engine = ProcessEngine(speed=1000) if process else core.attach_engine(StepperMotorEngine(speed=1000))
+    server = ControlServer(engine, core)
+    try:
+        responses = core.run(queue_batch(server, str(tmp_path / "control.sock"), [20] * 10))
+    finally:
+        server.close()
+        core.close()
+        if process:
+            engine.close()
+    assert len(responses) == 10
+    assert engine.current_step == 200
+    assert engine.total_steps == 200
+
+
+def test_notification_gets_no_reply():
+    core = AsyncCore()
+    server = ControlServer(core.attach_engine(StepperMotorEngine()), core)
+    try:
+        assert server.handle_line(b'{"jsonrpc": "2.0", "method": "subscribe", "params": ["x"]}', None) is None
+        response = server.handle_line(b'{"jsonrpc": "2.0", "method": "subscribe", "params": ["x"], "id": 1}', None)
+        assert response["error"]["code"] == -32602
+    finally:
+        core.close()
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from telemetry import TieredHistory
+
+RANGES = {"1min": 60, "1h": 3600, "day": 86400, "all": None}
+
+
+def simulated_run(seconds, rate=10, raw_capacity=72000, begin=1000.0):
+    history = TieredHistory(raw_capacity=raw_capacity)
+    for i in range(seconds * rate):
+        t = begin + i / rate
+        history.append(t, i, 100.0, 25.0 + i / 1000, 5.0, 40.0)
+    return history, t
+
+
+@pytest.mark.parametrize("window", RANGES)
+def test_ranges_longer_than_the_run_return_the_whole_run(window):
+    history, now = simulated_run(600)
+    seconds = RANGES[window]
+    start = None if seconds is None else now - seconds
+    t, value, low, high = history.query("position", start, max_points=300)
+    assert len(t) == 300
+    assert t[-1] == pytest.approx(now)
+    if seconds is None or seconds >= 600:
+        assert t[0] == pytest.approx(1000.0)  # сырые отсчеты с начала прогона
+    else:
+        assert t[0] >= start
+
+
+def test_aggregates_cover_what_raw_samples_no_longer_hold():
+    history, now = simulated_run(600, raw_capacity=1000)
+    t, value, low, high = history.query("position", now - 3600)
+    assert t[0] <= 1001.0  # секундный уровень хранит начало прогона
+    assert np.all(low <= value) and np.all(value <= high)
+
+
+def test_empty_history():
+    t, value, low, high = TieredHistory().query("speed", 0.0)
+    assert len(t) == 0
@@ -0,0 +1,386 @@
+import multiprocessing
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+from backend import MotorBackend
+from engine import StepperMotorEngine
+
+# Заголовок общей памяти: номер последнего состояния, голова и хвост
+# почтового ящика команд
+HEADER = struct.Struct("<QQQ40x")
+
+# Состояние двигателя; номер записи в начале и в конце слота - для
+# проверки, что слот не перезаписывался во время чтения. Счетчик
+# остановок (по модулю 2^16) показывает и перемещения, начавшиеся и
+# закончившиеся между двумя опросами
+STATE = struct.Struct("<QqqqqqddddddIBbHQ")
+STATE_SLOTS = 64
+
+# Команда: код, целый и вещественный аргументы, строка (путь, режим)
+COMMAND = struct.Struct("<IqdH230s")
+COMMAND_SLOTS = 256
+
+CMD_START = 1
+CMD_STOP = 2  # целый аргумент - 1 для немедленной остановки
+CMD_MOVE = 3
+CMD_RESET = 4
+CMD_SPEED = 5
+CMD_DIRECTION = 6  # +1 - по часовой, -1 - против
+CMD_MODE = 7
+CMD_LOAD = 8
+CMD_RECORD = 9  # пустая строка - остановка записи
+CMD_JOURNAL = 10
+CMD_QUIT = 11
+CMD_BACKEND = 12  # строка - путь последовательного порта, пустая - симуляция
+CMD_SIMULATE = 13  # целый аргумент - число микрошагов со знаком
+
+
+class SharedChannel:
+    """Обмен с процессом шагов через общую память без блокировок.
+
+    Состояние публикует только процесс шагов (один писатель) в кольцо
+    слотов; читатель берет последний слот и проверяет номер записи в его
+    начале и конце. Команды пишет только интерфейс (один писатель) в
+    кольцевой почтовый ящик: сначала слот, затем голова; процесс шагов
+    читает до головы и сдвигает хвост. Каждая сторона пишет только свои
+    счетчики, поэтому блокировки не нужны.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.state_offset = HEADER.size
+        self.command_offset = self.state_offset + STATE.size * STATE_SLOTS
+
+    @classmethod
+    def size(cls):
+        return HEADER.size + STATE.size * STATE_SLOTS + COMMAND.size * COMMAND_SLOTS
+
+    def counters(self):
+        return HEADER.unpack_from(self.buffer, 0)
+
+    def set_counter(self, index, value):
+        struct.pack_into("<Q", self.buffer, index * 8, value)
+
+    # --- Состояние (пишет процесс шагов) ---
+
+    def publish(self, engine, stops=0):
+        """Запись состояния двигателя в следующий слот"""
+        seq = self.counters()[0] + 1
+        timing = engine.timing
+        STATE.pack_into(self.buffer, self.state_offset + (seq % STATE_SLOTS) * STATE.size,
+                        seq, engine.current_step, engine.total_steps, engine.true_step,
+                        engine.missed_steps, engine.speed, engine.step_rate,
+                        engine.temperature, engine.power, engine.torque,
+                        timing.get("mean_jitter_us", 0.0), timing.get("max_jitter_us", 0.0),
+                        engine.microsteps, engine.running,
+                        1 if engine.direction == "CW" else -1, stops & 0xFFFF, seq)
+        self.set_counter(0, seq)
+
+    def latest(self):
+        """Последнее согласованное состояние (кортеж полей STATE) или None"""
+        for _ in range(3):
+            seq = self.counters()[0]
+            if seq == 0:
+                return None
+            state = STATE.unpack_from(self.buffer, self.state_offset + (seq % STATE_SLOTS) * STATE.size)
+            if state[0] == state[-1] == seq:
+                return state
+        return None
+
+    # --- Команды (пишет интерфейс) ---
+
+    def send(self, command, number=0, value=0.0, text=""):
+        """Команда в почтовый ящик; False, если ящик переполнен"""
+        _, head, tail = self.counters()
+        if head - tail >= COMMAND_SLOTS:
+            return False
+        data = text.encode("utf-8")
+        COMMAND.pack_into(self.buffer, self.command_offset + (head % COMMAND_SLOTS) * COMMAND.size,
+                          command, number, value, len(data), data)
+        self.set_counter(1, head + 1)
+        return True
+
+    def receive(self):
+        """Все новые команды: список (код, целое, вещественное, строка)"""
+        _, head, tail = self.counters()
+        commands = []
+        for index in range(tail, head):
+            command, number, value, length, data = COMMAND.unpack_from(
+                self.buffer, self.command_offset + (index % COMMAND_SLOTS) * COMMAND.size)
+            commands.append((command, number, value, data[:length].decode("utf-8")))
+        if commands:
+            self.set_counter(2, head)
+        return commands
+
+
+def serve(name, publish_period=0.002):
+    """Процесс шагов: выполнение команд и публикация состояния"""
+    from backend import MotorBackend, SerialBackend
+    from journal import PositionJournal
+    from recorder import StepRecorder
+
+    memory = shared_memory.SharedMemory(name=name)
+    channel = SharedChannel(memory.buf)
+    engine = StepperMotorEngine()
+    stops = 0
+
+    def on_event(event, source):
+        nonlocal stops
+        if event == "stop":
+            stops += 1
+
+    engine.subscribe(on_event)
+    try:
+        while True:
+            for command, number, value, text in channel.receive():
+                if command == CMD_QUIT:
+                    return
+                if command == CMD_START:
+                    engine.start()
+                elif command == CMD_STOP:
+                    engine.stop(immediate=bool(number))
+                elif command == CMD_MOVE:
+                    engine.move(number)
+                elif command == CMD_RESET:
+                    engine.reset()
+                elif command == CMD_SPEED:
+                    engine.set_speed(number)
+                elif command == CMD_DIRECTION:
+                    engine.set_direction("CW" if number > 0 else "CCW")
+                elif command == CMD_MODE:
+                    engine.set_microstep(text)
+                elif command == CMD_LOAD:
+                    engine.set_load(value)
+                elif command == CMD_RECORD:
+                    engine.set_recorder(StepRecorder(text) if text else None)
+                elif command == CMD_JOURNAL:
+                    engine.set_journal(PositionJournal(text))
+                elif command == CMD_BACKEND:
+                    try:
+                        engine.set_backend(SerialBackend(text) if text else MotorBackend())
+                    except OSError as error:
+                        print(f"Драйвер {text}: {error}", file=sys.stderr)  # остается симуляция
+                elif command == CMD_SIMULATE:
+                    if not engine.running:
+                        engine.simulate(number)
+            if not engine.running:
+                engine.update_physics()
+            channel.publish(engine, stops)
+            time.sleep(publish_period)
+    finally:
+        engine.stop(immediate=True)
+        engine.set_recorder(None)
+        engine.backend.close()
+        if engine.journal is not None:
+            engine.save_position()
+            engine.journal.close()
+        del channel
+        memory.close()
+
+
+class ProcessEngine(StepperMotorEngine):
+    """Двигатель, шаги которого генерирует отдельный процесс.
+
+    Интерфейс работает с ним как с обычным StepperMotorEngine: команды
+    уходят в почтовый ящик в общей памяти, а состояние обновляется в
+    poll() из последнего опубликованного процессом слота. Процесс шагов
+    не делит GIL с интерфейсом, поэтому загруженность Tk не влияет на
+    точность шагов.
+    """
+
+    def __init__(self, speed=100, direction="CW"):
+        super().__init__(speed, direction)
+        self.memory = shared_memory.SharedMemory(create=True, size=SharedChannel.size())
+        self.memory.buf[:HEADER.size] = bytes(HEADER.size)
+        self.channel = SharedChannel(self.memory.buf)
+        self.state_seq = 0
+        self.stops = 0  # остановок процесса шагов, учтенных в poll()
+
+        context = multiprocessing.get_context("spawn")  # без копии Tk из родителя
+        self.process = context.Process(target=serve, args=(self.memory.name,), daemon=True)
+        self.process.start()
+        self.send(CMD_SPEED, speed)
+        self.send(CMD_DIRECTION, 1 if direction == "CW" else -1)
+
+    def send(self, command, number=0, value=0.0, text=""):
+        """Отправка команды; при переполнении ящика - ожидание"""
+        while not self.channel.send(command, number, value, text):
+            time.sleep(0.001)
+
+    def poll(self):
+        """Обновление состояния из общей памяти с рассылкой событий"""
+        state = self.channel.latest()
+        if state is None or state[0] == self.state_seq:
+            return
+        (self.state_seq, self.current_step, self.total_steps, self.true_step,
+         missed_steps, _, self.step_rate, self.temperature, self.power, self.torque,
+         mean_jitter, max_jitter, self.microsteps, running, _, stops, _) = state
+        self.timing = {"mean_jitter_us": mean_jitter, "max_jitter_us": max_jitter}
+
+        stalled = missed_steps > self.missed_steps
+        self.missed_steps = missed_steps
+        # Остановку показывает счетчик, а не флаг: running мог еще не
+        # учесть только что отправленное перемещение
+        if stops != self.stops:
+            self.stops = stops
+            self.running = False
+            self.notify("stop")
+        if running and not self.running:
+            self.running = True
+            self.notify("start")
+        self.notify("step")
+        if stalled:
+            self.notify("stall")
+
+    def close(self):
+        """Остановка процесса шагов и освобождение общей памяти"""
+        if self.process is None:
+            return
+        self.send(CMD_QUIT)
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
+        del self.channel
+        self.memory.close()
+        self.memory.unlink()
+
+    # --- Команды вместо локального выполнения ---
+
+    def start(self, threaded=True):
+        if self.running:
+            return False
+        self.send(CMD_START)
+        self.running = True  # до остановки, о которой сообщит poll()
+        self.notify("start")
+        return True
+
+    def move(self, steps, threaded=True):
+        if steps == 0 or self.running:
+            return False
+        self.send(CMD_MOVE, steps)
+        self.running = True
+        self.notify("start")
+        return True
+
+    def stop(self, immediate=False):
+        self.send(CMD_STOP, int(immediate))
+
+    def reset(self):
+        self.send(CMD_RESET)
+        self.notify("reset")
+
+    def set_speed(self, speed):
+        self.speed = max(1, int(speed))
+        self.send(CMD_SPEED, self.speed)
+        self.notify("speed")
+
+    def set_direction(self, direction):
+        if direction not in ("CW", "CCW"):
+            raise ValueError(f"Неизвестное направление: {direction}")
+        self.direction = direction
+        self.send(CMD_DIRECTION, 1 if direction == "CW" else -1)
+        self.notify("direction")
+
+    def set_microstep(self, mode):
+        if self.running:
+            return False
+        if not super().set_microstep(mode):
+            return False
+        self.send(CMD_MODE, text=mode)
+        return True
+
+    def set_load(self, load):
+        self.load = max(0.0, float(load))
+        self.send(CMD_LOAD, value=self.load)
+        self.notify("load")
+
+    def set_recorder(self, recorder):
+        """Запись ведет процесс шагов: файл открывается там по пути записи"""
+        if recorder is not None:
+            path = recorder.path
+            recorder.close()
+        self.recorder = recorder
+        self.send(CMD_RECORD, text=path if recorder is not None else "")
+
+    def set_journal(self, journal):
+        """Журнал ведет процесс шагов по тому же файлу"""
+        if self.running:
+            return False
+        self.journal = journal
+        self.send(CMD_JOURNAL, text=journal.path)
+        return True
+
+    def save_position(self):
+        """Журнал пишет процесс шагов"""
+
+    def set_backend(self, backend):
+        """Драйвер открывается в процессе шагов по описанию backend.
+
+        Передать в другой процесс можно симуляцию (MotorBackend) и
+        последовательный порт (SerialBackend - по пути порта); для других
+        драйверов, как и во время работы, возвращается False.
+        """
+        from backend import SerialBackend
+
+        if self.running:
+            return False
+        if isinstance(backend, SerialBackend):
+            port = backend.port
+        elif type(backend) is MotorBackend:
+            port = ""
+        else:
+            return False
+        self.backend = backend  # только описание: порт открыт в процессе шагов
+        self.send(CMD_BACKEND, text=port)
+        self.notify("backend")
+        return True
+
+    def update_physics(self, dt=None, speed=None):
+        """Тепловую модель считает процесс шагов"""
+
+    def simulate(self, steps):
+        """Симуляция выполняется процессом шагов (только на месте).
+
+        Результат приходит, как и остальное состояние, через poll().
+        """
+        if self.running:
+            return False
+        self.send(CMD_SIMULATE, steps)
+        return True
+
+
+def jitter_benchmark(seconds=3.0, rate=2000, busy=True):
+    """Дрожание шагов при загруженном основном потоке: поток против процесса.
+
+    Основной поток имитирует тяжелый интерфейс - непрерывные вычисления
+    на Python, которые держат GIL.
+    """
+    results = {}
+    for name, factory in (("thread", StepperMotorEngine), ("process", ProcessEngine)):
+        engine = factory(speed=rate)
+        engine.timing_period = 0.2
+        if name == "process":
+            time.sleep(1.0)  # запуск интерпретатора в новом процессе
+        engine.start()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            if busy:
+                sum(i * i for i in range(20000))  # держит GIL
+            else:
+                time.sleep(0.01)
+            engine.poll()
+        engine.stop(immediate=True)
+        time.sleep(0.05)
+        engine.poll()
+        results[name] = dict(engine.timing, steps=engine.total_steps)
+        if name == "process":
+            engine.close()
+    return results
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(jitter_benchmark(), indent=2))
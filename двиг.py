@@ -1,11 +1,28 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import threading
+from tkinter import ttk, messagebox, filedialog
 import time
 import math
+import os
+import sys
+
+import microstep
+from animation import AnimationClock, Palette
+from backend import SerialBackend
+from engine import StepperMotorEngine
+from geometry import RotorGeometry
+from journal import PositionJournal
+from multiaxis import MultiAxisController
+from recorder import LogPlayer, StepLog, StepRecorder
+from retained import RetainedLayer
+from charts import HistoryChart, TrendChart
+from core import AsyncCore
+from profiler import Profiler, ProfilerOverlay
+from server import ControlServer
+from telemetry import TelemetryRecorder, TieredHistory
+from worker import ProcessEngine
 
 class FuturisticStepperMotorControl:
-    def __init__(self, root):
+    def __init__(self, root, frame_rate=60, axes=0, journal=None, process=False, profile=False):
         self.root = root
         self.root.title("УПРАВЛЕНИЕ ШАГОВЫМ ДВИГАТЕЛЕМ v2.0")
         self.root.geometry("1200x700")
@@ -26,17 +43,74 @@ class FuturisticStepperMotorControl:
             "glow_purple": (157, 0, 255, 0.3)
         }
         
-        # Параметры двигателя
-        self.running = False
-        self.direction = "CW"  # По часовой стрелке
-        self.speed = 100  # шагов/сек
-        self.current_step = 0
-        self.total_steps = 0
-        self.temperature = 42
-        self.power = 120
+        # Градиенты между цветами темы считаются один раз; все анимации
+        # (пульсация, свечение, катушки, наведение) идут от одних часов,
+        # которые render_frame продвигает раз в кадр
+        self.palette = Palette(self.colors)
+        self.clock = AnimationClock()
+        self.hovers = {}  # кнопка -> [уровень, цель, градиент]
+        
+        # Двигатель: окно - лишь один из подписчиков на его события
+        # process=True - шаги генерирует отдельный процесс, не делящий GIL
+        # с интерфейсом; состояние приходит через общую память
+        engine_class = ProcessEngine if process else StepperMotorEngine
+        self.engine = engine_class(speed=100, direction="CW")
+        
+        # Циклы шагов, телеметрия и анимации - задачи одного цикла asyncio,
+        # работающего вместе с mainloop() в потоке интерфейса
+        self.core = AsyncCore()
+        if not process:
+            self.core.attach_engine(self.engine)
+        if journal is not None:
+            # Позиция, сохраненная до закрытия (или падения) программы
+            self.engine.set_journal(journal)
+        self.engine.subscribe(self.on_engine_event)
+        
+        # Параметры отрисовки: кадры рисуются с фиксированной частотой,
+        # независимо от частоты шагов двигателя
+        self.frame_rate = frame_rate  # кадров/сек
+        self.display_angle = 0.0
+        self.last_frame_time = None
+        self.last_rendered = None
+        self.geometry = None
+        
+        # Все частые обновления виджетов идут через слой, отсекающий
+        # вызовы Tk без изменений
+        self.ui = RetainedLayer()
+        self.status_items = None
+        
+        # Многоосевой режим: компактные индикаторы осей на панели визуализации
+        self.axes_controller = MultiAxisController(axes) if axes else None
+        self.axis_dials = []
+        
+        # Телеметрия: многоуровневая история параметров (сырые отсчеты и
+        # агрегаты 1 сек/1 мин/1 час) для трендов и просмотра всего прогона
+        self.history = TieredHistory()
+        self.telemetry = TelemetryRecorder(self.engine, self.history, rate=20)
+        self.history_window = None
+        
+        # Запись шагов в файл и воспроизведение записи
+        self.player = None
+        self.trend_count = 0
+        
+        # Замеры горячих путей (F3): выключены - ничего не стоят
+        self.profiler = Profiler()
+        self.overlay_task = None
         
         self.setup_styles()
         self.setup_ui()
+        self.core.every(1.0 / self.telemetry.rate, self.telemetry.sample)
+        self.core.every(1.0 / self.frame_rate, self.render_frame)
+        self.core.attach(self.root)
+        for effect in (self.pulse_animation, self.glow_animation,
+                       self.animate_coils, self.animate_hover):
+            self.clock.add(effect)
+        
+        self.profiler_overlay = ProfilerOverlay(self.canvas, self.profiler, self.engine,
+                                                color=self.colors["accent_green"], ui=self.ui)
+        self.root.bind("<F3>", lambda e: self.toggle_profiler())
+        if profile:
+            self.toggle_profiler()
         
     def setup_styles(self):
         """Настройка кастомных стилей для виджетов"""
@@ -146,7 +220,7 @@ class FuturisticStepperMotorControl:
                 bg=self.colors["bg_medium"],
                 fg=self.colors["text_secondary"]).pack(anchor=tk.W)
         
-        self.speed_var = tk.IntVar(value=self.speed)
+        self.speed_var = tk.IntVar(value=self.engine.speed)
         speed_slider = tk.Scale(speed_frame, from_=1, to=500, 
                                variable=self.speed_var,
                                orient=tk.HORIZONTAL,
@@ -161,12 +235,34 @@ class FuturisticStepperMotorControl:
         speed_slider.pack(fill=tk.X, pady=5)
         
         self.speed_label = tk.Label(speed_frame, 
-                                   text=f"{self.speed} ШАГ/СЕК",
+                                   text=f"{self.engine.speed} ШАГ/СЕК",
                                    font=("Consolas", 12, "bold"),
                                    bg=self.colors["bg_medium"],
                                    fg=self.colors["accent_green"])
         self.speed_label.pack()
         
+        # Нагрузка на валу
+        load_frame = tk.Frame(control_frame, bg=self.colors["bg_medium"])
+        load_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        tk.Label(load_frame, text="НАГРУЗКА, Н·см",
+                font=("Segoe UI", 10, "bold"),
+                bg=self.colors["bg_medium"],
+                fg=self.colors["text_secondary"]).pack(anchor=tk.W)
+        
+        self.load_var = tk.IntVar(value=round(self.engine.load * 100))
+        tk.Scale(load_frame, from_=0, to=60,
+                variable=self.load_var,
+                orient=tk.HORIZONTAL,
+                command=self.update_load,
+                bg=self.colors["bg_medium"],
+                fg=self.colors["text_primary"],
+                troughcolor=self.colors["bg_light"],
+                highlightbackground=self.colors["bg_medium"],
+                activebackground=self.colors["accent_red"],
+                sliderrelief="flat",
+                length=200).pack(fill=tk.X, pady=5)
+        
         # Направление
         dir_frame = tk.Frame(control_frame, bg=self.colors["bg_medium"])
         dir_frame.pack(fill=tk.X, padx=20, pady=10)
@@ -179,7 +275,7 @@ class FuturisticStepperMotorControl:
         dir_btn_frame = tk.Frame(dir_frame, bg=self.colors["bg_medium"])
         dir_btn_frame.pack(fill=tk.X, pady=5)
         
-        self.dir_var = tk.StringVar(value=self.direction)
+        self.dir_var = tk.StringVar(value=self.engine.direction)
         
         self.cw_btn = tk.Button(dir_btn_frame, text="ПО ЧАСОВОЙ",
                                font=("Segoe UI", 10, "bold"),
@@ -199,6 +295,29 @@ class FuturisticStepperMotorControl:
                                 command=lambda: self.set_direction("CCW"))
         self.ccw_btn.pack(side=tk.RIGHT, padx=2)
         
+        # Режим шага
+        mode_frame = tk.Frame(control_frame, bg=self.colors["bg_medium"])
+        mode_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        tk.Label(mode_frame, text="РЕЖИМ ШАГА",
+                font=("Segoe UI", 10, "bold"),
+                bg=self.colors["bg_medium"],
+                fg=self.colors["text_secondary"]).pack(anchor=tk.W)
+        
+        self.mode_var = tk.StringVar(value=self.engine.microstep_mode)
+        mode_menu = tk.OptionMenu(mode_frame, self.mode_var, *microstep.MODES,
+                                  command=self.set_microstep)
+        mode_menu.config(font=("Segoe UI", 10, "bold"),
+                         bg=self.colors["bg_light"],
+                         fg=self.colors["text_primary"],
+                         activebackground=self.colors["accent_blue"],
+                         highlightthickness=0,
+                         relief="flat")
+        mode_menu.pack(fill=tk.X, pady=5)
+        
+        if self.axes_controller is not None:
+            self.setup_axes_controls(control_frame)
+        
         # Основные кнопки управления
         btn_frame = tk.Frame(control_frame, bg=self.colors["bg_medium"])
         btn_frame.pack(fill=tk.X, padx=20, pady=20)
@@ -219,6 +338,32 @@ class FuturisticStepperMotorControl:
                                                       self.reset_motor)
         self.reset_btn.pack(side=tk.LEFT, padx=5, expand=True)
         
+    def setup_axes_controls(self, parent):
+        """Ввод целевых положений осей (шагов через пробел)"""
+        axes_frame = tk.Frame(parent, bg=self.colors["bg_medium"])
+        axes_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        tk.Label(axes_frame, text=f"ОСИ ({self.axes_controller.axes}): ЦЕЛЬ, ШАГОВ",
+                font=("Segoe UI", 10, "bold"),
+                bg=self.colors["bg_medium"],
+                fg=self.colors["text_secondary"]).pack(anchor=tk.W)
+        
+        row = tk.Frame(axes_frame, bg=self.colors["bg_medium"])
+        row.pack(fill=tk.X, pady=5)
+        
+        self.axes_var = tk.StringVar(value=" ".join(["0"] * self.axes_controller.axes))
+        entry = tk.Entry(row, textvariable=self.axes_var,
+                        font=("Consolas", 10),
+                        bg=self.colors["bg_light"],
+                        fg=self.colors["text_primary"],
+                        insertbackground=self.colors["text_primary"],
+                        relief="flat")
+        entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        entry.bind("<Return>", lambda e: self.move_axes())
+        
+        self.create_futuristic_button(row, "→", self.colors["accent_purple"],
+                                      self.move_axes).pack(side=tk.LEFT, padx=5)
+        
     def setup_visualization_panel(self, parent):
         """Панель визуализации двигателя"""
         viz_frame = tk.Frame(parent, bg=self.colors["bg_medium"],
@@ -243,6 +388,8 @@ class FuturisticStepperMotorControl:
         
         # Инициализация анимации
         self.setup_motor_animation()
+        if self.axes_controller is not None:
+            self.setup_axes_view()
         
     def setup_motor_animation(self):
         """Настройка анимированного двигателя"""
@@ -251,7 +398,7 @@ class FuturisticStepperMotorControl:
         self.radius = 120
         
         # Внешнее кольцо с эффектом свечения
-        self.canvas.create_oval(self.center_x - self.radius - 10, 
+        self.glow_ring = self.canvas.create_oval(self.center_x - self.radius - 10, 
                                self.center_y - self.radius - 10,
                                self.center_x + self.radius + 10, 
                                self.center_y + self.radius + 10,
@@ -276,6 +423,14 @@ class FuturisticStepperMotorControl:
                                outline=self.colors["accent_blue"],
                                width=1, tags="inner")
         
+        # Градиенты анимаций: подсветка катушек от выключенной до полного
+        # тока, пульсация индикатора, свечение кольца
+        self.coil_palette = self.palette.gradient("bg_light", "accent_green")
+        self.pulse_palette = self.palette.gradient("#ffffff", "accent_green")
+        self.glow_palette = self.palette.gradient("accent_purple", "accent_blue")
+        self.coil_levels = [0.0] * 4  # отображаемая яркость катушек (индекс палитры)
+        self.coil_targets = [0] * 4
+        
         # Статорные катушки (4 штуки)
         self.coils = []
         for i in range(4):
@@ -332,6 +487,35 @@ class FuturisticStepperMotorControl:
                                                      fill=self.colors["accent_green"],
                                                      outline="", tags="indicator")
         
+    def setup_axes_view(self):
+        """Компактные индикаторы осей по краям холста (до 32 осей)"""
+        # Концы стрелок для каждого градуса считаются один раз
+        self.dial_needles = [(math.cos(math.radians(a)), math.sin(math.radians(a)))
+                             for a in range(360)]
+        
+        columns = [22, 64, 436, 478]
+        for i in range(min(self.axes_controller.axes, 32)):
+            x = columns[i // 8]
+            y = 22 + (i % 8) * 44
+            r = 15
+            self.canvas.create_oval(x - r, y - r, x + r, y + r,
+                                   outline=self.colors["accent_purple"],
+                                   width=1, tags="axis_dial")
+            needle = self.canvas.create_line(x, y, x, y - r + 3,
+                                            fill=self.colors["accent_green"],
+                                            width=2, tags="axis_dial")
+            self.canvas.create_text(x - r - 1, y - r + 1, text=str(i + 1),
+                                   fill=self.colors["text_secondary"],
+                                   font=("Segoe UI", 6), anchor=tk.NE, tags="axis_dial")
+            self.axis_dials.append((x, y, r - 3, needle))
+    
+    def update_axes_view(self):
+        """Поворот стрелок осей по их положениям"""
+        positions = self.axes_controller.positions
+        for (x, y, r, needle), position in zip(self.axis_dials, positions.tolist()):
+            dx, dy = self.dial_needles[int(round(position * 1.8)) % 360]
+            self.ui.coords(self.canvas, needle, x, y, x + r * dx, y + r * dy)
+    
     def setup_stats_panel(self, parent):
         """Панель статистики"""
         stats_frame = tk.Frame(parent, bg=self.colors["bg_medium"],
@@ -356,7 +540,9 @@ class FuturisticStepperMotorControl:
             ("СКОРОСТЬ", "100", "шаг/сек"),
             ("ТЕМПЕРАТУРА", "42", "°C"),
             ("МОЩНОСТЬ", "120", "Вт"),
-            ("МОМЕНТ", "75", "%")
+            ("МОМЕНТ", "75", "%"),
+            ("ФАКТ. ПОЗИЦИЯ", "0", "шагов"),
+            ("ПРОПУЩЕНО", "0", "шагов")
         ]
         
         self.metric_labels = {}
@@ -417,6 +603,31 @@ class FuturisticStepperMotorControl:
                  command=lambda: self.step_motor(-10),
                  **self.get_button_style(self.colors["accent_blue"])).pack(side=tk.LEFT, padx=2, expand=True)
         
+        # Запись и воспроизведение
+        log_frame = tk.Frame(stats_frame, bg=self.colors["bg_medium"])
+        log_frame.pack(fill=tk.X, padx=20, pady=(0, 20))
+        
+        self.record_btn = tk.Button(log_frame, text="● ЗАПИСЬ",
+                                   command=self.toggle_recording,
+                                   **self.get_button_style(self.colors["bg_light"]))
+        self.record_btn.pack(side=tk.LEFT, padx=2, expand=True)
+        
+        self.replay_btn = tk.Button(log_frame, text="▶ ВОСПРОИЗВЕСТИ",
+                                   command=self.toggle_replay,
+                                   **self.get_button_style(self.colors["bg_light"]))
+        self.replay_btn.pack(side=tk.LEFT, padx=2, expand=True)
+        
+        self.replay_speed = tk.StringVar(value="×1")
+        replay_menu = tk.OptionMenu(log_frame, self.replay_speed,
+                                    "×0.25", "×1", "×4", "×16", "×100",
+                                    command=self.set_replay_speed)
+        replay_menu.config(font=("Segoe UI", 9, "bold"),
+                           bg=self.colors["bg_light"],
+                           fg=self.colors["text_primary"],
+                           highlightthickness=0,
+                           relief="flat")
+        replay_menu.pack(side=tk.LEFT, padx=2)
+        
     def setup_details_panel(self, parent):
         """Панель деталей и состояния"""
         details_frame = tk.Frame(parent, bg=self.colors["bg_medium"],
@@ -467,23 +678,61 @@ class FuturisticStepperMotorControl:
         
         self.load_bar = self.create_progress_bar(progress_frame, self.colors["accent_blue"])
         
+        # Графики трендов
+        trend_frame = tk.Frame(details_frame, bg=self.colors["bg_medium"])
+        trend_frame.pack(fill=tk.X, padx=30)
+        
+        self.trend_canvas = tk.Canvas(trend_frame, width=320, height=84,
+                                     bg=self.colors["bg_medium"],
+                                     highlightthickness=0)
+        self.trend_canvas.pack(anchor=tk.W)
+        
+        trends = [
+            ("temperature", "ТЕМПЕРАТУРА", self.colors["accent_red"], 0, 100),
+            ("power", "МОЩНОСТЬ", self.colors["accent_blue"], 0, 20),
+            ("torque", "МОМЕНТ", self.colors["accent_green"], 0, 100),
+            ("speed", "СКОРОСТЬ", self.colors["accent_purple"], 0, 500)
+        ]
+        self.trend_charts = []
+        for i, (channel, title, color, low, high) in enumerate(trends):
+            chart = TrendChart(self.trend_canvas, (i % 2) * 162, (i // 2) * 43, 156, 38,
+                               color, low, high, title=title,
+                               text_color=self.colors["text_secondary"],
+                               grid_color=self.colors["bg_light"])
+            self.trend_charts.append((channel, chart))
+        self.trend_specs = trends
+        
+        # Просмотр истории за выбранный интервал
+        range_frame = tk.Frame(trend_frame, bg=self.colors["bg_medium"])
+        range_frame.pack(fill=tk.X, pady=(4, 0))
+        for text, seconds in (("1 МИН", 60), ("1 ЧАС", 3600), ("СУТКИ", 86400), ("ВЕСЬ ПРОГОН", None)):
+            tk.Button(range_frame, text=text,
+                     command=lambda seconds=seconds: self.show_history(seconds),
+                     **self.get_button_style(self.colors["bg_light"])).pack(side=tk.LEFT, padx=2, expand=True)
+        
         # Информация о системе
         info_frame = tk.Frame(details_frame, bg=self.colors["bg_medium"])
         info_frame.pack(fill=tk.X, padx=30, pady=20)
         
-        info_text = """
+        self.info_label = tk.Label(info_frame,
+                                  font=("Consolas", 9),
+                                  bg=self.colors["bg_medium"],
+                                  fg=self.colors["text_secondary"],
+                                  justify=tk.LEFT)
+        self.info_label.pack(anchor=tk.W)
+        self.update_info_text()
+    
+    def update_info_text(self):
+        """Обновление информации о системе"""
+        engine = self.engine
+        info_text = f"""
         СИСТЕМА: ШАГОВЫЙ ДВИГАТЕЛЬ v2.0
-        РЕЖИМ: ПОЛНЫЙ ШАГ
+        РЕЖИМ: {microstep.mode_name(engine.microstep_mode)}
         ДРАЙВЕР: БИПОЛЯРНЫЙ
-        РАЗРЕШЕНИЕ: 1.8°
+        РАЗРЕШЕНИЕ: {engine.step_angle:g}°
         МАКС. СКОРОСТЬ: 500 ШАГ/СЕК
         """
-        
-        tk.Label(info_frame, text=info_text.strip(),
-                font=("Consolas", 9),
-                bg=self.colors["bg_medium"],
-                fg=self.colors["text_secondary"],
-                justify=tk.LEFT).pack(anchor=tk.W)
+        self.info_label.config(text="\n".join(line.strip() for line in info_text.strip().splitlines()))
         
     def create_futuristic_button(self, parent, text, color, command, state=tk.NORMAL):
         """Создание кнопки в футуристическом стиле"""
@@ -499,9 +748,9 @@ class FuturisticStepperMotorControl:
                        state=state,
                        cursor="hand2")
         
-        # Эффект при наведении
-        btn.bind("<Enter>", lambda e: btn.config(bg=self.lighten_color(color, 20)))
-        btn.bind("<Leave>", lambda e: btn.config(bg=color))
+        # Эффект при наведении: плавная подсветка по часам анимации
+        btn.bind("<Enter>", lambda e: self.hover(btn, color, True))
+        btn.bind("<Leave>", lambda e: self.hover(btn, color, False))
         
         return btn
     
@@ -536,12 +785,10 @@ class FuturisticStepperMotorControl:
     
     def update_progress_bar(self, bar, value):
         """Обновление прогресс-бара"""
-        bar.place(relx=0, rely=0.07, relwidth=value/100, relheight=0.86)
+        self.ui.place(bar, relx=0, rely=0.07, relwidth=value/100, relheight=0.86)
     
     def update_status_indicator(self, status):
         """Обновление индикатора состояния"""
-        self.status_indicator.delete("all")
-        
         colors = {
             "ОЖИДАНИЕ": self.colors["accent_red"],
             "РАБОТАЕТ": self.colors["accent_green"],
@@ -550,45 +797,96 @@ class FuturisticStepperMotorControl:
         
         color = colors.get(status, self.colors["accent_blue"])
         
-        # Рисуем индикатор
-        self.status_indicator.create_rectangle(10, 10, 190, 30,
-                                              fill=self.colors["bg_light"],
-                                              outline=color,
-                                              width=2)
-        
-        # Анимированный индикатор
-        if status == "РАБОТАЕТ":
+        # Фигуры создаются один раз, дальше меняются только их свойства
+        if self.status_items is None:
+            frame = self.status_indicator.create_rectangle(10, 10, 190, 30,
+                                                           fill=self.colors["bg_light"],
+                                                           outline=color,
+                                                           width=2)
+            dots = []
             for i in range(3):
                 x = 30 + i * 50
-                self.status_indicator.create_oval(x, 15, x+10, 25,
-                                                 fill=color,
-                                                 outline="",
-                                                 tags=f"pulse_{i}")
-            self.pulse_animation()
-        else:
-            self.status_indicator.create_oval(30, 15, 40, 25,
-                                             fill=color,
-                                             outline="")
+                dots.append(self.status_indicator.create_oval(x, 15, x+10, 25,
+                                                              fill=color,
+                                                              outline="",
+                                                              tags=f"pulse_{i}"))
+            self.status_items = (frame, dots)
+        
+        frame, dots = self.status_items
+        self.ui.itemconfig(self.status_indicator, frame, outline=color)
+        
+        # Анимированный индикатор: три точки при работе, одна в остальных случаях
+        running = status == "РАБОТАЕТ"
+        for i, dot in enumerate(dots):
+            self.ui.itemconfig(self.status_indicator, dot, fill=color,
+                               state=tk.NORMAL if running or i == 0 else tk.HIDDEN)
     
-    def pulse_animation(self):
+    def hover(self, button, color, inside):
+        """Начало подсветки кнопки (inside=True) или ее угасания"""
+        state = self.hovers.get(button)
+        if state is None:
+            state = self.hovers[button] = [0.0, 0, self.palette.gradient(color, self.palette.lighten(color))]
+        state[1] = len(state[2]) - 1 if inside else 0
+    
+    # Эффекты часов анимации: вызываются раз в кадр из render_frame
+    
+    def pulse_animation(self, clock):
         """Анимация пульсации для индикатора"""
-        if self.running:
-            for i in range(3):
-                alpha = 0.3 + 0.7 * abs(math.sin(time.time() * 2 + i))
-                color = self.blend_colors(self.colors["accent_green"], "#ffffff", alpha)
-                self.status_indicator.itemconfig(f"pulse_{i}", fill=color)
-            
-            self.root.after(100, self.pulse_animation)
+        if self.engine.running and self.status_items is not None:
+            _, dots = self.status_items
+            top = len(self.pulse_palette) - 1
+            for i, dot in enumerate(dots):
+                alpha = 0.3 + 0.7 * clock.wave(2, i)
+                self.ui.itemconfig(self.status_indicator, dot,
+                                   fill=self.pulse_palette[int(alpha * top + 0.5)])
+    
+    def glow_animation(self, clock):
+        """Дыхание внешнего кольца при работе"""
+        level = int(clock.wave(1.5) * (len(self.glow_palette) - 1) + 0.5) if self.engine.running else 0
+        self.ui.itemconfig(self.canvas, self.glow_ring, outline=self.glow_palette[level])
+    
+    def animate_coils(self, clock):
+        """Плавное изменение подсветки катушек к токам фаз"""
+        fade = 1 - math.exp(-clock.dt / 0.05)
+        for i, coil in enumerate(self.coils):
+            level = self.coil_levels[i]
+            target = self.coil_targets[i]
+            if level != target:
+                level += (target - level) * fade
+                if abs(target - level) < 0.5:
+                    level = target
+                self.coil_levels[i] = level
+            self.ui.itemconfig(self.canvas, coil, fill=self.coil_palette[int(level + 0.5)])
+    
+    def animate_hover(self, clock):
+        """Подсветка кнопок под курсором: около 0,15 сек до полной"""
+        if not self.hovers:
+            return
+        done = []
+        for button, state in self.hovers.items():
+            level, target, gradient = state
+            step = clock.dt * (len(gradient) - 1) / 0.15
+            level = min(target, level + step) if target > level else max(target, level - step)
+            state[0] = level
+            self.ui.config(button, bg=gradient[int(level + 0.5)])
+            if level == target == 0:
+                done.append(button)
+        for button in done:
+            del self.hovers[button]
     
     def update_speed(self, event=None):
         """Обновление скорости"""
-        self.speed = self.speed_var.get()
-        self.speed_label.config(text=f"{self.speed} ШАГ/СЕК")
-        self.metric_labels["СКОРОСТЬ"].config(text=str(self.speed))
+        self.engine.set_speed(self.speed_var.get())
+        self.speed_label.config(text=f"{self.engine.speed} ШАГ/СЕК")
+        self.metric_labels["СКОРОСТЬ"].config(text=str(self.engine.speed))
+    
+    def update_load(self, event=None):
+        """Обновление нагрузки (слайдер - в Н·см)"""
+        self.engine.set_load(self.load_var.get() / 100)
     
     def set_direction(self, direction):
         """Установка направления"""
-        self.direction = direction
+        self.engine.set_direction(direction)
         
         if direction == "CW":
             self.cw_btn.config(bg=self.colors["accent_blue"], fg="#000000")
@@ -597,161 +895,238 @@ class FuturisticStepperMotorControl:
             self.cw_btn.config(bg=self.colors["bg_light"], fg=self.colors["text_primary"])
             self.ccw_btn.config(bg=self.colors["accent_blue"], fg="#000000")
     
+    def set_microstep(self, mode):
+        """Установка режима шага"""
+        if not self.engine.set_microstep(mode):
+            # Во время работы режим не меняется
+            self.mode_var.set(self.engine.microstep_mode)
+            return
+        self.update_info_text()
+    
     def start_motor(self):
         """Запуск двигателя"""
-        if not self.running:
-            self.running = True
-            self.start_btn.config(state=tk.DISABLED)
-            self.stop_btn.config(state=tk.NORMAL)
-            
-            self.status_text.config(text="СИСТЕМА: РАБОТАЕТ", fg=self.colors["accent_green"])
-            self.update_status_indicator("РАБОТАЕТ")
-            
-            # Запуск анимации
-            self.animation_thread = threading.Thread(target=self.animate_motor, daemon=True)
-            self.animation_thread.start()
+        self.engine.start()
     
     def stop_motor(self):
         """Остановка двигателя"""
-        self.running = False
-        self.start_btn.config(state=tk.NORMAL)
-        self.stop_btn.config(state=tk.DISABLED)
-        
-        self.status_text.config(text="СИСТЕМА: ОЖИДАНИЕ", fg=self.colors["accent_red"])
-        self.update_status_indicator("ОЖИДАНИЕ")
+        self.engine.stop()
     
     def reset_motor(self):
         """Сброс двигателя"""
-        self.stop_motor()
-        self.current_step = 0
-        self.total_steps = 0
-        self.update_display()
-        self.rotate_motor(0)
+        self.engine.reset()
+        self.display_angle = 0.0
     
     def step_motor(self, steps):
         """Шаговое управление"""
-        if not self.running:
-            self.current_step += steps
-            self.total_steps += abs(steps)
-            self.update_display()
-            self.rotate_motor(self.current_step * 1.8)
+        self.engine.step(steps)
     
-    def animate_motor(self):
-        """Анимация работы двигателя"""
-        step_delay = 1.0 / self.speed
-        
-        while self.running:
-            step = 1 if self.direction == "CW" else -1
-            self.current_step += step
-            self.total_steps += 1
-            
-            # Обновление интерфейса
-            self.root.after(0, self.update_display)
-            self.root.after(0, lambda: self.rotate_motor(self.current_step * 1.8))
-            
-            # Обновление температуры и мощности (имитация)
-            self.temperature = min(100, 42 + self.speed // 20 + self.total_steps // 1000)
-            self.power = 120 + self.speed // 5
+    def move_axes(self):
+        """Согласованное перемещение осей в положения из поля ввода"""
+        try:
+            targets = [int(value) for value in self.axes_var.get().replace(",", " ").split()]
+        except ValueError:
+            messagebox.showerror("Оси", "Положения осей - целые числа через пробел")
+            return
+        try:
+            self.axes_controller.move_to(targets)
+        except ValueError as error:
+            messagebox.showerror("Оси", str(error))
+    
+    def toggle_recording(self):
+        """Включение/выключение записи шагов в файл"""
+        if self.engine.recorder is not None:
+            self.engine.set_recorder(None)
+            self.record_btn.config(text="● ЗАПИСЬ", bg=self.colors["bg_light"])
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".steplog",
+                                            initialfile=time.strftime("stepper-%Y%m%d-%H%M%S.steplog"),
+                                            filetypes=[("Запись шагов", "*.steplog")])
+        if not path:
+            return
+        self.engine.set_recorder(StepRecorder(path))
+        self.record_btn.config(text="■ ЗАПИСЬ", bg=self.colors["accent_red"])
+    
+    def toggle_replay(self):
+        """Воспроизведение записи на визуализации (повторно - остановка)"""
+        if self.player is not None:
+            self.player.log.close()
+            self.player = None
+            self.replay_btn.config(text="▶ ВОСПРОИЗВЕСТИ", bg=self.colors["bg_light"])
+            return
+        path = filedialog.askopenfilename(filetypes=[("Запись шагов", "*.steplog")])
+        if not path:
+            return
+        try:
+            log = StepLog(path)
+        except (OSError, ValueError) as error:
+            messagebox.showerror("Воспроизведение", str(error))
+            return
+        self.player = LogPlayer(log, float(self.replay_speed.get()[1:]),
+                                step_angle=self.engine.STEP_ANGLE)
+        self.replay_btn.config(text="■ ВОСПРОИЗВЕДЕНИЕ", bg=self.colors["accent_purple"])
+    
+    def set_replay_speed(self, value):
+        """Множитель скорости воспроизведения"""
+        if self.player is not None:
+            self.player.set_multiplier(float(value[1:]))
+    
+    def toggle_profiler(self):
+        """Включение/выключение замеров и панели производительности"""
+        profiler = self.profiler
+        if profiler.enabled:
+            profiler.disable()
+            self.core.profiler = self.clock.profiler = None
+            self.overlay_task.cancel()
+            self.overlay_task = None
+            self.profiler_overlay.hide()
+            return
+        profiler.reset()
+        self.ui.reset_frames()
+        profiler.enable([(self, ("rotate_motor", "update_display", "update_system_stats"))],
+                        self.root)
+        self.core.profiler = self.clock.profiler = profiler
+        self.profiler_overlay.show()
+        self.overlay_task = self.core.every(0.5, self.profiler_overlay.update)
+    
+    def on_engine_event(self, event, engine):
+        """Реакция на события двигателя (в процессном режиме - из poll())"""
+        if event == "start":
+            self.root.after(0, self.show_run_state, True)
+        elif event == "stop":
+            self.root.after(0, self.show_run_state, False)
+        # Шаги не обрабатываем: состояние читает render_frame
+    
+    def show_run_state(self, running):
+        """Отображение состояния запуска"""
+        if running:
+            self.start_btn.config(state=tk.DISABLED)
+            self.stop_btn.config(state=tk.NORMAL)
             
-            self.root.after(0, self.update_system_stats)
+            self.status_text.config(text="СИСТЕМА: РАБОТАЕТ", fg=self.colors["accent_green"])
+            self.update_status_indicator("РАБОТАЕТ")
+        else:
+            self.start_btn.config(state=tk.NORMAL)
+            self.stop_btn.config(state=tk.DISABLED)
             
-            time.sleep(step_delay)
+            self.status_text.config(text="СИСТЕМА: ОЖИДАНИЕ", fg=self.colors["accent_red"])
+            self.update_status_indicator("ОЖИДАНИЕ")
+    
+    def render_frame(self):
+        """Отрисовка одного кадра с фиксированной частотой"""
+        now = time.perf_counter()
+        dt = 0.0 if self.last_frame_time is None else now - self.last_frame_time
+        self.last_frame_time = now
+        
+        # Интерполяция угла ротора между кадрами: догоняем целевой угол
+        # по экспоненте с постоянной времени в два кадра
+        engine = self.engine
+        engine.poll()
+        target_angle = engine.angle if self.player is None else self.player.angle()
+        delta = target_angle - self.display_angle
+        if abs(delta) > 360:
+            self.display_angle = target_angle
+        else:
+            tau = 2.0 / self.frame_rate
+            self.display_angle += delta * (1 - math.exp(-dt / tau))
+            if abs(target_angle - self.display_angle) < 0.05:
+                self.display_angle = target_angle
+        
+        # Рисуем только если что-то изменилось с прошлого кадра
+        snapshot = (round(self.display_angle, 3), engine.microstep_mode,
+                    engine.current_step, engine.total_steps, engine.missed_steps, engine.load,
+                    round(engine.temperature, 1), round(engine.power, 1), engine.speed)
+        self.ui.begin_frame()
+        if snapshot != self.last_rendered:
+            self.last_rendered = snapshot
+            self.rotate_motor(self.display_angle)
+            self.update_display()
+            self.update_system_stats()
+        if self.axes_controller is not None:
+            self.update_axes_view()
+        self.update_trends()
+        self.clock.tick(now)
+        self.ui.end_frame()  # вызовы Tk за кадр - в панели профилировщика (F3)
+    
+    def rotor_geometry(self):
+        """Таблица координат ротора; перестраивается при смене размеров или режима"""
+        key = (self.center_x, self.center_y, self.radius, self.engine.steps_per_rev)
+        if self.geometry is None or self.geometry.key != key:
+            self.geometry = RotorGeometry(*key)
+        return self.geometry
     
     def rotate_motor(self, angle_deg):
         """Вращение ротора"""
+        geometry = self.rotor_geometry()
+        index = geometry.index(angle_deg)
+        
         # Поворачиваем магниты
-        for i, magnet in enumerate(self.magnets):
-            original_angle = i * 45
-            new_angle = original_angle + angle_deg
-            x = self.center_x + 50 * math.cos(math.radians(new_angle))
-            y = self.center_y + 50 * math.sin(math.radians(new_angle))
-            
-            coords = self.canvas.coords(magnet)
-            width = coords[2] - coords[0]
-            height = coords[3] - coords[1]
-            
-            self.canvas.coords(magnet, 
-                             x - width/2, y - height/2,
-                             x + width/2, y + height/2)
+        for magnet, box in zip(self.magnets, geometry.magnets(index)):
+            self.ui.coords(self.canvas, magnet, *box)
         
-        # Обновляем подсветку катушек
-        active_coil = (self.current_step // 2) % 4
-        for i, coil in enumerate(self.coils):
-            if i == active_coil:
-                self.canvas.itemconfig(coil, fill=self.colors["accent_green"])
-            else:
-                self.canvas.itemconfig(coil, fill=self.colors["bg_light"])
+        # Подсветка катушек по токам фаз для отображаемого микрошага
+        # (рисует animate_coils)
+        currents = self.engine.coil_currents(int(round(angle_deg / self.engine.step_angle)))
+        top = len(self.coil_palette) - 1
+        self.coil_targets = [int(current * top + 0.5) for current in currents]
         
         # Перемещаем индикатор шага
-        indicator_angle = angle_deg
-        x = self.center_x + (self.radius - 10) * math.cos(math.radians(indicator_angle))
-        y = self.center_y + (self.radius - 10) * math.sin(math.radians(indicator_angle))
-        
-        coords = self.canvas.coords(self.step_indicator)
-        width = coords[2] - coords[0]
-        height = coords[3] - coords[1]
-        
-        self.canvas.coords(self.step_indicator,
-                          x - width/2, y - height/2,
-                          x + width/2, y + height/2)
-        
-        self.canvas.update()
+        self.ui.coords(self.canvas, self.step_indicator, *geometry.indicator(index))
+    
+    def show_history(self, seconds=None):
+        """Окно истории за последние seconds секунд (None - весь прогон)"""
+        if self.history_window is None or not self.history_window.winfo_exists():
+            window = tk.Toplevel(self.root)
+            window.title("История телеметрии")
+            window.configure(bg=self.colors["bg_dark"])
+            canvas = tk.Canvas(window, width=640, height=4 * 110,
+                               bg=self.colors["bg_dark"], highlightthickness=0)
+            canvas.pack(padx=10, pady=10)
+            self.history_charts = [
+                (channel, HistoryChart(canvas, 0, i * 110, 640, 100, color, low, high,
+                                       title=title, band_color=self.colors["bg_light"],
+                                       text_color=self.colors["text_secondary"],
+                                       grid_color=self.colors["bg_medium"]))
+                for i, (channel, title, color, low, high) in enumerate(self.trend_specs)
+            ]
+            self.history_window = window
+        
+        start = None if seconds is None else time.time() - seconds
+        for channel, chart in self.history_charts:
+            chart.draw(*self.history.query(channel, start, max_points=300))
+        self.history_window.lift()
+    
+    def update_trends(self):
+        """Дорисовка графиков трендов новыми отсчетами телеметрии"""
+        buffer = self.history.raw
+        if buffer.count == self.trend_count:
+            return
+        rows, self.trend_count = buffer.since(self.trend_count)
+        for channel, chart in self.trend_charts:
+            chart.push_many(buffer.column(rows, channel).tolist())
     
     def update_display(self):
         """Обновление отображения"""
-        self.metric_labels["ПОЗИЦИЯ"].config(text=str(self.current_step))
-        self.metric_labels["ВСЕГО ШАГОВ"].config(text=str(self.total_steps))
+        self.ui.config(self.metric_labels["ПОЗИЦИЯ"], text=str(self.engine.current_step))
+        self.ui.config(self.metric_labels["ВСЕГО ШАГОВ"], text=str(self.engine.total_steps))
+        self.ui.config(self.metric_labels["ФАКТ. ПОЗИЦИЯ"], text=str(self.engine.true_step))
+        self.ui.config(self.metric_labels["ПРОПУЩЕНО"], text=str(self.engine.missed_steps),
+                       fg=self.colors["accent_red" if self.engine.missed_steps else "accent_blue"])
     
     def update_system_stats(self):
         """Обновление системной статистики"""
-        self.metric_labels["ТЕМПЕРАТУРА"].config(text=str(self.temperature))
-        self.metric_labels["МОЩНОСТЬ"].config(text=str(self.power))
+        engine = self.engine
+        self.ui.config(self.metric_labels["ТЕМПЕРАТУРА"], text=f"{engine.temperature:.1f}")
+        self.ui.config(self.metric_labels["МОЩНОСТЬ"], text=f"{engine.power:.1f}")
         
         # Обновляем прогресс-бары
-        self.update_progress_bar(self.temp_bar, self.temperature)
-        self.update_progress_bar(self.load_bar, min(100, self.speed // 5))
+        self.update_progress_bar(self.temp_bar, min(100, round(engine.temperature)))
+        # Нагрузка - доля доступного на текущей скорости момента
+        available = engine.torque / 100 * engine.model.holding_torque
+        load = 100 if available <= 0 else min(100, round(engine.load / available * 100))
+        self.update_progress_bar(self.load_bar, load)
         
         # Обновляем метрику крутящего момента
-        torque = min(100, 75 + self.speed // 20)
-        self.metric_labels["МОМЕНТ"].config(text=str(torque))
-    
-    @staticmethod
-    def lighten_color(color, amount):
-        """Осветление цвета"""
-        if color.startswith("#"):
-            r = int(color[1:3], 16)
-            g = int(color[3:5], 16)
-            b = int(color[5:7], 16)
-            
-            r = min(255, r + amount)
-            g = min(255, g + amount)
-            b = min(255, b + amount)
-            
-            return f"#{r:02x}{g:02x}{b:02x}"
-        return color
-    
-    @staticmethod
-    def blend_colors(color1, color2, alpha):
-        """Смешивание двух цветов"""
-        if color1.startswith("#"):
-            r1 = int(color1[1:3], 16)
-            g1 = int(color1[3:5], 16)
-            b1 = int(color1[5:7], 16)
-        else:
-            return color1
-        
-        if color2.startswith("#"):
-            r2 = int(color2[1:3], 16)
-            g2 = int(color2[3:5], 16)
-            b2 = int(color2[5:7], 16)
-        else:
-            return color1
-        
-        r = int(r1 * alpha + r2 * (1 - alpha))
-        g = int(g1 * alpha + g2 * (1 - alpha))
-        b = int(b1 * alpha + b2 * (1 - alpha))
-        
-        return f"#{r:02x}{g:02x}{b:02x}"
+        self.ui.config(self.metric_labels["МОМЕНТ"], text=f"{engine.torque:.0f}")
 
 def main():
     root = tk.Tk()
@@ -762,7 +1137,31 @@ def main():
     except:
         pass
     
-    app = FuturisticStepperMotorControl(root)
+    # --axes N - индикаторы N согласованных осей (MultiAxisController) на холсте
+    axes = 0
+    if "--axes" in sys.argv:
+        try:
+            axes = max(0, int(sys.argv[sys.argv.index("--axes") + 1]))
+        except (IndexError, ValueError):
+            print("--axes: ожидается число осей", file=sys.stderr)
+    
+    journal = PositionJournal(os.path.join(os.path.expanduser("~"), ".stepper_position"))
+    app = FuturisticStepperMotorControl(root, axes=axes, journal=journal,
+                                        process="--process" in sys.argv,
+                                        profile="--profile" in sys.argv)
+    
+    # --serial PORT - драйвер на последовательном порту вместо симуляции.
+    # В одном процессе цикл шагов идет в цикле событий Tk, поэтому flush()
+    # не ждет подтверждений (blocking=False); ProcessEngine открывает порт
+    # в процессе шагов
+    if "--serial" in sys.argv:
+        try:
+            port = sys.argv[sys.argv.index("--serial") + 1]
+            app.engine.set_backend(SerialBackend(port, blocking=False))
+        except IndexError:
+            print("--serial: ожидается порт", file=sys.stderr)
+        except OSError as error:
+            print(f"--serial: {error}", file=sys.stderr)
     
     # Центрируем окно
     root.update_idletasks()
@@ -772,7 +1171,23 @@ def main():
     y = (root.winfo_screenheight() // 2) - (height // 2)
     root.geometry(f'{width}x{height}+{x}+{y}')
     
+    # Управление по JSON-RPC (localhost:8765) на том же цикле событий
+    server = None
+    if "--server" in sys.argv:
+        server = ControlServer(app.engine, app.core)
+        server.open()
+    
     root.mainloop()
+    if server is not None:
+        server.close()
+    app.core.close()
+    if app.axes_controller is not None:
+        app.axes_controller.stop(immediate=True)
+    if isinstance(app.engine, ProcessEngine):
+        app.engine.close()
+    else:
+        app.engine.backend.close()
+    journal.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file